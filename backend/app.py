@@ -1,69 +1,293 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from optimization.optimizer import OptimizationHandler
+from optimization.optimizer import OptimizationHandler, reference_partitions
+from optimization.jobs import JobManager
+from optimization.cache import ResultCache
+from optimization.experiments import ExperimentManager
+from optimization.streaming import stream_job_events
+from optimization.lod import FrontSampler, reduce_result
+from optimization.resources import ResourceLimits, physical_memory, MAX_N_GEN
+from optimization.restarts import submit_restarts
+from optimization.runstore import RunStore
+from optimization.sessions import SessionManager, MUTABLE as SESSION_PARAMS
+from optimization import artifacts
+from optimization import islands
+from optimization import registry
+from optimization import encoding
+from optimization.encoding import parse_bool
+from optimization import evaluation
+from optimization import indicators
+from optimization import instrumentation
+from concurrent.futures import CancelledError
+from datetime import datetime
 import numpy as np
 import traceback
+import pstats
+import io
+import threading
+import os
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes the numpy arrays of results"""
+    # Pretty printing in debug mode makes result payloads several times larger
+    compact = True
+
+    @staticmethod
+    def default(o):
+        try:
+            return encoding.json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
 
 app = Flask(__name__)
-CORS(app)
+app.json = NumpyJSONProvider(app)
+CORS(app, expose_headers=['Content-Encoding'])
+
+# Reference directions and true Pareto fronts are computed once and memory-mapped from here
+artifacts.configure(os.environ.get('PYMOO_INTERACT_ARTIFACT_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'artifacts')))
+
+# Opt-in timing spans and counters, exposed on /metrics. Worker processes leave snapshots of
+# their metrics in the metrics directory
+instrumentation.configure(
+    parse_bool(os.environ.get('PYMOO_INTERACT_INSTRUMENTATION', '')),
+    os.environ.get('PYMOO_INTERACT_METRICS_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'metrics')),
+    clear=True
+)
+
+# Runs are seeded, so identical configurations are answered from the result cache
+cache = ResultCache(
+    directory=os.environ.get('PYMOO_INTERACT_CACHE_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'results')),
+    max_entries=int(os.environ.get('PYMOO_INTERACT_CACHE_ENTRIES', 64)),
+    max_disk_bytes=int(os.environ.get('PYMOO_INTERACT_CACHE_BYTES', 1 << 30))
+)
+
+# Runs are sized from their configuration before they are queued: runs over the per-job limits
+# are rejected, the rest wait until the memory budget (half the machine by default) has room
+memory_budget = int(os.environ.get('PYMOO_INTERACT_MEMORY_BUDGET', 0)) or (physical_memory() or 0) // 2 or None
+limits = ResourceLimits(
+    job_memory=int(os.environ.get('PYMOO_INTERACT_JOB_MEMORY', 0)) or memory_budget,
+    job_seconds=float(os.environ.get('PYMOO_INTERACT_JOB_SECONDS', 0)) or None,
+    memory_budget=memory_budget,
+    large_scale_memory=int(os.environ.get('PYMOO_INTERACT_LARGE_SCALE_MEMORY', 512 * 2**20)),
+    max_n_gen=int(os.environ.get('PYMOO_INTERACT_MAX_N_GEN', MAX_N_GEN)),
+    max_hv_samples=int(os.environ.get('PYMOO_INTERACT_MAX_HV_SAMPLES', indicators.MAX_HV_SAMPLES))
+)
+
+# Completed runs are kept for later analysis, empty to disable
+run_store_dir = os.environ.get('PYMOO_INTERACT_RUN_STORE', os.path.join(os.path.dirname(__file__), 'runs'))
+run_store = RunStore(run_store_dir) if run_store_dir else None
+
+# Optimization runs execute on a process pool sized to the available cores, resuming from
+# checkpoints of shorter runs with the same configuration where possible
+jobs = JobManager(
+    max_workers=int(os.environ.get('PYMOO_INTERACT_WORKERS', 0)) or None,
+    cache=cache,
+    checkpoint_dir=os.environ.get('PYMOO_INTERACT_CHECKPOINT_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'checkpoints')),
+    # Requests can ask for a cProfile dump of their run while instrumentation is enabled
+    profile_dir=os.environ.get('PYMOO_INTERACT_PROFILE_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'profiles')) if instrumentation.enabled else None,
+    limits=limits,
+    run_store=run_store
+)
+
+def parse_run_config(data):
+    """Extract the OptimizationHandler arguments from a request payload"""
+    if not data:
+        raise ValueError('No data provided')
+
+    required_fields = ['problem', 'algorithm']
+    for field in required_fields:
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+
+    config = {
+        'problem_id': data['problem'],
+        'algorithm_id': data['algorithm'],
+        'n_var': int(data.get('n_var', 10)),
+        'n_obj': int(data.get('n_obj', 2)),
+        'pop_size': int(data.get('pop_size', 100)),
+        'n_gen': int(data.get('n_gen', 200)),
+    }
+    if data.get('hv_samples') is not None:
+        config['hv_samples'] = int(data['hv_samples'])
+        indicators.check_hv_samples(config['hv_samples'])
+    if 'early_stopping' in data:
+        config['early_stopping'] = parse_bool(data['early_stopping'])
+    if data.get('evaluator'):
+        config['evaluator'] = data['evaluator']
+    if data.get('n_workers') is not None:
+        n_workers = int(data['n_workers'])
+        if n_workers < 1:
+            raise ValueError(f'n_workers must be at least 1, got {n_workers}')
+        # More workers than the server allows would only fork more processes per run
+        config['n_workers'] = min(n_workers, evaluation.MAX_WORKERS)
+    if 'seed' in data:
+        config['seed'] = int(data['seed'])
+    if 'large_scale' in data:
+        config['large_scale'] = parse_bool(data['large_scale'])
+    if 'surrogate' in data:
+        config['surrogate'] = parse_bool(data['surrogate'])
+    if data.get('surrogate_evals'):
+        config['surrogate_evals'] = int(data['surrogate_evals'])
+    return config
+
+def parse_island_config(data, config):
+    """Add the island model settings of a request payload to a run configuration and validate them"""
+    config = dict(
+        config,
+        islands=int(data['islands']),
+        topology=data.get('topology', 'ring'),
+        migration_interval=int(data.get('migration_interval', islands.DEFAULT_INTERVAL)),
+        migration_rate=float(data.get('migration_rate', islands.DEFAULT_RATE))
+    )
+    islands.validate(config)
+    return config
+
+# Experiment grids are scheduled on the same worker pool
+experiments = ExperimentManager(jobs)
+
+# Interactive sessions keep their algorithm in this process, idle ones are spilled to disk
+sessions = SessionManager(
+    directory=os.environ.get('PYMOO_INTERACT_SESSION_DIR', os.path.join(os.path.dirname(__file__), '.cache', 'sessions')),
+    max_live=int(os.environ.get('PYMOO_INTERACT_SESSIONS', 16)),
+    idle_timeout=float(os.environ.get('PYMOO_INTERACT_SESSION_IDLE', 900)),
+    limits=limits
+)
+
+def submit_job(data, stream=False):
+    """Validate a run configuration and queue it on the worker pool"""
+    config = parse_run_config(data)
+
+    # Building the handler validates the problem/algorithm combination before queueing
+    OptimizationHandler(**config)
+
+    # Independent runs with consecutive seeds, merged into one archive once all have finished
+    restarts = int(data.get('restarts', 1))
+    if restarts != 1:
+        if stream or data.get('stream') or parse_bool(data.get('profile', False)):
+            raise ValueError('Runs with restarts can neither be streamed nor profiled')
+        if int(data.get('islands', 1)) != 1:
+            raise ValueError('Runs with restarts cannot be island runs')
+        return submit_restarts(jobs, config, restarts)
+
+    # One population split into islands that evolve in parallel and exchange migrants
+    if int(data.get('islands', 1)) != 1:
+        if stream or data.get('stream') or parse_bool(data.get('profile', False)):
+            raise ValueError('Island runs can neither be streamed nor profiled')
+        return jobs.submit(parse_island_config(data, config))
+
+    # Progress events carry the current front reduced to front_points, optionally as deltas
+    front = None
+    if data.get('front_points'):
+        front_points = int(data['front_points'])
+        if front_points < 1:
+            raise ValueError(f"front_points must be at least 1, got {front_points}")
+        front = FrontSampler(
+            front_points,
+            method=data.get('front_lod', 'crowding'),
+            deltas=parse_bool(data.get('front_deltas', False))
+        )
+
+    return jobs.submit(
+        config,
+        stream=stream or bool(data.get('stream')),
+        front=front,
+        profile=parse_bool(data.get('profile', False))
+    )
+
+def result_reducer(args):
+    """Level of detail requested with max_points (and lod), None for the full resolution"""
+    if not args.get('max_points'):
+        return None
+    max_points, method = int(args['max_points']), args.get('lod', 'crowding')
+    FrontSampler(max_points, method)  # Validate before the run
+    return lambda result: reduce_result(result, max_points, method)
+
+def result_response(payload):
+    """Encode a response holding a result in the format and compression the client accepts
+
+    Clients choose between JSON and the binary formats in encoding.FORMATS with the Accept header
+    (binary arrays default to float64, ?dtype=float32 halves them) and between gzip and zstd with
+    Accept-Encoding.
+    """
+    mimetype = request.accept_mimetypes.best_match(encoding.FORMATS, default=encoding.JSON)
+    try:
+        with instrumentation.span('serialize'):
+            body = encoding.encode(payload, mimetype, dtype=request.args.get('dtype'))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+    body, content_encoding = encoding.compress(body, request.accept_encodings.best_match(encoding.COMPRESSIONS))
+
+    response = Response(body, mimetype=mimetype)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+def event_stream(events):
+    """Wrap an SSE generator into a streaming response"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+PROBLEMS = registry.listing(registry.PROBLEMS)
+ALGORITHMS = registry.listing(registry.ALGORITHMS)
+
+# Objective counts offered by the UI for each problem
+PROBLEM_OBJECTIVES = {key: spec["objectives"] for key, spec in registry.PROBLEMS.items()}
+
+def warm_artifacts():
+    """Precompute the reference directions and fronts of every configuration the UI offers"""
+    artifacts.warm([
+        (problem["id"], 10, n_obj, reference_partitions(n_obj))
+        for problem in PROBLEMS
+        for n_obj in PROBLEM_OBJECTIVES[problem["id"]]
+    ])
 
 @app.route('/api/problems', methods=['GET'])
 def get_problems():
     """Get list of available optimization problems"""
-    problems = [
-        {"id": "zdt1", "name": "ZDT1", "description": "ZDT1 benchmark problem"},
-        {"id": "zdt2", "name": "ZDT2", "description": "ZDT2 benchmark problem"},
-        {"id": "dtlz1", "name": "DTLZ1", "description": "DTLZ1 benchmark problem"},
-        {"id": "dtlz2", "name": "DTLZ2", "description": "DTLZ2 benchmark problem"}
-    ]
-    return jsonify(problems)
+    return jsonify(PROBLEMS)
 
 @app.route('/api/algorithms', methods=['GET'])
 def get_algorithms():
     """Get list of available optimization algorithms"""
-    algorithms = [
-        {"id": "nsga2", "name": "NSGA-II", "description": "Non-dominated Sorting Genetic Algorithm II"},
-        {"id": "moead", "name": "MOEA/D", "description": "Multi-objective Evolutionary Algorithm based on Decomposition"},
-        {"id": "nsga3", "name": "NSGA-III", "description": "Non-dominated Sorting Genetic Algorithm III"}
-    ]
-    return jsonify(algorithms)
+    return jsonify(ALGORITHMS)
 
 @app.route('/api/optimize', methods=['POST'])
 def optimize():
     """Handle optimization request"""
     try:
         data = request.json
-        if not data:
-            return jsonify({
-                'status': 'error',
-                'message': 'No data provided'
-            }), 400
+        reduce = result_reducer(data or {})
+        job = submit_job(data)
 
-        required_fields = ['problem', 'algorithm']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Missing required field: {field}'
-                }), 400
-
-        # Create optimization handler with parameters
-        handler = OptimizationHandler(
-            problem_id=data['problem'],
-            algorithm_id=data['algorithm'],
-            n_var=int(data.get('n_var', 10)),
-            n_obj=int(data.get('n_obj', 2)),
-            pop_size=int(data.get('pop_size', 100)),
-            n_gen=int(data.get('n_gen', 200))
-        )
+        # Asynchronous clients get the job id right away and poll for the result
+        if data.get('async'):
+            return jsonify({
+                'status': 'accepted',
+                'job_id': job.id
+            }), 202
 
         # Run optimization
-        result = handler.run()
+        result = job.result()
+        if reduce is not None:
+            result = reduce(result)
 
-        return jsonify({
+        response = result_response({
             'status': 'success',
+            'cached': job.cached,
             'data': result
         })
+        if job.profile_path:
+            response.headers['X-Profile'] = f'/api/jobs/{job.id}/profile'
+        return response
 
     except ValueError as e:
         return jsonify({
@@ -80,5 +304,500 @@ def optimize():
             'traceback': traceback.format_exc()
         }), 400
 
+@app.route('/api/optimize/stream', methods=['GET', 'POST'])
+def optimize_stream():
+    """Run an optimization and stream per-generation progress as Server-Sent Events"""
+    try:
+        # EventSource can only issue GET requests, so also accept the config as query parameters
+        data = request.json if request.method == 'POST' else request.args.to_dict()
+        reduce = result_reducer(data or {})
+        job = submit_job(data, stream=True)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+    def events():
+        try:
+            yield from stream_job_events(job, reduce=reduce)
+        except GeneratorExit:
+            # The client went away, so nobody is waiting for this run anymore
+            jobs.cancel(job.id)
+            raise
+
+    return event_stream(events())
+
+@app.route('/api/estimate', methods=['POST'])
+def estimate_run():
+    """Estimate the memory and time of a run without queueing it"""
+    try:
+        config = parse_run_config(request.json)
+        if int(request.json.get('islands', 1)) != 1:
+            config = parse_island_config(request.json, config)
+        config, usage = limits.plan(config)
+        return jsonify({
+            'status': 'success',
+            'config': config,
+            'estimate': usage,
+            'limits': limits.to_dict()
+        })
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError',
+            'limits': limits.to_dict()
+        }), 400
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue an optimization run and return its job id"""
+    try:
+        job = submit_job(request.json)
+        return jsonify({
+            'status': 'accepted',
+            'job_id': job.id
+        }), 202
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Get the status of all known jobs"""
+    return jsonify([job.to_dict() for job in jobs.list()])
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of a single job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job: {job_id}'
+        }), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job: {job_id}'
+        }), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    """Stream the progress of a job submitted with "stream": true"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job: {job_id}'
+        }), 404
+    if job.progress is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Job {job_id} was not submitted for streaming'
+        }), 400
+    return event_stream(stream_job_events(job))
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Fetch the result of a finished job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job: {job_id}'
+        }), 404
+
+    status = job.status
+    if status in ('queued', 'running'):
+        return jsonify(job.to_dict()), 202
+    if status == 'cancelled':
+        return jsonify(job.to_dict()), 409
+    if status == 'failed':
+        return jsonify({
+            'status': 'error',
+            'message': job.error(),
+            'type': 'Exception'
+        }), 400
+
+    try:
+        reduce = result_reducer(request.args)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+    try:
+        result = job.result()
+    except CancelledError:
+        return jsonify(job.to_dict()), 409
+
+    if reduce is not None:
+        result = reduce(result)
+    return result_response({
+        'status': 'success',
+        'data': result
+    })
+
+@app.route('/api/jobs/<job_id>/profile', methods=['GET'])
+def get_job_profile(job_id):
+    """Download the cProfile stats of a job submitted with "profile": true
+
+    The .prof file loads into pstats or snakeviz, ?format=text returns the top functions by
+    cumulative time instead.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown job: {job_id}'
+        }), 404
+    if not job.profile_path:
+        return jsonify({
+            'status': 'error',
+            'message': f'Job {job_id} was not submitted for profiling'
+        }), 400
+    if not job.done:
+        return jsonify(job.to_dict()), 202
+    if not os.path.exists(job.profile_path):
+        return jsonify({
+            'status': 'error',
+            'message': f'No profile was written for job {job_id}'
+        }), 404
+
+    if request.args.get('format') == 'text':
+        out = io.StringIO()
+        stats = pstats.Stats(job.profile_path, stream=out)
+        stats.sort_stats('cumulative').print_stats(int(request.args.get('limit', 50)))
+        return Response(out.getvalue(), mimetype='text/plain')
+
+    with open(job.profile_path, 'rb') as f:
+        return Response(f.read(), mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename={job_id}.prof'
+        })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics of the server and its worker processes"""
+    if not instrumentation.enabled:
+        return jsonify({
+            'status': 'error',
+            'message': 'Instrumentation is disabled, set PYMOO_INTERACT_INSTRUMENTATION=1 to enable it'
+        }), 404
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
+
+def parse_time(value):
+    """Unix timestamp from a number or an ISO 8601 date such as 2024-05-01 or 2024-05-01T12:00"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f'Invalid date: {value}')
+
+def run_store_disabled():
+    return jsonify({
+        'status': 'error',
+        'message': 'The run store is disabled, set PYMOO_INTERACT_RUN_STORE to enable it'
+    }), 404
+
+@app.route('/api/runs', methods=['GET'])
+def list_runs():
+    """List stored runs, filtered by problem, algorithm, n_obj, date and final HV, one page at a time"""
+    if run_store is None:
+        return run_store_disabled()
+
+    def arg(name, cast):
+        return cast(request.args[name]) if request.args.get(name) else None
+
+    try:
+        offset = arg('offset', int) or 0
+        total, runs = run_store.query(
+            problem=request.args.get('problem'),
+            algorithm=request.args.get('algorithm'),
+            n_obj=arg('n_obj', int),
+            since=arg('since', parse_time),
+            until=arg('until', parse_time),
+            min_hv=arg('min_hv', float),
+            max_hv=arg('max_hv', float),
+            sort=request.args.get('sort', 'created_at'),
+            descending=request.args.get('order', 'desc') != 'asc',
+            limit=arg('limit', int),
+            offset=offset
+        )
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+    return jsonify({
+        'status': 'success',
+        'total': total,
+        'offset': offset,
+        'runs': runs
+    })
+
+@app.route('/api/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    """Fetch a stored run with its final front, memory-mapped from the run store"""
+    if run_store is None:
+        return run_store_disabled()
+    stored = run_store.get(run_id)
+    if stored is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown run: {run_id}'
+        }), 404
+
+    try:
+        reduce = result_reducer(request.args)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+    run, result = stored
+    if reduce is not None:
+        result = reduce(result)
+    return result_response({
+        'status': 'success',
+        'run': run,
+        'data': result
+    })
+
+@app.route('/api/runs/<run_id>', methods=['DELETE'])
+def delete_run(run_id):
+    """Remove a run from the run store"""
+    if run_store is None:
+        return run_store_disabled()
+    if not run_store.delete(run_id):
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown run: {run_id}'
+        }), 404
+    return jsonify({'status': 'success', 'run_id': run_id})
+
+@app.route('/api/experiments', methods=['POST'])
+def create_experiment():
+    """Run a grid of problems x algorithms x parameters x seeds"""
+    try:
+        if not request.json:
+            raise ValueError('No data provided')
+        experiment = experiments.submit(request.json)
+        return jsonify({
+            'status': 'accepted',
+            'experiment_id': experiment.id,
+            'n_runs': len(experiment.jobs),
+            'skipped': experiment.skipped
+        }), 202
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+@app.route('/api/experiments/<experiment_id>', methods=['GET'])
+def get_experiment(experiment_id):
+    """Get the progress of an experiment and, once finished, its aggregated statistics"""
+    experiment = experiments.get(experiment_id)
+    if experiment is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown experiment: {experiment_id}'
+        }), 404
+
+    info = experiment.to_dict()
+    if request.args.get('runs') and experiment.done:
+        info['runs'] = experiment.runs()
+    return jsonify(info)
+
+@app.route('/api/experiments/<experiment_id>', methods=['DELETE'])
+def cancel_experiment(experiment_id):
+    """Cancel all unfinished runs of an experiment"""
+    experiment = experiments.cancel(experiment_id)
+    if experiment is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown experiment: {experiment_id}'
+        }), 404
+    return jsonify(experiment.to_dict())
+
+def unknown_session(session_id):
+    return jsonify({
+        'status': 'error',
+        'message': f'Unknown session: {session_id}'
+    }), 404
+
+def parse_session_params(data):
+    """The session parameters to change in a request payload, unknown ones are left for the session to reject"""
+    if not data:
+        raise ValueError('No data provided')
+    params = dict(data)
+    for name in ('pop_size', 'n_gen', 'surrogate_evals'):
+        if name in params:
+            params[name] = int(params[name])
+    if 'early_stopping' in params:
+        params['early_stopping'] = parse_bool(params['early_stopping'])
+    return params
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """Start an interactive session and evaluate its initial population"""
+    try:
+        session = sessions.create(parse_run_config(request.json))
+        return jsonify({
+            'status': 'success',
+            'session': session.to_dict()
+        }), 201
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'type': 'ValueError'
+        }), 400
+
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    """Get the state of all sessions, live and spilled"""
+    return jsonify(sessions.list())
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Get the state of a session"""
+    session = sessions.get(session_id)
+    if session is None:
+        return unknown_session(session_id)
+    return jsonify(session.to_dict())
+
+@app.route('/api/sessions/<session_id>', methods=['PATCH'])
+def update_session(session_id):
+    """Change pop_size, n_gen, early_stopping or surrogate_evals, also while the session is running"""
+    with sessions.use(session_id) as session:
+        if session is None:
+            return unknown_session(session_id)
+        try:
+            sessions.update(session, parse_session_params(request.json))
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'type': 'ValueError',
+                'mutable': list(SESSION_PARAMS)
+            }), 400
+        return jsonify(session.to_dict())
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """Stop a session and discard its state"""
+    if not sessions.delete(session_id):
+        return unknown_session(session_id)
+    return jsonify({'status': 'success', 'session_id': session_id})
+
+@app.route('/api/sessions/<session_id>/step', methods=['POST'])
+def step_session(session_id):
+    """Run a number of generations and return the session's result"""
+    with sessions.use(session_id) as session:
+        if session is None:
+            return unknown_session(session_id)
+        try:
+            data = request.get_json(silent=True) or {}
+            reduce = result_reducer(data)
+            records = session.step(int(data.get('generations', 1)))
+            result = session.result()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'type': 'ValueError'
+            }), 400
+        except Exception as e:
+            print("Error during session step:", traceback.format_exc())
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'type': 'Exception',
+                'traceback': traceback.format_exc()
+            }), 400
+
+        if reduce is not None:
+            result = reduce(result)
+        return result_response({
+            'status': 'success',
+            'generations': len(records),
+            'session': session.to_dict(),
+            'data': result
+        })
+
+@app.route('/api/sessions/<session_id>/resume', methods=['POST'])
+def resume_session(session_id):
+    """Keep running a session in the background until it is paused or finished"""
+    with sessions.use(session_id) as session:
+        if session is None:
+            return unknown_session(session_id)
+        try:
+            session.resume()
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'type': 'ValueError'
+            }), 400
+        return jsonify(session.to_dict()), 202
+
+@app.route('/api/sessions/<session_id>/pause', methods=['POST'])
+def pause_session(session_id):
+    """Stop a running session after its current generation"""
+    with sessions.use(session_id) as session:
+        if session is None:
+            return unknown_session(session_id)
+        session.pause()
+        return jsonify(session.to_dict())
+
+@app.route('/api/sessions/<session_id>/result', methods=['GET'])
+def get_session_result(session_id):
+    """Fetch the current front and history of a session, also while it is running"""
+    with sessions.use(session_id) as session:
+        if session is None:
+            return unknown_session(session_id)
+        try:
+            reduce = result_reducer(request.args)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'type': 'ValueError'
+            }), 400
+
+        result = session.result()
+        if reduce is not None:
+            result = reduce(result)
+        return result_response({
+            'status': 'success',
+            'session': session.to_dict(),
+            'data': result
+        })
+
 if __name__ == '__main__':
+    threading.Thread(target=warm_artifacts, daemon=True).start()
     app.run(debug=True)
@@ -0,0 +1,68 @@
+"""Compare the memory used for per-generation history: pymoo save_history vs MetricsRecorder
+
+Run from the backend directory:
+
+    python -m benchmarks.history_memory --pop-size 500 --n-gen 200
+"""
+import argparse
+import time
+import tracemalloc
+
+from pymoo.optimize import minimize
+
+from optimization.optimizer import OptimizationHandler
+
+
+def measure(fn):
+    """Return the result, peak traced memory in bytes and wall time of calling fn"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def run_with_save_history(handler):
+    """The pre-recorder approach: keep a deep copy of the algorithm for every generation"""
+    return minimize(
+        problem=handler.problem,
+        algorithm=handler.algorithm,
+        termination=('n_gen', handler.n_gen),
+        seed=1,
+        save_history=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--problem', default='zdt1')
+    parser.add_argument('--algorithm', default='nsga2')
+    parser.add_argument('--n-var', type=int, default=30)
+    parser.add_argument('--n-obj', type=int, default=2)
+    parser.add_argument('--pop-size', type=int, default=500)
+    parser.add_argument('--n-gen', type=int, default=200)
+    args = parser.parse_args()
+
+    def make_handler():
+        return OptimizationHandler(
+            problem_id=args.problem,
+            algorithm_id=args.algorithm,
+            n_var=args.n_var,
+            n_obj=args.n_obj,
+            pop_size=args.pop_size,
+            n_gen=args.n_gen
+        )
+
+    _, history_peak, history_time = measure(lambda: run_with_save_history(make_handler()))
+    _, recorder_peak, recorder_time = measure(lambda: make_handler().run())
+
+    print(f"{'mode':<14}{'peak memory':>16}{'wall time':>12}")
+    print(f"{'save_history':<14}{history_peak / 2**20:>13.1f} MB{history_time:>11.2f}s")
+    print(f"{'recorder':<14}{recorder_peak / 2**20:>13.1f} MB{recorder_time:>11.2f}s")
+    print(f"reduction: {history_peak / max(recorder_peak, 1):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Wall time and front quality of island runs against a single population of the same size
+
+Run from the backend directory:
+
+    python -m benchmarks.islands --pop-size 2000 --n-gen 50 --islands 2,4,8
+
+Every configuration splits the same total population into more islands. The single run is
+the baseline of the speedup; islands cost less than their share of it on top of running in
+parallel, since survival grows quadratically with the population. Speedups only show up with
+at least as many free cores as islands, the core count is printed first.
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+from pymoo.config import Config
+
+from optimization.optimizer import OptimizationHandler
+from optimization.islands import run_islands, validate
+
+Config.warnings['not_compiled'] = False
+
+
+def parse_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--problem', default='dtlz2')
+    parser.add_argument('--algorithm', default='nsga3')
+    parser.add_argument('--n-obj', type=int, default=3)
+    parser.add_argument('--n-var', type=int, default=12)
+    parser.add_argument('--pop-size', type=int, default=1000)
+    parser.add_argument('--n-gen', type=int, default=50)
+    parser.add_argument('--islands', type=parse_list, default=[2, 4, 8])
+    parser.add_argument('--interval', type=int, default=10)
+    args = parser.parse_args()
+
+    config = {
+        'problem_id': args.problem, 'algorithm_id': args.algorithm, 'n_var': args.n_var, 'n_obj': args.n_obj,
+        'pop_size': args.pop_size, 'n_gen': args.n_gen, 'early_stopping': False,
+    }
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"{cores} cores available\n")
+
+    handler = OptimizationHandler(**config)
+    start = time.perf_counter()
+    single = handler.run(verbose=False)
+    baseline = time.perf_counter() - start
+
+    print(f"{'islands':>7}{'wall':>10}{'CPU':>10}{'speedup':>9}{'HV':>10}{'points':>8}")
+    print(f"{1:>7}{baseline:>9.2f}s{baseline:>9.2f}s{1:>8.2f}x{single['history'][-1]['hv']:>10.4f}"
+          f"{len(np.atleast_2d(single['F'])):>8}")
+    for islands in args.islands:
+        island_run = dict(config, islands=islands, migration_interval=args.interval)
+        validate(island_run)
+        start = time.perf_counter()
+        result = run_islands(island_run)
+        wall = time.perf_counter() - start
+        info = result['islands']
+        print(f"{islands:>7}{wall:>9.2f}s{info['cpu_time']:>9.2f}s{baseline / wall:>8.2f}x"
+              f"{info['archive']['hv']:>10.4f}{info['archive']['n_points']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,449 @@
+"""Load test of the API: concurrent clients against a local server, with latency and server usage over time
+
+Run from the backend directory (or via `python cli.py load`):
+
+    python -m benchmarks.load --server dev --concurrency 32 --duration 60 --output dev.json
+    python -m benchmarks.load --server gunicorn --workers 2 --threads 16 --concurrency 32 --output gunicorn.json
+    python -m benchmarks.load --compare dev.json gunicorn.json
+    python -m benchmarks.load --server gunicorn --baseline gunicorn.json --threshold 0.2
+
+The server is started on a free local port, with the result cache kept in memory and the run
+store, checkpoints and spilled sessions disabled, so every load test starts from the same state.
+--url targets a running server instead (add --pid to sample its usage). --concurrency clients
+send requests back to back for --duration seconds, each picking the next one at random from
+the weighted mix: by default the problem and algorithm listings and small synchronous
+optimizations, which get a new seed per request so they miss the result cache like distinct
+users' runs. --mix takes a JSON list of entries shaped like DEFAULT_MIX.
+
+The report lists throughput, latency percentiles and errors overall and per entry of the mix,
+and per --interval the completed requests, their p95, and the CPU and RSS of the server with
+all its child processes (Linux only). Requests started during --warmup are left out of the
+statistics. Save reports with --output and put several side by side with --compare; with
+--baseline the command exits with status 1 if throughput or latency regressed by more than
+the threshold.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from collections import Counter
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = [
+    {'name': 'problems', 'method': 'GET', 'path': '/api/problems', 'weight': 4},
+    {'name': 'algorithms', 'method': 'GET', 'path': '/api/algorithms', 'weight': 3},
+    {'name': 'optimize', 'method': 'POST', 'path': '/api/optimize', 'weight': 3,
+     'json': {'problem': 'zdt1', 'algorithm': 'nsga2', 'pop_size': 40, 'n_gen': 20, 'early_stopping': False},
+     'vary_seed': True},
+]
+
+# Summary measurements compared against the baseline: whether higher is better, and the
+# smallest change worth reporting
+COMPARED = {
+    'throughput': (True, 0.5),  # requests per second
+    'p50': (False, 0.005),  # seconds
+    'p95': (False, 0.01),
+    'p99': (False, 0.02),
+    'error_rate': (False, 0.001),
+}
+
+# Development server without the reloader, which would run the app in a second process
+DEV_SERVER = "import sys, app; app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_environment(args):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, PYMOO_INTERACT_RUN_STORE='', PYMOO_INTERACT_CACHE_DIR='',
+               PYMOO_INTERACT_CHECKPOINT_DIR='', PYMOO_INTERACT_SESSION_DIR='')
+    if args.job_workers:
+        env['PYMOO_INTERACT_WORKERS'] = str(args.job_workers)
+    return env
+
+
+def start_server(args, port, log):
+    """Start the app in the configured serving mode and return its process"""
+    if args.server == 'gunicorn':
+        command = [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+                   '--threads', str(args.threads), '--graceful-timeout', '10']
+        if args.job_workers:
+            command += ['--job-workers', str(args.job_workers)]
+    else:
+        command = [sys.executable, '-c', DEV_SERVER, str(port)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=server_environment(args), stdout=log,
+                            stderr=subprocess.STDOUT)
+
+
+def wait_ready(url, process, timeout):
+    """Seconds until the server answers /api/problems"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"The server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(url + '/api/problems', timeout=5) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.2)
+    raise RuntimeError(f"The server did not answer within {timeout:.0f}s")
+
+
+def stop_server(process, timeout=30):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _stat(pid):
+    """(parent pid, CPU ticks, RSS pages) of a process from /proc"""
+    with open(f'/proc/{pid}/stat') as f:
+        # The command name in parentheses may contain spaces
+        fields = f.read().rsplit(')', 1)[1].split()
+    return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21])
+
+
+class UsageSampler:
+    """CPU and RSS of a process and all its descendants, from /proc (Linux only)
+
+    CPU time of children that exited between two samples is not counted, which matters little
+    for servers whose worker processes live as long as the server.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.available = pid is not None and os.path.exists(f'/proc/{pid}/stat')
+        self.ticks = os.sysconf('SC_CLK_TCK') if self.available else None
+        self.page = os.sysconf('SC_PAGE_SIZE') if self.available else None
+        self._last = None
+
+    def _tree(self):
+        stats = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    stats[int(entry)] = _stat(entry)
+                except (OSError, ValueError, IndexError):
+                    continue  # Exited meanwhile
+        tree, todo = [], [self.pid]
+        while todo:
+            pid = todo.pop()
+            if pid in stats:
+                tree.append(stats[pid])
+                todo.extend(child for child, (parent, _, _) in stats.items() if parent == pid)
+        return tree
+
+    def sample(self):
+        """CPU percent since the previous sample (of one core), RSS in MiB and process count"""
+        if not self.available:
+            return None
+        tree = self._tree()
+        now, cpu = time.perf_counter(), sum(ticks for _, ticks, _ in tree) / self.ticks
+        percent = None
+        if self._last is not None:
+            percent = max(0.0, (cpu - self._last[1]) / (now - self._last[0]) * 100)
+        self._last = (now, cpu)
+        return {'cpu_percent': percent, 'rss_mb': sum(rss for _, _, rss in tree) * self.page / 2**20,
+                'processes': len(tree)}
+
+
+def send(url, entry, seed, timeout):
+    """Send one request of the mix, return (status, error)"""
+    data, headers = None, {}
+    if entry.get('json') is not None:
+        payload = dict(entry['json'], seed=seed) if entry.get('vary_seed') else entry['json']
+        data, headers = json.dumps(payload).encode(), {'Content-Type': 'application/json'}
+    request = urllib.request.Request(url + entry['path'], data=data, headers=headers,
+                                     method=entry.get('method', 'POST' if data else 'GET'))
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            # Latency includes transferring the whole body
+            response.read()
+            return response.status, None
+    except urllib.error.HTTPError as e:
+        return e.code, f"HTTP {e.code}"
+    except (urllib.error.URLError, ConnectionError, socket.timeout) as e:
+        return None, type(getattr(e, 'reason', e)).__name__
+
+
+def run_clients(url, mix, concurrency, duration, timeout, seed=1):
+    """Send requests from concurrency threads for duration seconds
+
+    Returns (name, start, end, status, error) for every request, with times relative to the
+    start of the test.
+    """
+    weights = [entry.get('weight', 1) for entry in mix]
+    records, lock = [], threading.Lock()
+    seeds = iter(range(seed, sys.maxsize))
+    start = time.perf_counter()
+
+    def client(index):
+        rng = random.Random(seed + index)
+        while time.perf_counter() - start < duration:
+            entry = rng.choices(mix, weights)[0]
+            with lock:
+                request_seed = next(seeds)
+            sent = time.perf_counter() - start
+            status, error = send(url, entry, request_seed, timeout)
+            with lock:
+                records.append((entry['name'], sent, time.perf_counter() - start, status, error))
+
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def statistics(records, seconds):
+    """Throughput, latency percentiles and errors of a list of records"""
+    if not records:
+        return {'requests': 0}
+    latency = np.array([end - sent for _, sent, end, _, _ in records])
+    errors = Counter(error for *_, error in records if error is not None)
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+    return {
+        'requests': len(records),
+        'throughput': len(records) / seconds,
+        'mean': float(latency.mean()),
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
+        'max': float(latency.max()),
+        'errors': sum(errors.values()),
+        'error_rate': sum(errors.values()) / len(records),
+        'error_types': dict(errors),
+        'status': dict(Counter(str(status) for *_, status, _ in records)),
+    }
+
+
+def timeline(records, samples, interval):
+    """Completed requests, errors and p95 latency per interval, next to the server usage sampled then"""
+    rows = []
+    for index, (at, usage) in enumerate(samples):
+        done = [end - sent for _, sent, end, _, error in records if at - interval <= end < at]
+        failed = sum(1 for _, _, end, _, error in records if at - interval <= end < at and error is not None)
+        rows.append(dict(
+            {'time': at, 'requests': len(done), 'errors': failed,
+             'p95': float(np.percentile(done, 95)) if done else None},
+            **(usage or {})
+        ))
+    return rows
+
+
+def load_test(args, url, pid):
+    """Run the clients while sampling the server, and return the report"""
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix) as f:
+            mix = json.load(f)
+
+    sampler, samples, done = UsageSampler(pid), [], threading.Event()
+    sampler.sample()
+    start = time.perf_counter()
+
+    def sample():
+        while not done.wait(args.interval):
+            samples.append((time.perf_counter() - start, sampler.sample()))
+
+    thread = threading.Thread(target=sample, daemon=True)
+    thread.start()
+    records = run_clients(url, mix, args.concurrency, args.warmup + args.duration, args.timeout, args.seed)
+    done.set()
+    thread.join()
+
+    # Requests still in flight at the end ran longer than the test, they count until they finished
+    measured = [record for record in records if record[1] >= args.warmup]
+    seconds = max([args.duration] + [end - args.warmup for _, _, end, _, _ in measured])
+    usage = [row for _, row in samples if row is not None and row['cpu_percent'] is not None]
+    summary = statistics(measured, seconds)
+    if usage:
+        summary['cpu_percent'] = float(np.mean([row['cpu_percent'] for row in usage]))
+        summary['peak_rss_mb'] = max(row['rss_mb'] for row in usage)
+    return {
+        'summary': summary,
+        'endpoints': {entry['name']: statistics([record for record in measured if record[0] == entry['name']], seconds)
+                      for entry in mix},
+        'timeline': timeline(records, samples, args.interval),
+        'mix': mix,
+    }
+
+
+def revision():
+    """Commit of the working tree, so reports can be told apart by release"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    summary = report['summary']
+    print(f"\n{'request':<14}{'count':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+    for name, stats in list(report['endpoints'].items()) + [('all', summary)]:
+        if not stats['requests']:
+            print(f"{name:<14}{0:>8}")
+            continue
+        print(f"{name:<14}{stats['requests']:>8}{stats['throughput']:>9.1f}{stats['p50'] * 1000:>9.0f}"
+              f"{stats['p95'] * 1000:>9.0f}{stats['p99'] * 1000:>9.0f}{stats['max'] * 1000:>9.0f}"
+              f"{stats['error_rate']:>8.1%}")
+    if summary.get('error_types'):
+        print(f"Errors: {', '.join(f'{error} x{count}' for error, count in summary['error_types'].items())}")
+
+    print(f"\n{'time s':>7}{'req':>6}{'errors':>8}{'p95 ms':>9}{'CPU %':>8}{'RSS MB':>9}{'procs':>7}")
+    for row in report['timeline']:
+        cpu = f"{row['cpu_percent']:>8.0f}" if row.get('cpu_percent') is not None else f"{'-':>8}"
+        rss = f"{row['rss_mb']:>9.0f}{row['processes']:>7}" if 'rss_mb' in row else f"{'-':>9}{'-':>7}"
+        p95 = f"{row['p95'] * 1000:>9.0f}" if row['p95'] is not None else f"{'-':>9}"
+        print(f"{row['time']:>7.1f}{row['requests']:>6}{row['errors']:>8}{p95}{cpu}{rss}")
+
+
+def print_comparison(paths):
+    """Summaries of saved reports side by side"""
+    reports = []
+    for path in paths:
+        with open(path) as f:
+            reports.append(json.load(f))
+    rows = [
+        ('label', lambda r: r.get('label') or '-'),
+        ('revision', lambda r: r.get('revision') or '-'),
+        ('server', lambda r: r['server']['mode'] if r['server']['mode'] != 'gunicorn'
+            else f"gunicorn {r['server']['workers']}x{r['server']['threads']}"),
+        ('concurrency', lambda r: r['load']['concurrency']),
+        ('requests', lambda r: r['summary']['requests']),
+        ('req/s', lambda r: f"{r['summary']['throughput']:.1f}"),
+        ('p50 ms', lambda r: f"{r['summary']['p50'] * 1000:.0f}"),
+        ('p95 ms', lambda r: f"{r['summary']['p95'] * 1000:.0f}"),
+        ('p99 ms', lambda r: f"{r['summary']['p99'] * 1000:.0f}"),
+        ('errors', lambda r: f"{r['summary']['error_rate']:.1%}"),
+        ('CPU %', lambda r: f"{r['summary']['cpu_percent']:.0f}" if 'cpu_percent' in r['summary'] else '-'),
+        ('peak RSS MB', lambda r: f"{r['summary']['peak_rss_mb']:.0f}" if 'peak_rss_mb' in r['summary'] else '-'),
+        ('cores', lambda r: r['environment']['cpu_count']),
+    ]
+    width = max(16, *(len(os.path.basename(path)) + 2 for path in paths))
+    print(f"{'':<14}" + ''.join(f"{os.path.basename(path):>{width}}" for path in paths))
+    for name, value in rows:
+        print(f"{name:<14}" + ''.join(f"{str(value(report)):>{width}}" for report in reports))
+
+
+def compare(report, baseline, threshold):
+    """Return (request, measure, before, after) for every summary measurement that regressed"""
+    regressions = []
+    pairs = [('all', report['summary'], baseline['summary'])]
+    pairs += [(name, stats, baseline['endpoints'][name]) for name, stats in report['endpoints'].items()
+              if name in baseline.get('endpoints', {})]
+    for name, stats, before in pairs:
+        if not stats.get('requests') or not before.get('requests'):
+            continue
+        for measure, (higher_is_better, min_change) in COMPARED.items():
+            old, new = before[measure], stats[measure]
+            change = old - new if higher_is_better else new - old
+            if change > min_change and change > old * threshold:
+                regressions.append((name, measure, old, new))
+    return regressions
+
+
+def main(argv=None):
+    from benchmarks.suite import environment
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=('dev', 'gunicorn'), default='gunicorn', help='serving mode to start')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn HTTP workers')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per HTTP worker')
+    parser.add_argument('--job-workers', type=int, help='optimization processes (default: the server default)')
+    parser.add_argument('--url', help='load test a running server instead of starting one')
+    parser.add_argument('--pid', type=int, help='process id of the server given with --url, to sample its usage')
+    parser.add_argument('--mix', help='JSON file with the weighted requests to send, see DEFAULT_MIX')
+    parser.add_argument('--concurrency', type=int, default=16, help='clients sending requests at the same time')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of load before measuring')
+    parser.add_argument('--interval', type=float, default=1, help='seconds between server usage samples')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds a request may take')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=1, help='seed of the request order and the first run')
+    parser.add_argument('--label', help='name of this configuration in --compare tables')
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--compare', nargs='+', metavar='REPORT', help='print saved reports side by side and exit')
+    parser.add_argument('--baseline', help='compare against a previous report')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative change reported as regression')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print_comparison(args.compare)
+        return 0
+
+    process, log = None, None
+    url, pid = args.url and args.url.rstrip('/'), args.pid
+    if url is None:
+        log = tempfile.NamedTemporaryFile('w+', prefix='load-server-', suffix='.log', delete=False)
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        print(f"Starting the {args.server} server on port {port} (log: {log.name})...")
+        process = start_server(args, port, log)
+        pid = process.pid
+    try:
+        startup = wait_ready(url, process, args.startup_timeout)
+        print(f"Ready after {startup:.1f}s. {args.concurrency} clients for {args.warmup:.0f}s of warm-up "
+              f"and {args.duration:.0f}s of measurement...")
+        report = load_test(args, url, pid)
+    except RuntimeError:
+        if log is not None:
+            log.seek(0)
+            print(''.join(log.readlines()[-20:]), file=sys.stderr)
+        raise
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report.update({
+        'label': args.label,
+        'revision': revision(),
+        'environment': environment(),
+        'server': {'mode': 'external' if args.url else args.server, 'url': args.url, 'workers': args.workers,
+                   'threads': args.threads, 'job_workers': args.job_workers, 'startup_seconds': startup},
+        'load': {'concurrency': args.concurrency, 'duration': args.duration, 'warmup': args.warmup,
+                 'timeout': args.timeout, 'seed': args.seed},
+    })
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold:.0%}:")
+            for name, measure, old, new in regressions:
+                print(f"  {name:<14}{measure:<12}{old:>10.3f} -> {new:.3f}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
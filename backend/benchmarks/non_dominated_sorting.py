@@ -0,0 +1,79 @@
+"""Compare pymoo's non-dominated sorting with optimization.sorting
+
+Run from the backend directory:
+
+    python -m benchmarks.non_dominated_sorting --sizes 200,1000,4000 --n-obj 2,3,5
+
+Populations are random points and points scattered around a DTLZ2-like sphere, sorted the
+way survival sorts them (stopping once half of the points are ranked). Every result is
+checked against pymoo's fronts. pymoo's sort is skipped above --pymoo-max-points because its
+Python loop takes minutes there.
+"""
+import argparse
+import time
+
+import numpy as np
+from pymoo.config import Config
+from pymoo.util.nds.non_dominated_sorting import NonDominatedSorting
+
+from optimization.sorting import FastNonDominatedSorting, choose_strategy
+
+Config.warnings['not_compiled'] = False
+
+
+def populations(n_points, n_obj, seed=1):
+    """Uniform random points and points close to a spherical front"""
+    rng = np.random.default_rng(seed)
+    directions = np.abs(rng.normal(size=(n_points, n_obj)))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    sphere = directions * (1 + rng.exponential(0.1, size=(n_points, 1)))
+    return {'uniform': rng.random((n_points, n_obj)), 'sphere': sphere}
+
+
+def timed(fn, repeat):
+    """Return the result and the median wall time of calling fn repeat times"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, float(np.median(times))
+
+
+def same_fronts(a, b):
+    return len(a) == len(b) and all(np.array_equal(np.sort(x), np.sort(y)) for x, y in zip(a, b))
+
+
+def parse_list(cast):
+    return lambda value: [cast(item) for item in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=parse_list(int), default=[200, 1000, 2000, 5000, 10000])
+    parser.add_argument('--n-obj', type=parse_list(int), default=[2, 3, 5])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pymoo-max-points', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'n_obj':>5}{'points':>8}  {'population':<12}{'strategy':<11}{'fronts':>7}{'pymoo':>12}{'fast':>12}{'speedup':>9}")
+    for n_obj in args.n_obj:
+        for n_points in args.sizes:
+            for name, F in populations(n_points, n_obj).items():
+                n_stop = n_points // 2
+                fronts, fast = timed(lambda: FastNonDominatedSorting().do(F, n_stop_if_ranked=n_stop), args.repeat)
+
+                reference, slow = None, None
+                if n_points <= args.pymoo_max_points:
+                    reference, slow = timed(lambda: NonDominatedSorting().do(F, n_stop_if_ranked=n_stop), 1)
+                    if not same_fronts(fronts, reference):
+                        raise AssertionError(f"Fronts differ from pymoo for {name} n_obj={n_obj} points={n_points}")
+
+                pymoo_column = f"{slow * 1000:>9.1f} ms" if slow is not None else f"{'-':>12}"
+                speedup = f"{slow / fast:>8.0f}x" if slow is not None else f"{'-':>9}"
+                print(f"{n_obj:>5}{n_points:>8}  {name:<12}{choose_strategy(n_obj, n_points):<11}{len(fronts):>7}"
+                      f"{pymoo_column}{fast * 1000:>9.1f} ms{speedup}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare the resource estimates of optimization.resources with measured runs
+
+Run from the backend directory:
+
+    python -m benchmarks.resources --pop-sizes 500,2000,5000 --n-vars 10,1000
+
+Every case runs in a fresh process. The measured memory is the growth of the peak RSS over
+the imported, warmed-up worker, the same baseline as resources.BASE_MEMORY. Use the output to
+refit the constants of the estimate after changes to the optimizer or a pymoo upgrade.
+"""
+import time
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.suite import parse_list, peak_rss_mb
+
+
+def run_case(config):
+    """Measure the peak memory growth and the wall time of one run (runs in a fresh worker process)"""
+    from optimization.optimizer import OptimizationHandler
+
+    OptimizationHandler(**dict(config, n_gen=1, pop_size=200)).run(verbose=False)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    OptimizationHandler(**config).run(verbose=False)
+    return {'memory_mb': peak_rss_mb() - baseline, 'seconds': time.perf_counter() - start}
+
+
+def main():
+    from optimization.resources import estimate
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--algorithms', type=parse_list(str), default=['nsga2', 'nsga3'])
+    parser.add_argument('--n-obj', type=parse_list(int), default=[2, 3])
+    parser.add_argument('--pop-sizes', type=parse_list(int), default=[500, 2000, 5000])
+    parser.add_argument('--n-vars', type=parse_list(int), default=[10, 1000])
+    parser.add_argument('--n-gen', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<48}{'est. MB':>9}{'RSS MB':>9}{'est. s':>9}{'time s':>9}")
+    context = multiprocessing.get_context('spawn')
+    for algorithm, n_obj, pop_size, n_var, large_scale in itertools.product(
+            args.algorithms, args.n_obj, args.pop_sizes, args.n_vars, (False, True)):
+        config = {
+            'problem_id': 'dtlz2', 'algorithm_id': algorithm, 'n_var': n_var, 'n_obj': n_obj,
+            'pop_size': pop_size, 'n_gen': args.n_gen, 'early_stopping': False, 'large_scale': large_scale,
+        }
+        predicted = estimate(config)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            measured = executor.submit(run_case, config).result()
+
+        name = f"{algorithm} n_obj={n_obj} pop={pop_size} n_var={n_var}{' large' if large_scale else ''}"
+        print(f"{name:<48}{predicted['memory_bytes'] / 2**20:>9.0f}{measured['memory_mb']:>9.0f}"
+              f"{predicted['seconds']:>9.2f}{measured['seconds']:>9.2f}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
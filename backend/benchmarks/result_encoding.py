@@ -0,0 +1,91 @@
+"""Compare payload size and encode/decode time of the result wire formats
+
+Run from the backend directory:
+
+    python -m benchmarks.result_encoding --pop-size 1000 --n-var 100 --n-obj 3
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from optimization import encoding
+
+
+def synthetic_result(pop_size, n_var, n_obj, n_gen, seed=1):
+    """A result shaped like OptimizationHandler.run() output, with full precision floats"""
+    rng = np.random.default_rng(seed)
+    X, F = rng.random((pop_size, n_var)), rng.random((pop_size, n_obj))
+    history = [{
+        'n_gen': gen, 'n_eval': gen * pop_size, 'n_nds': pop_size,
+        'f_mean': float(rng.random()), 'igd': float(rng.random()), 'gd': float(rng.random()), 'hv': float(rng.random())
+    } for gen in range(1, n_gen + 1)]
+    return {
+        'status': 'success',
+        'cached': False,
+        'data': {
+            'X': X,
+            'F': F,
+            'generation': n_gen,
+            'success': True,
+            'execution_time': 1.0,
+            'problem_name': 'dtlz2',
+            'algorithm_name': 'nsga3',
+            'statistics': {'n_var': n_var, 'n_obj': n_obj, 'pop_size': pop_size, 'n_gen': n_gen},
+            'history': history,
+            'convergence': {'ideal_point': [0.0] * n_obj, 'nadir_point': [1.0] * n_obj},
+        }
+    }
+
+
+def legacy_encode(payload):
+    """The previous response: X/F as lists, repeated under pareto_front, pretty printed by jsonify in debug mode"""
+    data = dict(payload['data'], X=payload['data']['X'].tolist(), F=payload['data']['F'].tolist())
+    data['pareto_front'] = {'objectives': payload['data']['F'].tolist(), 'variables': payload['data']['X'].tolist()}
+    return json.dumps(dict(payload, data=data), indent=2, sort_keys=True).encode()
+
+
+def timed(fn, repeat):
+    """Return the result and the median wall time of calling fn repeat times"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pop-size', type=int, default=1000)
+    parser.add_argument('--n-var', type=int, default=100)
+    parser.add_argument('--n-obj', type=int, default=3)
+    parser.add_argument('--n-gen', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payload = synthetic_result(args.pop_size, args.n_var, args.n_obj, args.n_gen)
+
+    formats = [('legacy json', lambda: legacy_encode(payload), encoding.JSON)]
+    formats.append(('json', lambda: encoding.encode(payload, encoding.JSON), encoding.JSON))
+    for dtype in encoding.DTYPES:
+        formats.append((f'columnar {dtype}', lambda dtype=dtype: encoding.encode(payload, encoding.COLUMNAR, dtype), encoding.COLUMNAR))
+        if encoding.msgpack is not None:
+            formats.append((f'msgpack {dtype}', lambda dtype=dtype: encoding.encode(payload, encoding.MSGPACK, dtype), encoding.MSGPACK))
+
+    print(f"{'format':<20}{'compression':<13}{'size':>12}{'encode':>11}{'decode':>11}")
+    for name, encode, mimetype in formats:
+        body, encode_time = timed(encode, args.repeat)
+        for content_encoding in [None] + encoding.COMPRESSIONS:
+            compressed, compress_time = timed(lambda: encoding.compress(body, content_encoding)[0], args.repeat)
+            _, decode_time = timed(lambda: encoding.decode(compressed, mimetype, content_encoding), args.repeat)
+            print(f"{name:<20}{content_encoding or 'identity':<13}{len(compressed) / 2**10:>9.0f} KB"
+                  f"{(encode_time + compress_time) * 1000:>8.1f} ms{decode_time * 1000:>8.1f} ms")
+
+    if encoding.msgpack is None:
+        print("\nmsgpack is not installed, skipped the msgpack format")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Measure the cold start of the backend: import time and time to the first responses
+
+Run from the backend directory:
+
+    python -m benchmarks.startup --repeat 5 --max-seconds 1.0
+
+Every measurement runs in a fresh interpreter, the way autoscaled servers and spawned job
+workers start. The import of the app is profiled with python -X importtime; the slowest
+modules are listed and the ones that should only load once a run needs them are flagged.
+With --max-seconds the command exits with status 1 if the median import takes longer, so it
+can guard the cold start in CI.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the registry imports on first use, they should not show up when importing the app
+LAZY_MODULES = ('pymoo.algorithms', 'pymoo.problems', 'pymoo.optimize', 'pymoo.util.ref_dirs',
+                'scipy.stats', 'scipy.spatial')
+
+# Times the first request and the first run setup after the import
+FIRST_USE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/api/problems')
+problems = time.perf_counter()
+from optimization.optimizer import OptimizationHandler
+handler = OptimizationHandler(problem_id='dtlz2', algorithm_id='nsga3', n_obj=3, n_gen=1)
+handler._get_problem()
+handler._get_algorithm()
+setup = time.perf_counter()
+print(json.dumps({'import': imported - start, 'problems': problems - imported, 'setup': setup - problems}))
+"""
+
+
+def environment():
+    # Keep the measurement free of side effects like creating the run store
+    return dict(os.environ, PYTHONPATH=BACKEND_DIR, PYMOO_INTERACT_RUN_STORE='')
+
+
+def import_profile(module):
+    """Return (seconds, [(cumulative seconds, self seconds, module)]) of importing module in a fresh interpreter"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR, env=environment(), capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative) / 1e6, int(own) / 1e6, name.strip()))
+    total = next(cumulative for cumulative, _, name in reversed(modules) if name == module)
+    return total, modules
+
+
+def first_use():
+    """Seconds to import the app, answer /api/problems and set up the first run, in a fresh interpreter"""
+    completed = subprocess.run([sys.executable, '-c', FIRST_USE], cwd=BACKEND_DIR, env=environment(),
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app', help='module to import (default app)')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per measurement')
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    parser.add_argument('--max-seconds', type=float, help='fail if the median import takes longer')
+    args = parser.parse_args(argv)
+
+    runs = [import_profile(args.module) for _ in range(args.repeat)]
+    totals = [total for total, _ in runs]
+    median = statistics.median(totals)
+    _, modules = runs[totals.index(min(totals, key=lambda total: abs(total - median)))]
+
+    print(f"import {args.module}: median {median * 1000:.0f} ms over {args.repeat} interpreters "
+          f"(min {min(totals) * 1000:.0f}, max {max(totals) * 1000:.0f})\n")
+    print(f"{'cumulative ms':>14}{'self ms':>9}  module")
+    for cumulative, own, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"{cumulative * 1000:>14.1f}{own * 1000:>9.1f}  {name}")
+
+    eager = sorted({name for _, _, name in modules if name.startswith(LAZY_MODULES)})
+    if eager:
+        print(f"\nImported eagerly although only runs need them: {', '.join(eager)}")
+
+    if args.module == 'app':
+        timings = [first_use() for _ in range(args.repeat)]
+        print("\nFirst use (median ms):")
+        for key, label in (('import', 'import app'), ('problems', 'first GET /api/problems'),
+                           ('setup', 'first run setup (dtlz2, nsga3)')):
+            print(f"  {label:<32}{statistics.median(timing[key] for timing in timings) * 1000:>8.0f}")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"\nMedian import of {median:.2f}s exceeds the limit of {args.max_seconds:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""Benchmark OptimizationHandler over a matrix of configurations and check for regressions
+
+Run from the backend directory (or via `python cli.py bench`):
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.1
+
+Every case runs in a fresh process, after a one generation warm-up run, so its peak RSS is
+its own. Wall time is split into problem/algorithm setup, minimize, per-generation
+indicators, result post-processing and serialization, and the JSON and columnar payload sizes
+are recorded. With --baseline the cases are compared against a previous output and the
+command exits with status 1 if any of them got slower or larger by more than the threshold.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Measurements compared against the baseline, and the smallest change worth reporting for each
+COMPARED = {
+    'total': 0.05,  # seconds
+    'minimize': 0.05,
+    'indicators': 0.05,
+    'serialization': 0.01,
+    'peak_rss_mb': 5.0,
+    'payload_json_bytes': 1024,
+}
+
+# Resolution of ru_maxrss: kilobytes on Linux, bytes on macOS
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT / 2**20
+
+
+def run_case(config):
+    """Run one configuration and return its measurements (runs in a fresh worker process)"""
+    from optimization.optimizer import OptimizationHandler
+    from optimization import encoding
+
+    # Server workers are long-lived, so leave one-time imports out of the measurement
+    OptimizationHandler(**dict(config, n_gen=1)).run(verbose=False)
+
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+
+    handler = OptimizationHandler(**config)
+    result = handler.run(verbose=False)
+
+    payload = {'status': 'success', 'data': result}
+    serialize_start = time.perf_counter()
+    body = encoding.encode(payload, encoding.JSON)
+    serialization = time.perf_counter() - serialize_start
+    columnar = encoding.encode(payload, encoding.COLUMNAR)
+
+    return {
+        **{name: float(value) for name, value in handler.timings.items()},
+        'serialization': serialization,
+        'total': time.perf_counter() - start,
+        'import_rss_mb': baseline_rss,
+        'peak_rss_mb': peak_rss_mb(),
+        'payload_json_bytes': len(body),
+        'payload_columnar_bytes': len(columnar),
+        'generations': result['generation'],
+        'front_size': len(result['F']),
+    }
+
+
+def run_isolated(config):
+    """Run a case in a freshly spawned interpreter"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, config).result()
+
+
+def case_key(config):
+    return json.dumps(config, sort_keys=True)
+
+
+def case_name(config):
+    return f"{config['problem_id']}/{config['algorithm_id']} n_var={config['n_var']} n_obj={config['n_obj']} pop={config['pop_size']}"
+
+
+def expand_matrix(args):
+    """Configurations of every combination, skipping ZDT with more than two objectives"""
+    configs = []
+    for problem, algorithm, n_obj, pop_size, n_var in itertools.product(
+            args.problems, args.algorithms, args.n_obj, args.pop_sizes, args.n_vars):
+        if problem.startswith('zdt') and n_obj != 2:
+            continue
+        configs.append({
+            'problem_id': problem,
+            'algorithm_id': algorithm,
+            'n_var': n_var,
+            'n_obj': n_obj,
+            'pop_size': pop_size,
+            'n_gen': args.n_gen,
+            # A fixed number of generations keeps runs comparable across versions
+            'early_stopping': False,
+        })
+    return configs
+
+
+def aggregate(samples):
+    """Median of the timings over repetitions, maximum of the memory"""
+    out = {}
+    for name in samples[0]:
+        values = [sample[name] for sample in samples]
+        out[name] = max(values) if name.endswith('_mb') else float(np.median(values))
+    return out
+
+
+def environment():
+    import pymoo
+    return {
+        'python': platform.python_version(),
+        'pymoo': pymoo.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': multiprocessing.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(cases, baseline, threshold):
+    """Return (name, measure, before, after) for every measurement that regressed"""
+    previous = {case_key(case['config']): case['results'] for case in baseline['cases']}
+    regressions = []
+    for case in cases:
+        before = previous.get(case_key(case['config']))
+        if before is None:
+            continue
+        for measure, min_change in COMPARED.items():
+            if measure not in before:
+                continue
+            old, new = before[measure], case['results'][measure]
+            if new > old * (1 + threshold) and new - old > min_change:
+                regressions.append((case_name(case['config']), measure, old, new))
+    return regressions
+
+
+def print_case(config, results):
+    print(f"{case_name(config):<44}{results['setup']:>8.3f}{results['minimize']:>10.3f}"
+          f"{results['indicators']:>11.3f}{results['postprocess']:>9.3f}{results['serialization']:>9.3f}"
+          f"{results['total']:>9.3f}{results['peak_rss_mb']:>9.0f}{results['payload_json_bytes'] / 2**10:>9.0f}",
+          flush=True)
+
+
+def parse_list(cast):
+    return lambda value: [cast(item) for item in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--problems', type=parse_list(str), default=['zdt1', 'dtlz2'])
+    parser.add_argument('--algorithms', type=parse_list(str), default=['nsga2', 'nsga3', 'moead'])
+    parser.add_argument('--n-obj', type=parse_list(int), default=[2])
+    parser.add_argument('--pop-sizes', type=parse_list(int), default=[100, 400])
+    parser.add_argument('--n-vars', type=parse_list(int), default=[30])
+    parser.add_argument('--n-gen', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, timings are the median')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against the results of a previous run')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as regression')
+    args = parser.parse_args(argv)
+
+    configs = expand_matrix(args)
+    print(f"Running {len(configs)} cases x {args.repeat} repetitions\n")
+    print(f"{'case':<44}{'setup':>8}{'minimize':>10}{'indicators':>11}{'post':>9}{'serial':>9}"
+          f"{'total':>9}{'RSS MB':>9}{'JSON KB':>9}")
+
+    cases = []
+    for config in configs:
+        results = aggregate([run_isolated(config) for _ in range(args.repeat)])
+        cases.append({'config': config, 'results': results})
+        print_case(config, results)
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'cases': cases}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(cases, baseline, args.threshold)
+
+        before, after = baseline['environment'], report['environment']
+        for name in ('pymoo', 'numpy', 'python'):
+            if before.get(name) != after[name]:
+                print(f"\n{name} changed: {before.get(name)} -> {after[name]}")
+
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold:.0%}:")
+            for name, measure, old, new in regressions:
+                print(f"  {name:<44}{measure:<20}{old:>12.3f} -> {new:.3f} ({new / old - 1:+.0%})")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
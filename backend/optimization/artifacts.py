@@ -0,0 +1,160 @@
+"""Process-wide store of precomputed arrays: reference directions and true Pareto fronts
+
+Both are pure functions of their parameters, so they are computed once per process and kept
+in memory. With a directory configured they are also written to .npy files that later
+processes memory-map instead of recomputing them, so worker processes share the pages of
+large direction sets and dense fronts.
+"""
+import os
+import json
+import uuid
+import hashlib
+import threading
+from math import comb
+
+import numpy as np
+
+from optimization.cache import cache_version, remove_stale_versions
+from optimization import registry
+
+
+class ArtifactStore:
+    """Memoized arrays, optionally persisted as memory-mapped .npy files"""
+
+    def __init__(self, directory=None):
+        self._memory = {}
+        self._lock = threading.Lock()
+        # Worker processes forked while the store is being warmed must not inherit a held lock
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_lock)
+        self.root = None
+        self.directory = None
+        if directory:
+            self.configure(directory)
+
+    def configure(self, directory):
+        """Persist artifacts to directory from now on"""
+        self.root = directory
+        self.directory = os.path.join(directory, cache_version())
+        os.makedirs(self.directory, exist_ok=True)
+        remove_stale_versions(directory)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def _path(self, name, key):
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{name}-{digest}.npy")
+
+    def get(self, name, key, compute):
+        """Return the artifact name/key, calling compute() only if neither memory nor disk has it
+
+        Arrays are read-only, whether they were loaded from disk or freshly computed.
+        """
+        memo = (name,) + tuple(key)
+        with self._lock:
+            if memo in self._memory:
+                return self._memory[memo]
+
+        array = self._load(name, key)
+        if array is None:
+            array = compute()
+            if array is not None:
+                array = np.asarray(array)
+                array.flags.writeable = False
+                self._save(name, key, array)
+
+        with self._lock:
+            return self._memory.setdefault(memo, array)
+
+    def _load(self, name, key):
+        if self.directory is None:
+            return None
+        try:
+            return np.asarray(np.load(self._path(name, key), mmap_mode='r'))
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, name, key, array):
+        if self.directory is None:
+            return
+        path = self._path(name, key)
+        # Write to a temporary file first so other processes never map a half written file. Every
+        # writer has a file of its own, the warming thread and requests may save the same artifact
+        tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+        except OSError as e:
+            # The array is still served from memory, only later processes recompute it
+            print(f"Failed to persist artifact {name}: {e}")
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def __len__(self):
+        return len(self._memory)
+
+
+store = ArtifactStore(os.environ.get('PYMOO_INTERACT_ARTIFACT_DIR') or None)
+
+
+def configure(directory):
+    """Persist artifacts to directory (also used as the initializer of worker processes)"""
+    if directory:
+        store.configure(directory)
+
+
+def reference_directions(n_obj, n_partitions):
+    """Das-Dennis reference directions"""
+    from pymoo.util.ref_dirs import get_reference_directions
+
+    return store.get(
+        'das-dennis', (n_obj, n_partitions),
+        lambda: get_reference_directions("das-dennis", n_obj, n_partitions=n_partitions)
+    )
+
+
+def front_directions(n_obj, max_points=1000):
+    """Das-Dennis directions with as many partitions as fit into max_points"""
+    n_partitions = 1
+    while comb(n_partitions + 1 + n_obj - 1, n_obj - 1) <= max_points:
+        n_partitions += 1
+    return reference_directions(n_obj, n_partitions)
+
+
+# Problems whose true front does not depend on the number of variables
+N_VAR_INDEPENDENT_FRONTS = ('zdt1', 'zdt2', 'dtlz1', 'dtlz2')
+
+
+def pareto_front(problem_id, n_var, n_obj, problem=None):
+    """True Pareto front of a problem configuration, or None if the problem does not know it"""
+    key = (problem_id, n_obj) if problem_id in N_VAR_INDEPENDENT_FRONTS else (problem_id, n_var, n_obj)
+
+    def compute():
+        instance = problem
+        if instance is None:
+            instance = registry.create_problem(problem_id, n_var, n_obj)
+        if not hasattr(instance, 'pareto_front'):
+            return None
+        # pymoo only knows default directions for up to three objectives
+        if n_obj > 3:
+            return instance.pareto_front(ref_dirs=front_directions(n_obj))
+        return instance.pareto_front()
+
+    return store.get('pareto-front', key, compute)
+
+
+def warm(configurations):
+    """Precompute the artifacts of (problem_id, n_var, n_obj, n_partitions) configurations
+
+    Configurations that fail (e.g. unsupported objective counts) are skipped.
+    """
+    for problem_id, n_var, n_obj, n_partitions in configurations:
+        try:
+            reference_directions(n_obj, n_partitions)
+            pareto_front(problem_id, n_var, n_obj)
+        except Exception:
+            continue
+    return len(store)
@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pymoo
+
+from optimization.encoding import json_default
+
+# Bump whenever the layout of a cached result changes, or the results of seeded runs do
+CACHE_FORMAT = 2
+
+
+def cache_version():
+    """Key that invalidates every cached result when pymoo or the cache format changes"""
+    return f"pymoo-{pymoo.__version__}-v{CACHE_FORMAT}"
+
+
+# Names cache_version() produces, for any pymoo version and cache format
+VERSION_PATTERN = re.compile(r'pymoo-[\w.+-]+-v\d+')
+
+
+def remove_stale_versions(root):
+    """Remove the directories of other cache versions under root
+
+    The root may be shared with other data, so only directories named like a cache version are
+    touched.
+    """
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name != cache_version() and VERSION_PATTERN.fullmatch(name) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def config_key(config):
+    """Content address of a run configuration"""
+    payload = json.dumps({'version': cache_version(), 'config': config}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """Results of deterministic runs, kept in an in-memory LRU in front of an on-disk store
+
+    Entries are keyed by the configuration they are given, JobManager passes the normalized
+    optimizer.run_config so that defaults and execution settings do not split the key.
+
+    On disk every entry is a compressed .npz with the X/F arrays plus a JSON file with the rest of
+    the result. Entries live in a directory named after cache_version(), so upgrading pymoo
+    starts from an empty cache and the stale directories are removed.
+    """
+
+    def __init__(self, directory=None, max_entries=64, max_disk_bytes=1 << 30):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+        self.directory = None
+        if directory:
+            self.directory = os.path.join(directory, cache_version())
+            os.makedirs(self.directory, exist_ok=True)
+            remove_stale_versions(directory)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.npz', base + '.json'
+
+    def get(self, config):
+        """Return the cached result of a configuration, or None"""
+        key = config_key(config)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        result = self._load(key)
+        if result is not None:
+            self._remember(key, result)
+        return result
+
+    def put(self, config, result):
+        key = config_key(config)
+        self._remember(key, result)
+        if self.directory is not None:
+            with self._disk_lock:
+                self._store(key, result)
+                self._evict_disk()
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key, result):
+        array_path, meta_path = self._paths(key)
+        meta = {k: v for k, v in result.items() if k not in ('X', 'F')}
+
+        # Write to temporary files first so readers never see a half written entry. Every writer
+        # has files of its own, gunicorn workers may store the same key at the same time
+        suffix = f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        array_tmp, meta_tmp = array_path + suffix, meta_path + suffix
+        try:
+            with open(array_tmp, 'wb') as f:
+                np.savez_compressed(f, X=np.asarray(result['X']), F=np.asarray(result['F']))
+            with open(meta_tmp, 'w') as f:
+                json.dump(meta, f, default=json_default)
+            os.replace(array_tmp, array_path)
+            os.replace(meta_tmp, meta_path)
+        finally:
+            for tmp in (array_tmp, meta_tmp):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+
+        array_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                result = json.load(f)
+            with np.load(array_path) as arrays:
+                X, F = arrays['X'], arrays['F']
+
+            # Mark the entry as recently used for the size based eviction
+            os.utime(array_path)
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        result['X'], result['F'] = X, F
+        return result
+
+    def _evict_disk(self):
+        """Delete the least recently used entries until the directory fits max_disk_bytes"""
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in ('.npz', '.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # Evicted by another process meanwhile
+            size, used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_disk_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
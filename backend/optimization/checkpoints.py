@@ -0,0 +1,90 @@
+import os
+import glob
+import uuid
+import pickle
+import random
+
+import numpy as np
+from pymoo.core.callback import Callback
+
+from optimization.cache import cache_version, config_key, remove_stale_versions
+
+
+class CheckpointStore:
+    """Algorithm state saved at the end of runs so longer runs can resume from it
+
+    Runs are seeded, so the first k generations of a run with n_gen > k are identical to a run
+    with n_gen = k. A checkpoint holds the algorithm (population, reference directions, ...),
+    the metrics recorded so far and the global RNG states. Checkpoints are grouped by the run
+    configuration without n_gen and only the max_per_config longest runs are kept per group.
+    """
+
+    def __init__(self, directory, max_per_config=3):
+        self.root = directory
+        self.directory = os.path.join(directory, cache_version())
+        self.max_per_config = max_per_config
+        os.makedirs(self.directory, exist_ok=True)
+        remove_stale_versions(self.root)
+
+    def _group(self, config):
+        prefix = {k: v for k, v in config.items() if k != 'n_gen'}
+        return os.path.join(self.directory, config_key(prefix))
+
+    def _available(self, group):
+        """Generations of the checkpoints stored for a group, in ascending order"""
+        paths = glob.glob(os.path.join(group, '*.pkl'))
+        return sorted(int(os.path.splitext(os.path.basename(path))[0]) for path in paths)
+
+    def load(self, config):
+        """Return the checkpoint closest to, but not beyond, config['n_gen']"""
+        group = self._group(config)
+        candidates = [n for n in self._available(group) if n <= config['n_gen']]
+        if not candidates:
+            return None
+
+        try:
+            with open(os.path.join(group, f"{candidates[-1]}.pkl"), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def save(self, config, algorithm, recorder):
+        """Checkpoint a finished run"""
+        group = self._group(config)
+        os.makedirs(group, exist_ok=True)
+
+        n_gen = len(recorder)
+        path = os.path.join(group, f"{n_gen}.pkl")
+
+        # The callback references the handler and the progress queue of this run only
+        callback, algorithm.callback = algorithm.callback, Callback()
+        tmp = None
+        try:
+            checkpoint = {
+                'n_gen': n_gen,
+                'algorithm': algorithm,
+                'recorder': recorder,
+                'np_random_state': np.random.get_state(),
+                'random_state': random.getstate(),
+            }
+            # Identical runs finishing at the same time each write a file of their own
+            tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        finally:
+            algorithm.callback = callback
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+        # Only the longest runs are worth resuming from
+        for old in self._available(group)[:-self.max_per_config]:
+            try:
+                os.remove(os.path.join(group, f"{old}.pkl"))
+            except OSError:
+                pass
+
+    @staticmethod
+    def restore_random_state(checkpoint):
+        np.random.set_state(checkpoint['np_random_state'])
+        random.setstate(checkpoint['random_state'])
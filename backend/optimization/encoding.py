@@ -0,0 +1,208 @@
+"""Wire formats for optimization results
+
+Results carry their decision variables and objectives as numpy arrays. JSON turns every float
+into text, so clients that can decode binary data may instead ask for
+
+- application/x-pymoo-columnar: a small JSON header followed by the raw little-endian arrays,
+  each aligned to 8 bytes so they can be viewed in place (e.g. as a Float64Array)
+- application/x-msgpack: the result as msgpack, arrays as {dtype, shape, data} maps
+  (only offered when msgpack is installed)
+
+Columnar layout:
+
+    b'PMOO' | uint32 header length | header JSON | padding | array buffers
+
+where the header is {"version": 1, "body": <result without the arrays>, "arrays": [{"path":
+[...], "dtype": "<f8", "shape": [...], "offset": ...}]} and offsets count from the start of
+the payload. Any format can be compressed with gzip, or zstd when zstandard is installed.
+"""
+import gzip
+import json
+import struct
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = 'application/json'
+COLUMNAR = 'application/x-pymoo-columnar'
+MSGPACK = 'application/x-msgpack'
+
+# In order of preference for clients that accept anything, so browsers keep getting JSON
+FORMATS = [JSON, COLUMNAR] + ([MSGPACK] if msgpack is not None else [])
+COMPRESSIONS = (['zstd'] if zstandard is not None else []) + ['gzip']
+
+COLUMNAR_MAGIC = b'PMOO'
+COLUMNAR_VERSION = 1
+ALIGNMENT = 8
+
+# Float types binary clients may ask for, float32 halves the payload at ~7 significant digits
+DTYPES = {'float64': '<f8', 'float32': '<f4'}
+
+# Smaller bodies are not worth the compression overhead
+MIN_COMPRESS_SIZE = 1024
+
+
+def parse_bool(value):
+    """Interpret JSON booleans as well as query string values such as false, 0 or off"""
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', '0', 'false', 'no', 'off')
+    return bool(value)
+
+
+def json_default(o):
+    """json.dumps fallback for numpy arrays and scalars"""
+    if isinstance(o, (np.ndarray, np.generic)):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _wire_array(array, dtype=None):
+    """Little-endian contiguous copy of array, floats converted to dtype if given"""
+    if dtype is None or array.dtype.kind != 'f':
+        dtype = array.dtype.newbyteorder('<')
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+def split_arrays(obj, path=()):
+    """Return obj without its numpy arrays, and the (path, array) pairs that were removed"""
+    if isinstance(obj, np.ndarray):
+        return None, [(list(path), obj)]
+    if isinstance(obj, dict):
+        body, arrays = {}, []
+        for key, value in obj.items():
+            if isinstance(value, np.ndarray):
+                arrays.append((list(path) + [key], value))
+                continue
+            body[key], found = split_arrays(value, path + (key,))
+            arrays.extend(found)
+        return body, arrays
+    return obj, []
+
+
+def _set_path(obj, path, value):
+    for key in path[:-1]:
+        obj = obj.setdefault(key, {})
+    obj[path[-1]] = value
+
+
+def encode_columnar(obj, dtype=None):
+    """Encode obj as a JSON header followed by its arrays as raw buffers"""
+    body, arrays = split_arrays(obj)
+
+    buffers, descriptors, offset = [], [], 0
+    for path, array in arrays:
+        array = _wire_array(array, dtype)
+        descriptors.append({'path': path, 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        buffers.append(array)
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    # Offsets are relative to the first buffer until the header size is known
+    def header_for(start):
+        return json.dumps({
+            'version': COLUMNAR_VERSION,
+            'body': body,
+            'arrays': [dict(d, offset=d['offset'] + start) for d in descriptors]
+        }, default=json_default, separators=(',', ':')).encode()
+
+    # Growing the offsets can grow the header, so iterate until it fits in front of the data
+    start = 0
+    while True:
+        header = header_for(start)
+        needed = -(-(len(COLUMNAR_MAGIC) + 4 + len(header)) // ALIGNMENT) * ALIGNMENT
+        if needed <= start:
+            break
+        start = needed
+
+    out = bytearray(start + offset)
+    out[:4] = COLUMNAR_MAGIC
+    out[4:8] = struct.pack('<I', len(header))
+    out[8:8 + len(header)] = header
+    position = start
+    for array in buffers:
+        out[position:position + array.nbytes] = array.tobytes()
+        position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    return bytes(out)
+
+
+def decode_columnar(payload):
+    """Inverse of encode_columnar, the arrays are read-only views into payload"""
+    if payload[:4] != COLUMNAR_MAGIC:
+        raise ValueError('Not a columnar result payload')
+    (length,) = struct.unpack('<I', payload[4:8])
+    header = json.loads(payload[8:8 + length])
+
+    obj = header['body']
+    for d in header['arrays']:
+        count = int(np.prod(d['shape']))
+        array = np.frombuffer(payload, dtype=d['dtype'], count=count, offset=d['offset']).reshape(d['shape'])
+        if d['path']:
+            _set_path(obj, d['path'], array)
+        else:
+            obj = array
+    return obj
+
+
+def _msgpack_default(o, dtype=None):
+    if isinstance(o, np.ndarray):
+        array = _wire_array(o, dtype)
+        return {'dtype': array.dtype.str, 'shape': list(array.shape), 'data': array.tobytes()}
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not msgpack serializable")
+
+
+def _msgpack_hook(obj):
+    if obj.keys() == {'dtype', 'shape', 'data'}:
+        return np.frombuffer(obj['data'], dtype=obj['dtype']).reshape(obj['shape'])
+    return obj
+
+
+def encode(obj, mimetype=JSON, dtype=None):
+    """Serialize obj in one of FORMATS, dtype ('float32'/'float64') applies to binary formats"""
+    if dtype is not None and dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype: {dtype}. Choose one of {', '.join(DTYPES)}")
+    dtype = DTYPES.get(dtype)
+
+    if mimetype == COLUMNAR:
+        return encode_columnar(obj, dtype)
+    if mimetype == MSGPACK and msgpack is not None:
+        return msgpack.packb(obj, default=lambda o: _msgpack_default(o, dtype))
+    return json.dumps(obj, default=json_default, separators=(',', ':')).encode()
+
+
+def decode(payload, mimetype=JSON, content_encoding=None):
+    """Inverse of encode followed by compress"""
+    payload = decompress(payload, content_encoding)
+    if mimetype == COLUMNAR:
+        return decode_columnar(payload)
+    if mimetype == MSGPACK:
+        return msgpack.unpackb(payload, object_hook=_msgpack_hook)
+    return json.loads(payload)
+
+
+def compress(payload, content_encoding):
+    """Compress payload with gzip or zstd, returns (payload, content encoding actually used)"""
+    if content_encoding is None or len(payload) < MIN_COMPRESS_SIZE:
+        return payload, None
+    if content_encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(payload), 'zstd'
+    if content_encoding == 'gzip':
+        return gzip.compress(payload, compresslevel=6, mtime=0), 'gzip'
+    return payload, None
+
+
+def decompress(payload, content_encoding):
+    if content_encoding == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if content_encoding == 'gzip':
+        return gzip.decompress(payload)
+    return payload
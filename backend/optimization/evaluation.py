@@ -0,0 +1,116 @@
+import os
+from multiprocessing.pool import Pool, ThreadPool
+
+import numpy as np
+from pymoo.core.problem import Problem, LoopedElementwiseEvaluation, StarmapParallelization
+
+# In-process evaluation of the whole population, a pool of threads, or a pool of processes
+EVALUATORS = ('vectorized', 'threads', 'processes')
+
+# Largest evaluation pool of a run, requests asking for more workers get this many
+MAX_WORKERS = int(os.environ.get('PYMOO_INTERACT_EVAL_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def _evaluate_chunk(problem, X):
+    """Evaluate a slice of the population (runs in a pool worker)"""
+    return problem.evaluate(X, return_as_dictionary=True)
+
+
+class BatchParallelProblem(Problem):
+    """Evaluate a vectorized problem by splitting each offspring batch across a pool
+
+    The pool is dropped when the problem is pickled (e.g. for checkpoints), after which the
+    problem evaluates in-process until a new pool is attached.
+    """
+
+    def __init__(self, problem, pool=None, n_workers=1):
+        super().__init__(
+            n_var=problem.n_var,
+            n_obj=problem.n_obj,
+            n_ieq_constr=problem.n_ieq_constr,
+            n_eq_constr=problem.n_eq_constr,
+            xl=problem.xl,
+            xu=problem.xu,
+            vtype=problem.vtype
+        )
+        self.problem = problem
+        self.pool = pool
+        self.n_workers = n_workers
+
+    def _evaluate(self, X, out, *args, **kwargs):
+        if self.pool is None or len(X) < 2:
+            results = [_evaluate_chunk(self.problem, X)]
+        else:
+            chunks = np.array_split(X, min(self.n_workers, len(X)))
+            results = self.pool.starmap(_evaluate_chunk, [(self.problem, chunk) for chunk in chunks])
+
+        for name in results[0]:
+            out[name] = np.concatenate([result[name] for result in results])
+
+    def pareto_front(self, *args, **kwargs):
+        return self.problem.pareto_front(*args, **kwargs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['pool'] = None
+        return state
+
+
+def unwrap_problem(problem):
+    """Return the underlying problem of one prepared by an EvaluationBackend"""
+    return problem.problem if isinstance(problem, BatchParallelProblem) else problem
+
+
+class EvaluationBackend:
+    """Owns the worker pool used to evaluate offspring during a run
+
+    Elementwise problems get pymoo's StarmapParallelization runner, vectorized problems are
+    wrapped into a BatchParallelProblem. Use as a context manager so the pool is shut down and
+    the problem restored afterwards.
+    """
+
+    def __init__(self, kind='vectorized', n_workers=None):
+        if kind not in EVALUATORS:
+            raise ValueError(f"Unknown evaluator: {kind}. Choose one of {', '.join(EVALUATORS)}")
+        if n_workers is not None and n_workers < 1:
+            raise ValueError(f"n_workers must be at least 1, got {n_workers}")
+        self.kind = kind
+        self.n_workers = 1 if kind == 'vectorized' else min(n_workers or MAX_WORKERS, MAX_WORKERS)
+        self.pool = None
+        self._prepared = []
+
+    def __enter__(self):
+        if self.kind == 'threads':
+            self.pool = ThreadPool(self.n_workers)
+        elif self.kind == 'processes':
+            self.pool = Pool(self.n_workers)
+        return self
+
+    def __exit__(self, *exc):
+        # Leave the problems usable (and picklable) without the pool
+        for problem in self._prepared:
+            if isinstance(problem, BatchParallelProblem):
+                problem.pool = None
+            else:
+                problem.elementwise_runner = LoopedElementwiseEvaluation()
+        self._prepared = []
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        return False
+
+    def prepare(self, problem):
+        """Return the problem to hand to the algorithm so that it evaluates through this backend"""
+        problem = unwrap_problem(problem)
+        if self.pool is None:
+            return problem
+
+        if problem.elementwise:
+            problem.elementwise_runner = StarmapParallelization(self.pool.starmap)
+        else:
+            problem = BatchParallelProblem(problem, pool=self.pool, n_workers=self.n_workers)
+
+        self._prepared.append(problem)
+        return problem
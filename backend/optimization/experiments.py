@@ -0,0 +1,276 @@
+"""Run grids of problems x algorithms x parameters x seeds and aggregate the results
+
+From the backend directory:
+
+    python -m optimization.experiments spec.json --workers 16 --output results.json
+
+where spec.json looks like
+
+    {"problems": ["zdt1", "dtlz2"], "algorithms": ["nsga2", "nsga3"],
+     "n_obj": [2, 3], "n_gen": 100, "seeds": 10}
+"""
+import sys
+import json
+import time
+import uuid
+import argparse
+import itertools
+import threading
+
+import numpy as np
+
+from optimization.optimizer import OptimizationHandler
+from optimization.encoding import json_default, parse_bool
+
+# Grid keys holding one value or a list of values, and the handler argument they map to
+GRID_PARAMETERS = {
+    'problems': 'problem_id',
+    'algorithms': 'algorithm_id',
+    'n_var': 'n_var',
+    'n_obj': 'n_obj',
+    'pop_size': 'pop_size',
+    'n_gen': 'n_gen',
+}
+
+# Settings applied to every run of the grid
+SHARED_PARAMETERS = ('hv_samples', 'early_stopping', 'evaluator', 'n_workers')
+
+# Upper bound on the number of runs a single experiment may schedule
+MAX_RUNS = 10000
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def expand_grid(spec, limits=None):
+    """Turn an experiment spec into (configs, skipped) where configs holds one entry per run
+
+    Combinations that cannot run (e.g. ZDT with three objectives, or runs exceeding the
+    resources.ResourceLimits) are reported in skipped rather than failing the whole experiment.
+    """
+    for field in ('problems', 'algorithms'):
+        if not spec.get(field):
+            raise ValueError(f'Missing required field: {field}')
+
+    seeds = spec.get('seeds', 1)
+    seeds = list(range(1, int(seeds) + 1)) if not isinstance(seeds, list) else [int(s) for s in seeds]
+
+    keys = [key for key in GRID_PARAMETERS if key in spec]
+    shared = {key: spec[key] for key in SHARED_PARAMETERS if spec.get(key) is not None}
+    # Parsed like app.parse_run_config, specs may come from query strings or hand-written JSON
+    for key in ('hv_samples', 'n_workers'):
+        if key in shared:
+            shared[key] = int(shared[key])
+    if 'early_stopping' in shared:
+        shared['early_stopping'] = parse_bool(shared['early_stopping'])
+
+    configs, skipped = [], []
+    for values in itertools.product(*[_as_list(spec[key]) for key in keys]):
+        config = {GRID_PARAMETERS[key]: value for key, value in zip(keys, values)}
+        for key in ('n_var', 'n_obj', 'pop_size', 'n_gen'):
+            if key in config:
+                config[key] = int(config[key])
+        config.update(shared)
+
+        try:
+            # Building the handler validates the combination and fills in the defaults the grid
+            # left out, except large_scale, which the limits decide unless the spec does
+            handler = OptimizationHandler(**config)
+            config = dict(config, **{
+                key: value for key, value in handler.config.items() if key != 'large_scale' or key in config
+            })
+            if limits is not None:
+                limits.plan(config)
+        except ValueError as e:
+            skipped.append({'config': config, 'message': str(e)})
+            continue
+
+        configs.extend(dict(config, seed=seed) for seed in seeds)
+
+    if len(configs) > MAX_RUNS:
+        raise ValueError(f'Experiment has {len(configs)} runs, at most {MAX_RUNS} are allowed')
+    return configs, skipped
+
+
+def describe(values):
+    """Mean, median, quartiles and IQR of a sample"""
+    values = np.asarray([v for v in values if v is not None], dtype=float)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return {
+        'n': int(len(values)),
+        'mean': float(np.mean(values)),
+        'median': float(median),
+        'q1': float(q1),
+        'q3': float(q3),
+        'iqr': float(q3 - q1),
+        'min': float(np.min(values)),
+        'max': float(np.max(values)),
+    }
+
+
+def summarize(runs):
+    """Aggregate final HV, IGD and runtime across the seeds of every configuration"""
+    groups = {}
+    for run in runs:
+        config = {k: v for k, v in run['config'].items() if k != 'seed'}
+        key = json.dumps(config, sort_keys=True)
+        groups.setdefault(key, {'config': config, 'runs': []})['runs'].append(run)
+
+    summary = []
+    for group in groups.values():
+        completed = [run['result'] for run in group['runs'] if run['status'] == 'completed']
+        final = [result['history'][-1] for result in completed]
+        summary.append({
+            'config': group['config'],
+            'n_runs': len(group['runs']),
+            'n_failed': len(group['runs']) - len(completed),
+            'hv': describe([entry.get('hv') for entry in final]),
+            'igd': describe([entry.get('igd') for entry in final]),
+            'execution_time': describe([result['execution_time'] for result in completed]),
+            'generations': describe([result['generation'] for result in completed]),
+        })
+    return summary
+
+
+class Experiment:
+    """A batch of runs scheduled on the job manager"""
+
+    def __init__(self, spec, jobs, skipped):
+        self.id = uuid.uuid4().hex
+        self.spec = spec
+        self.jobs = jobs
+        self.skipped = skipped
+        self.submitted_at = time.time()
+
+    @property
+    def done(self):
+        return all(job.done for job in self.jobs)
+
+    def runs(self):
+        runs = []
+        for job in self.jobs:
+            run = {'config': job.config, 'status': job.status}
+            if job.status == 'completed':
+                run['result'] = job.result()
+            elif job.status == 'failed':
+                run['message'] = job.error()
+            runs.append(run)
+        return runs
+
+    def to_dict(self):
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+
+        info = {
+            'experiment_id': self.id,
+            'status': 'completed' if self.done else 'running',
+            'n_runs': len(self.jobs),
+            'counts': counts,
+            'skipped': self.skipped,
+            'submitted_at': self.submitted_at,
+        }
+        if self.done:
+            info['summary'] = summarize(self.runs())
+        return info
+
+
+class ExperimentManager:
+    """Schedules experiment grids on a JobManager, whose workers keep the reference fronts
+    and directions of earlier runs cached, and keeps track of the last max_finished finished ones"""
+
+    def __init__(self, jobs, max_finished=100):
+        self.jobs = jobs
+        self.max_finished = max_finished
+        self._experiments = {}
+        self._lock = threading.Lock()
+
+    def submit(self, spec):
+        configs, skipped = expand_grid(spec, self.jobs.limits)
+        if not configs:
+            raise ValueError('Experiment grid does not contain any valid configuration')
+
+        experiment = Experiment(spec, [self.jobs.submit(config) for config in configs], skipped)
+        with self._lock:
+            self._experiments[experiment.id] = experiment
+            self._evict_finished()
+        return experiment
+
+    def get(self, experiment_id):
+        with self._lock:
+            return self._experiments.get(experiment_id)
+
+    def _evict_finished(self):
+        """Drop the oldest finished experiments once more than max_finished are retained"""
+        finished = [experiment_id for experiment_id, experiment in self._experiments.items() if experiment.done]
+        for experiment_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._experiments[experiment_id]
+
+    def cancel(self, experiment_id):
+        experiment = self.get(experiment_id)
+        if experiment is not None:
+            for job in experiment.jobs:
+                self.jobs.cancel(job.id)
+        return experiment
+
+
+def print_summary(summary):
+    print(f"{'problem':<8}{'algorithm':<10}{'n_obj':>6}{'runs':>6}{'HV median':>12}{'HV IQR':>10}"
+          f"{'IGD median':>12}{'IGD IQR':>10}{'time':>9}")
+    for row in summary:
+        config = row['config']
+        hv, igd, runtime = row['hv'] or {}, row['igd'] or {}, row['execution_time'] or {}
+        print(f"{config['problem_id']:<8}{config['algorithm_id']:<10}{config.get('n_obj', 2):>6}"
+              f"{row['n_runs']:>6}{hv.get('median', float('nan')):>12.4f}{hv.get('iqr', float('nan')):>10.4f}"
+              f"{igd.get('median', float('nan')):>12.4f}{igd.get('iqr', float('nan')):>10.4f}"
+              f"{runtime.get('mean', float('nan')):>8.2f}s")
+
+
+def main(argv=None):
+    from optimization.jobs import JobManager
+    from optimization.runstore import RunStore
+
+    parser = argparse.ArgumentParser(description='Run an experiment grid')
+    parser.add_argument('spec', help='JSON file with the experiment grid')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--output', help='write the runs and the summary to this JSON file')
+    parser.add_argument('--store', help='also keep every run in the run store in this directory')
+    args = parser.parse_args(argv)
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+
+    jobs = JobManager(max_workers=args.workers, max_finished=MAX_RUNS, verbose=False,
+                      run_store=RunStore(args.store) if args.store else None)
+    try:
+        experiment = ExperimentManager(jobs).submit(spec)
+        print(f"Running {len(experiment.jobs)} runs on {jobs.max_workers} workers...")
+        for message in experiment.skipped:
+            print(f"Skipped {message['config']}: {message['message']}")
+
+        start = time.time()
+        for i, job in enumerate(experiment.jobs, 1):
+            try:
+                job.result()
+            except Exception:
+                pass
+            print(f"\r{i}/{len(experiment.jobs)} runs finished", end='', flush=True)
+        print(f"\nFinished in {time.time() - start:.1f}s\n")
+
+        info = experiment.to_dict()
+        print_summary(info['summary'])
+
+        if args.output:
+            info['runs'] = experiment.runs()
+            with open(args.output, 'w') as f:
+                json.dump(info, f, indent=2, default=json_default)
+            print(f"\nResults written to {args.output}")
+    finally:
+        jobs.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
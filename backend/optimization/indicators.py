@@ -0,0 +1,213 @@
+import numpy as np
+
+from optimization import artifacts
+
+# Above this many objectives KD-trees degrade to brute force, so use chunked broadcasting instead
+KDTREE_MAX_DIM = 4
+
+# Upper bound on the number of pairwise distances held in memory at once
+DISTANCE_CHUNK = 1 << 22
+
+# Default number of quasi-Monte-Carlo samples for the hypervolume of more than three objectives
+DEFAULT_HV_SAMPLES = 1 << 14
+
+# Sample budgets a run may ask for: fewer make the estimate too coarse to compare generations,
+# more keep a worker busy with the estimate and hold n_obj floats per sample
+MIN_HV_SAMPLES = 1 << 8
+MAX_HV_SAMPLES = 1 << 20
+
+# Upper bound on the number of sample/point/objective comparisons held in memory at once
+DOMINANCE_CHUNK = 1 << 20
+
+
+def check_hv_samples(hv_samples):
+    """Raise ValueError unless hv_samples is a sample budget runs may use"""
+    if not MIN_HV_SAMPLES <= hv_samples <= MAX_HV_SAMPLES:
+        raise ValueError(f"hv_samples must be between {MIN_HV_SAMPLES} and {MAX_HV_SAMPLES}, got {hv_samples}")
+
+
+def reference_data(problem_id, n_var, n_obj, problem):
+    """Return the (pareto_front, ideal, nadir) of a problem from the artifact store"""
+    pf = artifacts.pareto_front(problem_id, n_var, n_obj, problem)
+    if pf is None:
+        return None, None, None
+    return pf, pf.min(axis=0), pf.max(axis=0)
+
+
+def min_distances(A, B):
+    """Distance from every row of A to its nearest row in B, in chunks of bounded memory"""
+    chunk = max(1, DISTANCE_CHUNK // max(len(B), 1))
+    out = np.empty(len(A))
+    for start in range(0, len(A), chunk):
+        diff = A[start:start + chunk, None, :] - B[None, :, :]
+        out[start:start + chunk] = np.sqrt(np.min(np.einsum('ijk,ijk->ij', diff, diff), axis=1))
+    return out
+
+
+def hypervolume_2d(F, ref_point):
+    """Exact two-objective hypervolume by a sweep over the front sorted by the first objective"""
+    F = F[np.all(F < ref_point, axis=1)]
+    if len(F) == 0:
+        return 0.0
+
+    F = F[np.lexsort((F[:, 1], F[:, 0]))]
+
+    # Keep the non-dominated points, whose second objective strictly decreases along the sweep
+    best_so_far = np.minimum.accumulate(F[:, 1])
+    keep = np.ones(len(F), dtype=bool)
+    keep[1:] = F[1:, 1] < best_so_far[:-1]
+    F = F[keep]
+
+    widths = np.diff(np.append(F[:, 0], ref_point[0]))
+    return float(np.sum(widths * (ref_point[1] - F[:, 1])))
+
+
+def hypervolume_3d(F, ref_point):
+    """Exact three-objective hypervolume as a sum of 2D slices along the third objective"""
+    F = F[np.all(F < ref_point, axis=1)]
+    if len(F) == 0:
+        return 0.0
+
+    F = F[np.argsort(F[:, 2], kind='stable')]
+    heights = np.diff(np.append(F[:, 2], ref_point[2]))
+
+    volume = 0.0
+    for i in np.flatnonzero(heights > 0):
+        volume += heights[i] * hypervolume_2d(F[:i + 1, :2], ref_point[:2])
+    return float(volume)
+
+
+class MonteCarloHypervolume:
+    """Quasi-Monte-Carlo hypervolume estimate for many objectives
+
+    Exact hypervolume is exponential in the number of objectives. Instead, a fixed scrambled
+    Sobol sample of the box [lower, ref_point] is drawn once and the hypervolume is estimated
+    from the fraction of samples dominated by the front. Reusing the same samples for every
+    generation keeps the estimate deterministic and makes differences between generations far
+    less noisy than the reported confidence interval.
+    """
+
+    def __init__(self, ref_point, lower=None, n_samples=DEFAULT_HV_SAMPLES, seed=1):
+        self.ref_point = np.asarray(ref_point, dtype=float)
+        self.lower = np.zeros_like(self.ref_point) if lower is None else np.asarray(lower, dtype=float)
+        self.box_volume = float(np.prod(self.ref_point - self.lower))
+
+        # SciPy's statistics take long to import and are only needed beyond three objectives
+        from scipy.stats import qmc
+
+        # Sobol sequences are balanced for powers of two only
+        m = max(int(np.ceil(np.log2(max(n_samples, 2)))), 1)
+        unit = qmc.Sobol(d=len(self.ref_point), scramble=True, seed=seed).random_base2(m)
+        self.samples = self.lower + unit * (self.ref_point - self.lower)
+
+    @property
+    def n_samples(self):
+        return len(self.samples)
+
+    def _count_dominated(self, F):
+        """Number of samples weakly dominated by at least one point of F
+
+        Blocks of points are tested against the samples not dominated so far, starting with the
+        points closest to the origin, so the candidate set shrinks quickly.
+        """
+        F = F[np.argsort(F.sum(axis=1))]
+        remaining = self.samples
+        start = 0
+        while start < len(F) and len(remaining) > 0:
+            block = max(1, DOMINANCE_CHUNK // (len(remaining) * F.shape[1]))
+            B = F[start:start + block]
+            dominated = np.all(B[None, :, :] <= remaining[:, None, :], axis=2).any(axis=1)
+            remaining = remaining[~dominated]
+            start += block
+        return self.n_samples - len(remaining)
+
+    def do(self, F, z=1.96):
+        """Return the hypervolume estimate and the half width of its confidence interval"""
+        F = F[np.all(F < self.ref_point, axis=1)]
+        if len(F) == 0:
+            return 0.0, 0.0
+
+        p = self._count_dominated(F) / self.n_samples
+        estimate = self.box_volume * p
+        half_width = z * self.box_volume * np.sqrt(p * (1 - p) / self.n_samples)
+        return float(estimate), float(half_width)
+
+
+class IndicatorEngine:
+    """Per-generation IGD, GD and HV for a single problem configuration
+
+    IGD and GD share one nearest-neighbour pass against the cached reference front (a KD-tree
+    built once per run for up to KDTREE_MAX_DIM objectives, chunked broadcasting above that).
+    Hypervolume is exact for up to three objectives and estimated with hv_samples
+    quasi-Monte-Carlo samples above that, reported together with a 95% confidence interval
+    as hv_ci. Generations whose front did not change reuse the previous values.
+    """
+
+    def __init__(self, problem_id, n_var, n_obj, problem, hv_samples=DEFAULT_HV_SAMPLES):
+        self.n_obj = n_obj
+        self.pf, self.ideal, self.nadir = reference_data(problem_id, n_var, n_obj, problem)
+
+        self._pf_tree = None
+        if self.pf is not None and n_obj <= KDTREE_MAX_DIM:
+            from scipy.spatial import cKDTree
+            self._pf_tree = cKDTree(self.pf)
+
+        # Use normalized reference point [1.1, 1.1, ...] for hypervolume calculation
+        # This works with the normalized objectives
+        self.ref_point = np.array([1.1] * n_obj)
+        if n_obj <= 3:
+            from pymoo.indicators.hv import HV
+            self.hv = HV(ref_point=self.ref_point)
+            self.hv_approximate = False
+        else:
+            self.hv = MonteCarloHypervolume(self.ref_point, n_samples=hv_samples)
+            self.hv_approximate = True
+
+        self.names = []
+        if self.pf is not None:
+            self.names += ['igd', 'gd']
+        self.names.append('hv')
+        if self.hv_approximate:
+            self.names.append('hv_ci')
+
+        self._last_F = None
+        self._last_values = None
+
+    def _distances(self, F):
+        """Return (IGD, GD) of F against the reference front"""
+        if self._pf_tree is not None:
+            to_front, _ = self._pf_tree.query(F)
+            to_population, _ = type(self._pf_tree)(F).query(self.pf)
+        else:
+            to_front = min_distances(F, self.pf)
+            to_population = min_distances(self.pf, F)
+        return float(np.mean(to_population)), float(np.mean(to_front))
+
+    def _hypervolume(self, F):
+        """Return the hypervolume and the half width of its confidence interval (None if exact)"""
+        # Normalize objectives using ideal and nadir points
+        if self.ideal is not None and self.nadir is not None:
+            F = (F - self.ideal) / (self.nadir - self.ideal)
+        if self.hv_approximate:
+            return self.hv.do(F)
+        if self.n_obj == 2:
+            return hypervolume_2d(F, self.ref_point), None
+        if self.n_obj == 3:
+            return hypervolume_3d(F, self.ref_point), None
+        return float(self.hv.do(F)), None
+
+    def evaluate(self, F):
+        """Calculate the indicators of one generation's front"""
+        if self._last_F is not None and self._last_F.shape == F.shape and np.array_equal(self._last_F, F):
+            return dict(self._last_values)
+
+        values = {}
+        if self.pf is not None:
+            values['igd'], values['gd'] = self._distances(F)
+        values['hv'], hv_ci = self._hypervolume(F)
+        if self.hv_approximate:
+            values['hv_ci'] = hv_ci
+
+        self._last_F = F.copy()
+        self._last_values = values
+        return dict(values)
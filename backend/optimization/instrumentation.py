@@ -0,0 +1,229 @@
+"""Opt-in timing spans, counters and Prometheus text exposition
+
+Disabled by default: span() then returns a shared no-op context manager, so instrumented code
+pays one function call. When enabled, every process keeps its own registry of histograms and
+counters. Worker processes write a snapshot of theirs to the metrics directory after every
+run, and the process serving /metrics merges those snapshots with its own registry, the same
+way prometheus_client's multiprocess mode works.
+"""
+import os
+import json
+import time
+import glob
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+
+# Upper bounds of the histogram buckets, in seconds for spans
+SPAN_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+PREFIX = 'pymoo_interact'
+
+METRICS = {
+    'span_seconds': ('histogram', 'Wall time of instrumented sections', SPAN_BUCKETS),
+    'evaluations_per_second': ('histogram', 'Function evaluations per second of a run', RATE_BUCKETS),
+    'generations_per_second': ('histogram', 'Generations per second of a run', RATE_BUCKETS),
+    'evaluations_total': ('counter', 'Function evaluations', None),
+    'generations_total': ('counter', 'Generations', None),
+    'runs_total': ('counter', 'Finished optimization runs', None),
+}
+
+_NOOP = nullcontext()
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class Registry:
+    """Histograms and counters of one process, keyed by metric name and label values"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.series = {}
+
+    def _series(self, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        series = self.series.get(key)
+        if series is None:
+            kind, _, buckets = METRICS[name]
+            series = {'count': 0, 'sum': 0.0}
+            if kind == 'histogram':
+                series['buckets'] = [0] * (len(buckets) + 1)
+            self.series[key] = series
+        return series
+
+    def observe(self, name, value, **labels):
+        """Add an observation to a histogram"""
+        buckets = METRICS[name][2]
+        with self._lock:
+            series = self._series(name, labels)
+            series['count'] += 1
+            series['sum'] += value
+            series['buckets'][bisect_left(buckets, value)] += 1
+
+    def inc(self, name, value=1, **labels):
+        """Increase a counter"""
+        with self._lock:
+            series = self._series(name, labels)
+            series['count'] += 1
+            series['sum'] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [[name, list(labels), dict(series, buckets=list(series.get('buckets', [])))]
+                    for (name, labels), series in self.series.items()]
+
+    def merge(self, snapshot):
+        """Add the series of another process' snapshot"""
+        with self._lock:
+            for name, labels, other in snapshot:
+                if name not in METRICS:
+                    continue
+                series = self._series(name, dict(tuple(label) for label in labels))
+                series['count'] += other['count']
+                series['sum'] += other['sum']
+                for i, count in enumerate(other.get('buckets', [])):
+                    series['buckets'][i] += count
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, labels), series in sorted(self.series.items()):
+                by_name.setdefault(name, []).append((labels, series))
+
+            for name, entries in by_name.items():
+                kind, description, buckets = METRICS[name]
+                metric = f"{PREFIX}_{name}"
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for labels, series in entries:
+                    if kind == 'counter':
+                        lines.append(f"{metric}{_labels(labels)} {series['sum']:g}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(buckets) + ['+Inf'], series['buckets']):
+                        cumulative += count
+                        le = bound if bound == '+Inf' else f"{bound:g}"
+                        lines.append(f"{metric}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_labels(labels)} {series['sum']:g}")
+                    lines.append(f"{metric}_count{_labels(labels)} {series['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe('span_seconds', time.perf_counter() - self.start, span=self.name)
+        return False
+
+
+registry = Registry()
+enabled = os.environ.get('PYMOO_INTERACT_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes', 'on')
+directory = None
+
+
+def _reset_registry():
+    """Forked workers start from an empty registry instead of re-reporting their parent's"""
+    global registry
+    registry = Registry()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_registry)
+
+
+def configure(enable, metrics_dir=None, clear=False):
+    """Turn instrumentation on or off and set where worker snapshots are exchanged
+
+    The serving process clears the directory on startup so counters of a previous server do not
+    leak into the new one.
+    """
+    global enabled, directory
+    enabled = bool(enable)
+    directory = metrics_dir or None
+    if enabled and directory:
+        os.makedirs(directory, exist_ok=True)
+        if clear:
+            # The directory may hold other files, only the snapshots written by flush() go
+            for path in _snapshots(directory, temporary=True):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _snapshots(directory, temporary=False):
+    """Paths of the worker snapshots in directory, <pid>.json, optionally with unfinished writes"""
+    paths = glob.glob(os.path.join(directory, '*.json'))
+    if temporary:
+        paths += glob.glob(os.path.join(directory, '*.json.tmp'))
+    return [path for path in paths if os.path.basename(path).split('.')[0].isdigit()]
+
+
+def span(name):
+    """Context manager timing a section into the span_seconds histogram"""
+    if not enabled:
+        return _NOOP
+    return _Span(name)
+
+
+def observe(name, seconds):
+    """Add a section timed elsewhere to the span_seconds histogram"""
+    if enabled:
+        registry.observe('span_seconds', seconds, span=name)
+
+
+def record_run(n_eval, n_gen, seconds):
+    """Count a finished run and its throughput"""
+    if not enabled:
+        return
+    registry.inc('runs_total')
+    registry.inc('evaluations_total', n_eval)
+    registry.inc('generations_total', n_gen)
+    if seconds > 0:
+        registry.observe('evaluations_per_second', n_eval / seconds)
+        registry.observe('generations_per_second', n_gen / seconds)
+
+
+def flush():
+    """Write this process' registry where the serving process picks it up"""
+    if not enabled or not directory:
+        return
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(path + '.tmp', path)
+    except OSError:
+        pass
+
+
+def render():
+    """Prometheus text of this process merged with the snapshots of all worker processes"""
+    merged = Registry()
+    merged.merge(registry.snapshot())
+    if directory:
+        own = os.path.join(directory, f"{os.getpid()}.json")
+        for path in _snapshots(directory):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    merged.merge(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return merged.render()
@@ -0,0 +1,531 @@
+"""Island model: sub-populations evolving in parallel processes and exchanging migrants
+
+The population of a run is split into islands, each an NSGA-II/NSGA-III session of its own
+with a seed of its own, running in a separate process. Every migration_interval generations
+each island sends copies of its best solutions, migration_rate of its population, to the
+islands the topology connects it with. The immigrants compete with the residents in the usual
+survival. At the end, the final fronts of all islands are merged into one non-dominated archive.
+
+Locally, migrants are exchanged through a shared memory block of NumPy buffers, and the islands
+migrate in lockstep behind a barrier, so island runs are as reproducible as single runs. Islands
+on several nodes exchange migrants through a broker process instead, a stand-in for a message
+broker built on multiprocessing.managers (use it on trusted networks only, it unpickles what it
+receives). From the backend directory:
+
+    python -m optimization.islands run dtlz2 nsga3 --n-obj 3 --pop-size 2000 --islands 8
+    python -m optimization.islands broker --bind 0.0.0.0:5500 --authkey secret
+    python -m optimization.islands island dtlz2 nsga3 --islands 8 --ids 0,1,2,3 --broker head:5500 --authkey secret
+    python -m optimization.islands collect --islands 8 --broker head:5500 --authkey secret --output front.json
+"""
+import os
+import sys
+import json
+import math
+import random
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.managers import BaseManager
+from threading import BrokenBarrierError
+
+import numpy as np
+
+from optimization.optimizer import OptimizationHandler
+from optimization.sessions import Session, _random_lock
+from optimization.restarts import merge_fronts
+from optimization.encoding import json_default
+
+# Migration needs the population-based survival of the genetic algorithms
+ISLAND_ALGORITHMS = ('nsga2', 'nsga3')
+TOPOLOGIES = ('ring', 'star', 'complete')
+MAX_ISLANDS = 64
+
+# Keys of a run config that describe the island model rather than a single run
+ISLAND_KEYS = ('islands', 'topology', 'migration_interval', 'migration_rate')
+
+DEFAULT_INTERVAL = 10
+DEFAULT_RATE = 0.1
+
+# Seconds an island waits for the migrants of its neighbours before giving up
+MIGRATION_TIMEOUT = 600.0
+
+
+def island_config(config, island):
+    """Arguments of the OptimizationHandler of one island
+
+    The islands share the population of the run and continue to n_gen generations, since they
+    migrate in lockstep and an island that stopped early would leave its neighbours waiting.
+    """
+    island_config = {k: v for k, v in config.items() if k not in ISLAND_KEYS}
+    island_config['pop_size'] = math.ceil(config.get('pop_size', 100) / config['islands'])
+    island_config['seed'] = config.get('seed', 1) + island
+    island_config['early_stopping'] = False
+    return island_config
+
+
+def n_migrants(config):
+    """Solutions each island sends per migration"""
+    pop_size = math.ceil(config.get('pop_size', 100) / config['islands'])
+    return max(1, round(config.get('migration_rate', DEFAULT_RATE) * pop_size))
+
+
+def validate(config):
+    """Raise ValueError unless config describes a valid island run"""
+    islands = config['islands']
+    if not 2 <= islands <= MAX_ISLANDS:
+        raise ValueError(f"islands must be between 2 and {MAX_ISLANDS}, got {islands}")
+    if config['algorithm_id'] not in ISLAND_ALGORITHMS:
+        raise ValueError(f"Island runs support {', '.join(ISLAND_ALGORITHMS)}, not {config['algorithm_id']}")
+    if config.get('topology', 'ring') not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology: {config['topology']}. Choose one of {', '.join(TOPOLOGIES)}")
+    if config.get('migration_interval', DEFAULT_INTERVAL) < 1:
+        raise ValueError(f"migration_interval must be at least 1, got {config['migration_interval']}")
+    if not 0 < config.get('migration_rate', DEFAULT_RATE) <= 1:
+        raise ValueError(f"migration_rate must be in (0, 1], got {config['migration_rate']}")
+    if config.get('pop_size', 100) < 2 * islands:
+        raise ValueError(f"pop_size must be at least 2 per island, got {config.get('pop_size', 100)} for {islands}")
+    OptimizationHandler(**island_config(config, 0))
+
+
+def sources(topology, island, islands):
+    """Islands whose migrants the given island receives"""
+    if topology == 'ring':
+        return [(island - 1) % islands]
+    if topology == 'star':
+        # The first island is the hub
+        return list(range(1, islands)) if island == 0 else [0]
+    return [other for other in range(islands) if other != island]
+
+
+class SharedMemoryExchange:
+    """Migrant buffers of all islands of a machine in one shared memory block
+
+    Every island owns a slot of n_migrants rows of decision variables and objectives, twice, so
+    it can write the migrants of the next migration while its neighbours still read the last
+    one. The barrier makes sure every island has written before any reads. Create it in the
+    parent process, hand it to the island processes and close it there once they are done.
+    """
+
+    def __init__(self, islands, n_migrants, width, context=None):
+        context = context or multiprocessing.get_context()
+        self.shape = (2, islands, n_migrants, width)
+        self.barrier = context.Barrier(islands)
+        size = int(np.prod(self.shape)) * 8 + 2 * islands * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self._shm.name
+        # Only the creating process unlinks, forked islands inherit the mapping
+        self._owner = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        return state
+
+    def _buffers(self):
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)
+        rows = np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf)
+        counts = np.ndarray(self.shape[:2], dtype=np.int64, buffer=self._shm.buf, offset=rows.nbytes)
+        return rows, counts
+
+    def migrate(self, epoch, island, migrants, neighbours):
+        """Publish the migrants of an island and return the ones of its neighbours"""
+        rows, counts = self._buffers()
+        slot = epoch % 2
+        rows[slot, island, :len(migrants)] = migrants
+        counts[slot, island] = len(migrants)
+        self.barrier.wait(MIGRATION_TIMEOUT)
+        return [rows[slot, other, :counts[slot, other]].copy() for other in neighbours]
+
+    def abort(self):
+        """Release islands waiting for migrants, e.g. when the run is cancelled"""
+        self.barrier.abort()
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner == os.getpid():
+                self._shm.unlink()
+            self._shm = None
+
+
+class Mailbox:
+    """Key-value store held by the broker process"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+
+    def get(self, key):
+        with self._lock:
+            return self._items.get(key)
+
+    def clear(self, run_id):
+        with self._lock:
+            for key in [key for key in self._items if key[0] == run_id]:
+                del self._items[key]
+
+
+_mailbox = Mailbox()
+
+
+class BrokerManager(BaseManager):
+    pass
+
+
+BrokerManager.register('mailbox', callable=lambda: _mailbox)
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class BrokerExchange:
+    """Migrant exchange through a broker, for islands running on several nodes
+
+    Messages are keyed by run id, migration and island, so islands never overwrite migrants a
+    slower neighbour has not read yet. The connection is opened in the island's process.
+    """
+
+    def __init__(self, address, authkey, run_id='default', poll=0.05):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.authkey = authkey.encode() if isinstance(authkey, str) else authkey
+        self.run_id = run_id
+        self.poll = poll
+        self._box = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_box'] = None
+        return state
+
+    @property
+    def mailbox(self):
+        if self._box is None:
+            manager = BrokerManager(address=self.address, authkey=self.authkey)
+            manager.connect()
+            self._box = manager.mailbox()
+        return self._box
+
+    def wait(self, key, timeout=MIGRATION_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            value = self.mailbox.get(key)
+            if value is not None:
+                return value
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Nothing arrived for {key} within {timeout:.0f}s")
+            time.sleep(self.poll)
+
+    def migrate(self, epoch, island, migrants, neighbours):
+        # Raw buffers instead of pickled arrays
+        self.mailbox.put((self.run_id, epoch, island), (migrants.shape, migrants.tobytes()))
+        received = []
+        for other in neighbours:
+            shape, data = self.wait((self.run_id, epoch, other))
+            received.append(np.frombuffer(data, dtype=np.float64).reshape(shape))
+        return received
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+    def publish_result(self, island, result):
+        self.mailbox.put((self.run_id, 'result', island), result)
+
+    def collect_results(self, islands, timeout):
+        results = [self.wait((self.run_id, 'result', island), timeout) for island in range(islands)]
+        self.mailbox.clear(self.run_id)
+        return results
+
+
+def emigrants(session, n):
+    """The first n survivors of an island, which come from its best fronts, as rows of X and F"""
+    pop = session.algorithm.pop[:n]
+    return np.hstack([pop.get('X'), pop.get('F')]).astype(np.float64)
+
+
+def immigrate(session, migrants):
+    """Let migrants compete with the population of an island, returning how many survived"""
+    from pymoo.core.population import Population
+
+    if not migrants:
+        return 0
+    rows = np.vstack(migrants)
+    n_var = session.handler.n_var
+    algorithm = session.algorithm
+    with session.lock, _random_lock:
+        # Survival breaks ties at random, draw from the island's random state like its generations
+        np.random.set_state(session.random_state[0])
+        random.setstate(session.random_state[1])
+        immigrants = Population.new(X=rows[:, :n_var], F=rows[:, n_var:])
+        # They were evaluated on their home island
+        for individual in immigrants:
+            individual.evaluated = set(algorithm.pop[0].evaluated)
+        immigrants = algorithm.eliminate_duplicates.do(immigrants, algorithm.pop)
+
+        merged = Population.merge(algorithm.pop, immigrants)
+        algorithm.pop = algorithm.survival.do(algorithm.problem, merged, n_survive=algorithm.pop_size,
+                                              algorithm=algorithm)
+        session.random_state = (np.random.get_state(), random.getstate())
+        arrived = {id(individual) for individual in immigrants}
+        return sum(id(individual) in arrived for individual in algorithm.pop)
+
+
+def evolve_island(config, island, exchange, stop=None):
+    """Run one island to n_gen generations, migrating every migration_interval generations"""
+    started = time.perf_counter()
+    session = Session(island_config(config, island))
+    n_gen = config['n_gen']
+    interval = config.get('migration_interval', DEFAULT_INTERVAL)
+    neighbours = sources(config.get('topology', 'ring'), island, config['islands'])
+    count = n_migrants(config)
+
+    stats = {'island': island, 'seed': session.handler.seed, 'migrations': 0, 'sent': 0, 'received': 0,
+             'accepted': 0, 'migration_time': 0.0}
+    while session.generation < n_gen:
+        session.step(min(interval, n_gen - session.generation))
+        if session.generation >= n_gen or (stop is not None and stop.is_set()):
+            break
+
+        start = time.perf_counter()
+        try:
+            migrants = exchange.migrate(stats['migrations'] + 1, island, emigrants(session, count), neighbours)
+        except BrokenBarrierError:
+            # The run was cancelled or another island failed
+            break
+        stats['migrations'] += 1
+        stats['sent'] += count
+        stats['received'] += sum(len(rows) for rows in migrants)
+        stats['accepted'] += immigrate(session, migrants)
+        stats['migration_time'] += time.perf_counter() - start
+
+    result = session.result()
+    stats['compute_time'] = session.compute_time
+    stats['wall_time'] = time.perf_counter() - started
+    # The island has its process to itself
+    stats['cpu_time'] = time.process_time()
+    result['island'] = stats
+    return result
+
+
+def _island_process(config, island, exchange, stop, results):
+    try:
+        results.put((island, evolve_island(config, island, exchange, stop)))
+    except Exception as e:
+        results.put((island, f"Island {island} failed: {e}"))
+        exchange.abort()
+    finally:
+        exchange.close()
+
+
+def evolve_islands(config, ids, exchange, cancel_event=None):
+    """Run the given islands in processes of their own and return their results in the order of ids"""
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    results = context.Queue()
+    processes = [context.Process(target=_island_process, args=(config, island, exchange, stop, results), daemon=True)
+                 for island in ids]
+    for process in processes:
+        process.start()
+
+    collected = {}
+    try:
+        while len(collected) < len(ids):
+            if cancel_event is not None and cancel_event.is_set() and not stop.is_set():
+                # Islands stop at their next migration and report what they have
+                stop.set()
+                exchange.abort()
+            try:
+                island, result = results.get(timeout=0.2)
+            except queue.Empty:
+                crashed = [process for process in processes if process.exitcode not in (None, 0)]
+                if crashed:
+                    raise RuntimeError(f"An island process exited with code {crashed[0].exitcode}")
+                continue
+            if isinstance(result, str):
+                raise RuntimeError(result)
+            collected[island] = result
+    finally:
+        stop.set()
+        exchange.abort()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+    return [collected[island] for island in ids]
+
+
+def merge_islands(config, results, wall_time):
+    """One result for an island run, see merge_results in optimization.restarts for the shape"""
+    islands = config['islands']
+    X, F, origin = merge_fronts(results, list(range(islands)))
+
+    handler = OptimizationHandler(**island_config(config, 0))
+    handler._setup_indicators()
+    archive = handler.compute_indicators(F)
+    archive['n_points'] = len(F)
+
+    runs = []
+    for island, result in enumerate(results):
+        final = result['history'][-1]
+        runs.append(dict(
+            result['island'],
+            hv=final.get('hv'),
+            igd=final.get('igd'),
+            n_points=len(np.atleast_2d(result['F'])),
+            archive_points=int(np.sum(origin == island)),
+        ))
+
+    best = max(range(islands), key=lambda island: results[island]['history'][-1].get('hv') or 0.0)
+    merged = dict(results[best])
+    merged.pop('island')
+    merged.update({
+        'X': X,
+        'F': F,
+        'origin': origin,
+        'generation': max(result['generation'] for result in results),
+        'execution_time': wall_time,
+        'statistics': dict(results[best]['statistics'], pop_size=config.get('pop_size', 100),
+                           seed=config.get('seed', 1), islands=islands,
+                           island_pop_size=island_config(config, 0)['pop_size']),
+        'islands': {
+            'archive': archive,
+            'best_island': best,
+            'topology': config.get('topology', 'ring'),
+            'migration_interval': config.get('migration_interval', DEFAULT_INTERVAL),
+            'migration_rate': config.get('migration_rate', DEFAULT_RATE),
+            'migrants': n_migrants(config),
+            # Compare with execution_time: islands on enough cores take about cpu_time / islands
+            'cpu_time': sum(run['cpu_time'] for run in runs),
+            'runs': runs,
+        },
+    })
+    return merged
+
+
+def run_islands(config, cancel_event=None):
+    """Run all islands of config on this machine, exchanging migrants through shared memory"""
+    start = time.perf_counter()
+    handler = OptimizationHandler(**island_config(config, 0))
+    exchange = SharedMemoryExchange(config['islands'], n_migrants(config), handler.n_var + handler.n_obj)
+    try:
+        results = evolve_islands(config, list(range(config['islands'])), exchange, cancel_event)
+    finally:
+        exchange.close()
+    return merge_islands(config, results, time.perf_counter() - start)
+
+
+def print_islands(result):
+    info = result['islands']
+    print(f"{'island':>6}{'HV':>12}{'points':>8}{'in archive':>12}{'accepted':>10}{'compute':>10}{'migrating':>11}")
+    for run in info['runs']:
+        print(f"{run['island']:>6}{run['hv']:>12.4f}{run['n_points']:>8}{run['archive_points']:>12}"
+              f"{run['accepted']:>6}/{run['received']:<3}{run['compute_time']:>9.2f}s{run['migration_time']:>10.2f}s")
+    archive = info['archive']
+    print(f"\nArchive: {archive['n_points']} points, HV {archive['hv']:.4f}"
+          + (f", IGD {archive['igd']:.4f}" if 'igd' in archive else ''))
+    print(f"Wall time {result['execution_time']:.2f}s for {info['cpu_time']:.2f}s of CPU time on {len(info['runs'])} islands")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Island-model runs with migration between processes and nodes')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def run_arguments(command, help):
+        sub = commands.add_parser(command, help=help)
+        sub.add_argument('problem')
+        sub.add_argument('algorithm')
+        sub.add_argument('--islands', type=int, default=os.cpu_count() or 2)
+        sub.add_argument('--topology', choices=TOPOLOGIES, default='ring')
+        sub.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='generations between migrations')
+        sub.add_argument('--rate', type=float, default=DEFAULT_RATE, help='share of an island sent per migration')
+        sub.add_argument('--seed', type=int, default=1)
+        sub.add_argument('--n-var', type=int, default=10)
+        sub.add_argument('--n-obj', type=int, default=2)
+        sub.add_argument('--pop-size', type=int, default=100, help='population of all islands together')
+        sub.add_argument('--n-gen', type=int, default=200)
+        return sub
+
+    def authkey_argument(sub):
+        sub.add_argument('--authkey', default=os.environ.get('PYMOO_INTERACT_BROKER_KEY', ''),
+                         help='shared secret of the broker and its islands (default $PYMOO_INTERACT_BROKER_KEY)')
+
+    def broker_arguments(sub):
+        sub.add_argument('--broker', required=True, help='host:port of the broker')
+        sub.add_argument('--run-id', default='default', help='keeps several runs on one broker apart')
+        authkey_argument(sub)
+
+    run = run_arguments('run', 'run all islands on this machine')
+    run.add_argument('--output', help='write the merged result to this JSON file')
+    island = run_arguments('island', 'run some islands of a distributed run against a broker')
+    island.add_argument('--ids', required=True, help='comma separated islands to run on this node')
+    broker_arguments(island)
+    broker = commands.add_parser('broker', help='serve the migrant exchange of distributed runs')
+    broker.add_argument('--bind', default='127.0.0.1:5500', help='host:port to listen on, 0.0.0.0 for other nodes')
+    authkey_argument(broker)
+    collect = commands.add_parser('collect', help='merge the results of a distributed run')
+    collect.add_argument('--islands', type=int, required=True)
+    collect.add_argument('--timeout', type=float, default=24 * 3600)
+    collect.add_argument('--output', help='write the merged result to this JSON file')
+    broker_arguments(collect)
+    args = parser.parse_args(argv)
+
+    # The broker unpickles what it receives, without a secret anyone who reaches it could run code
+    if args.command != 'run' and not args.authkey:
+        parser.error(f"{args.command} needs a non-empty --authkey (or PYMOO_INTERACT_BROKER_KEY)")
+
+    if args.command == 'broker':
+        print(f"Broker listening on {args.bind}")
+        BrokerManager(address=parse_address(args.bind), authkey=args.authkey.encode()).get_server().serve_forever()
+        return 0
+
+    if args.command == 'collect':
+        exchange = BrokerExchange(args.broker, args.authkey, args.run_id)
+        results = exchange.collect_results(args.islands, args.timeout)
+        config = results[0]['island'].pop('config')
+        for result in results[1:]:
+            result['island'].pop('config')
+        # The islands ran on their nodes, the slowest one determines the wall time
+        result = merge_islands(config, results, max(result['island']['wall_time'] for result in results))
+    else:
+        config = {
+            'problem_id': args.problem, 'algorithm_id': args.algorithm, 'n_var': args.n_var, 'n_obj': args.n_obj,
+            'pop_size': args.pop_size, 'n_gen': args.n_gen, 'seed': args.seed, 'islands': args.islands,
+            'topology': args.topology, 'migration_interval': args.interval, 'migration_rate': args.rate,
+        }
+        validate(config)
+
+        if args.command == 'island':
+            ids = [int(island) for island in args.ids.split(',')]
+            exchange = BrokerExchange(args.broker, args.authkey, args.run_id)
+            print(f"Running islands {ids} of {args.islands}...")
+            for island, result in zip(ids, evolve_islands(config, ids, exchange)):
+                result['island']['config'] = config
+                exchange.publish_result(island, result)
+            print("Results sent to the broker")
+            return 0
+
+        print(f"Running {args.islands} islands of {island_config(config, 0)['pop_size']}...")
+        result = run_islands(config)
+
+    print_islands(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, default=json_default)
+        print(f"\nResult written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,397 @@
+import os
+import time
+import uuid
+import cProfile
+import queue
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, CancelledError, wait as wait_futures
+
+from optimization.optimizer import OptimizationHandler, run_config
+from optimization.checkpoints import CheckpointStore
+from optimization import artifacts
+from optimization import instrumentation
+from optimization.resources import memory_limit
+
+
+def init_worker(artifact_dir, instrumented, metrics_dir):
+    """Share the artifact store and the instrumentation settings of the serving process"""
+    artifacts.configure(artifact_dir)
+    instrumentation.configure(instrumented, metrics_dir)
+
+
+def run_optimization(config, cancel_event=None, progress=None, front=None, checkpoint_dir=None,
+                     verbose=True, profile_path=None, max_memory=None):
+    """Build a handler from a run configuration and execute it (runs inside a worker process)
+
+    With a profile_path the run is profiled with cProfile and the stats are dumped there. With
+    max_memory the worker fails the run with a MemoryError once it allocates more than that.
+    Island runs (config['islands'] > 1) start their islands as child processes of the worker.
+    """
+    profiler = cProfile.Profile() if profile_path else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        with memory_limit(max_memory):
+            if config.get('islands', 1) > 1:
+                from optimization.islands import run_islands
+                return run_islands(config, cancel_event=cancel_event)
+
+            handler = OptimizationHandler(**config)
+            return handler.run(
+                cancel_event=cancel_event,
+                progress=progress.put if progress is not None else None,
+                front=front,
+                checkpoints=CheckpointStore(checkpoint_dir) if checkpoint_dir else None,
+                verbose=verbose
+            )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        instrumentation.flush()
+
+        # Tell the listener that no more progress records will follow
+        if progress is not None:
+            progress.put(None)
+
+
+class Job:
+    """A single optimization run submitted to the worker pool"""
+
+    def __init__(self, config, future, cancel_event, progress=None, cached=False, job_id=None, profile_path=None,
+                 usage=None, children=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.config = config
+        # Settled by the JobManager once the run dispatched to the worker pool (task) finishes
+        self.future = future
+        self.task = None
+        self.cancel_event = cancel_event
+        self.progress = progress
+        self.cached = cached
+        self.profile_path = profile_path
+        # Estimated memory and time, see resources.estimate
+        self.usage = usage
+        # Jobs of a group (see JobManager.submit_group) whose results this job merges
+        self.children = children or []
+        self.cancelled = False
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future):
+        self.finished_at = time.time()
+
+    @property
+    def status(self):
+        if self.cancelled or self.future.cancelled():
+            return 'cancelled'
+        if not self.future.done():
+            # Waiting for memory budget, or for a free worker
+            if self.children:
+                started = any(child.status != 'queued' for child in self.children)
+            else:
+                started = self.task is not None and (self.task.running() or self.task.done())
+            return 'running' if started else 'queued'
+        if self.future.exception() is not None:
+            return 'failed'
+        return 'completed'
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def error(self):
+        """Return the error message of a failed job, None otherwise"""
+        if self.status != 'failed':
+            return None
+        return str(self.future.exception())
+
+    def result(self, timeout=None):
+        """Block until the job has finished and return its result"""
+        if self.cancelled:
+            raise CancelledError()
+        return self.future.result(timeout=timeout)
+
+    def to_dict(self):
+        info = {
+            'job_id': self.id,
+            'status': self.status,
+            'stream': self.progress is not None,
+            'cached': self.cached,
+            'profiled': self.profile_path is not None,
+            'config': self.config,
+            'estimate': self.usage,
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at,
+        }
+        if self.children:
+            info['children'] = [child.id for child in self.children]
+        if self.status == 'failed':
+            info['message'] = self.error()
+        return info
+
+
+class JobManager:
+    """Runs optimization jobs on a bounded process pool and keeps track of their state
+
+    With resources.ResourceLimits, runs over the per-job limits are rejected and admitted runs
+    wait in submission order until the estimated memory of the running ones leaves room for them.
+    With a runstore.RunStore, every completed run is persisted under its job id.
+    """
+
+    def __init__(self, max_workers=None, max_finished=1000, cache=None, checkpoint_dir=None, verbose=True,
+                 profile_dir=None, limits=None, run_store=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_finished = max_finished
+        self.cache = cache
+        self.checkpoint_dir = checkpoint_dir
+        self.profile_dir = profile_dir
+        self.limits = limits
+        self.run_store = run_store
+        self.verbose = verbose
+        self._executor = None
+        self._manager = None
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        # Reentrant because a task that is already done runs _finish from within _dispatch
+        self._lock = threading.RLock()
+        if limits is not None:
+            limits.on_release(self._admit)
+
+    def _get_executor(self):
+        """Create the worker pool lazily so importing the app stays cheap"""
+        if self._executor is None:
+            # Workers memory-map the artifacts persisted by this process instead of recomputing them
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=init_worker,
+                initargs=(artifacts.store.root, instrumentation.enabled, instrumentation.directory)
+            )
+            # The manager hosts the cancellation events and progress queues shared with the workers
+            self._manager = multiprocessing.Manager()
+        return self._executor
+
+    def submit(self, config, stream=False, front=None, profile=False):
+        """Queue a run and return the job immediately
+
+        Streaming jobs publish one record per generation on job.progress, including the current
+        front when a lod.FrontSampler is given. Profiled jobs always run (a cached result has
+        nothing to profile) and dump their cProfile stats to job.profile_path.
+
+        Raises ValueError if the run exceeds the per-job resource limits.
+        """
+        usage = None
+        if self.limits is not None:
+            config, usage = self.limits.plan(config)
+
+        cached = self.cache.get(run_config(config)) if self.cache is not None and not profile else None
+        if cached is not None:
+            return self._submit_cached(config, cached, stream, front)
+
+        job_id = uuid.uuid4().hex
+        profile_path = None
+        if profile:
+            if not self.profile_dir:
+                raise ValueError("Profiling is not available on this server")
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_path = os.path.join(self.profile_dir, f"{job_id}.prof")
+
+        with self._lock:
+            self._get_executor()
+            cancel_event = self._manager.Event()
+            progress = self._manager.Queue() if stream else None
+            job = Job(config, Future(), cancel_event, progress, job_id=job_id, profile_path=profile_path,
+                      usage=usage)
+            self._jobs[job.id] = job
+            self._pending.append((job, front))
+            self._dispatch()
+            self._evict_finished()
+
+        if self.cache is not None:
+            job.future.add_done_callback(lambda f: self._store_result(job))
+        return job
+
+    def submit_group(self, config, configs, merge):
+        """Queue several runs and return a job that settles with merge(results) once all have finished
+
+        The runs are regular jobs, so they execute in parallel and are cached on their own.
+        results holds None for runs that failed or were cancelled. merge runs on a thread of its
+        own, and an exception it raises fails the group job. Cancelling the group cancels its runs.
+
+        Raises ValueError if any of the runs exceeds the per-job resource limits.
+        """
+        # Check every run before queueing any of them
+        if self.limits is not None:
+            for run_config in configs:
+                self.limits.plan(run_config)
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+        children = [self.submit(run_config) for run_config in configs]
+        job = Job(config, future, threading.Event(), cached=all(child.cached for child in children), children=children)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+
+        remaining = [len(job.children)]
+
+        def on_child_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            threading.Thread(target=self._merge_group, args=(job, merge), daemon=True).start()
+
+        for child in job.children:
+            child.future.add_done_callback(on_child_done)
+        return job
+
+    def _merge_group(self, job, merge):
+        """Settle a group job with the merged results of its runs"""
+        if job.cancelled:
+            job.future.set_exception(CancelledError())
+            return
+        results = [child.future.result() if child.status == 'completed' else None for child in job.children]
+        try:
+            job.future.set_result(merge(results))
+        except Exception as e:
+            job.future.set_exception(e)
+
+    def _dispatch(self):
+        """Hand pending jobs to the pool while the memory budget allows (called with the lock held)"""
+        while self._pending:
+            job, front = self._pending[0]
+            memory = job.usage['memory_bytes'] if job.usage is not None else 0
+            # A job larger than the whole budget still runs, alone
+            if self.limits is not None and not self.limits.reserve(memory):
+                return
+            self._pending.popleft()
+            if not job.future.set_running_or_notify_cancel():
+                if self.limits is not None:
+                    self.limits.release(memory)
+                continue
+
+            job.task = self._get_executor().submit(
+                run_optimization, job.config, job.cancel_event, job.progress, front, self.checkpoint_dir,
+                self.verbose, job.profile_path, self.limits.job_memory if self.limits is not None else None
+            )
+            job.task.add_done_callback(lambda task, job=job, memory=memory: self._finish(job, task, memory))
+
+    def _admit(self):
+        """Hand pending jobs to the pool once a job or a session released memory"""
+        with self._lock:
+            self._dispatch()
+
+    def _finish(self, job, task, memory):
+        """Settle a job with the outcome of its task and admit the next pending jobs"""
+        if self.limits is not None:
+            self.limits.release(memory)
+
+        if task.cancelled():
+            job.cancelled = True
+            job.future.set_exception(CancelledError())
+        elif task.exception() is not None:
+            job.future.set_exception(task.exception())
+        else:
+            job.future.set_result(task.result())
+            # Runs stopped by a cancellation are not worth keeping
+            if self.run_store is not None and not job.cancelled:
+                self.run_store.submit(job.config, task.result(), run_id=job.id)
+
+    def _submit_cached(self, config, result, stream, front=None):
+        """Register an already finished job for a configuration found in the cache"""
+        future = Future()
+        future.set_result(result)
+
+        # Replay the recorded history so streaming clients still see every generation
+        progress = None
+        if stream:
+            progress = queue.Queue()
+            for record in result['history'][:-1]:
+                progress.put(record)
+            # Only the final front is known, so it comes with the last generation
+            last = dict(result['history'][-1])
+            if front is not None:
+                last.update(front(result['F']))
+            progress.put(last)
+            progress.put(None)
+
+        job = Job(config, future, threading.Event(), progress, cached=True)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        return job
+
+    def _store_result(self, job):
+        """Cache the result of a run that completed without being cancelled"""
+        if job.status == 'completed':
+            self.cache.put(run_config(job.config), job.future.result())
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued job or ask a running one to stop at the next generation"""
+        job = self.get(job_id)
+        if job is not None:
+            self._cancel(job)
+        return job
+
+    def _cancel(self, job):
+        if job.done:
+            return
+        job.cancelled = True
+
+        # A group settles as cancelled once its last run has stopped
+        if job.children:
+            for child in job.children:
+                self._cancel(child)
+            return
+
+        # Queued jobs never reach a worker, running ones stop cooperatively
+        if not job.future.cancel() and not (job.task is not None and job.task.cancel()):
+            job.cancel_event.set()
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs once more than max_finished are retained"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            job = self._jobs.pop(job_id)
+            if job.profile_path:
+                try:
+                    os.remove(job.profile_path)
+                except OSError:
+                    pass
+
+    def drain(self, timeout=None):
+        """Give unfinished jobs up to timeout seconds, then cancel the rest and shut down
+
+        Jobs finishing in time still reach the result cache and the run store.
+        """
+        unfinished = [job for job in self.list() if not job.done]
+        wait_futures([job.future for job in unfinished], timeout=timeout)
+        for job in unfinished:
+            self._cancel(job)
+        self.shutdown()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            while self._pending:
+                self._pending.popleft()[0].future.cancel()
+            executor, manager = self._executor, self._manager
+            self._executor = None
+            self._manager = None
+        # Without the lock, which the jobs still finishing take in _finish
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+            manager.shutdown()
+        if wait and self.run_store is not None:
+            self.run_store.flush()
@@ -0,0 +1,158 @@
+"""Level of detail for Pareto fronts sent to the browser
+
+Fronts are reduced to a requested number of points either by crowding distance (repeatedly
+dropping the most crowded points, which keeps the extremes and an even spread along the
+front) or by reference directions (one point per Das-Dennis direction, as in NSGA-III).
+"""
+import numpy as np
+
+from optimization.artifacts import front_directions
+from optimization.indicators import DISTANCE_CHUNK
+
+LOD_METHODS = ('crowding', 'reference')
+
+# Share of the surplus points removed per crowding distance pass
+CROWDING_PRUNE_FRACTION = 0.1
+
+
+def crowding_distance(F):
+    """NSGA-II crowding distance, infinite for the extreme points of every objective"""
+    n, n_obj = F.shape
+    if n <= 2:
+        return np.full(n, np.inf)
+
+    order = np.argsort(F, axis=0, kind='stable')
+    F_sorted = F[order, np.arange(n_obj)]
+    span = F_sorted[-1] - F_sorted[0]
+    span[span == 0] = 1.0
+    gaps = np.diff(F_sorted, axis=0) / span
+
+    distance_sorted = np.full((n, n_obj), np.inf)
+    distance_sorted[1:-1] = gaps[:-1] + gaps[1:]
+    distance = np.empty((n, n_obj))
+    distance[order, np.arange(n_obj)] = distance_sorted
+    return distance.sum(axis=1)
+
+
+def crowding_subset(F, max_points):
+    """Indices of max_points points, pruning the most crowded ones a batch at a time
+
+    Recomputing the distances after every batch avoids tearing holes into dense regions, where
+    neighbouring points all have small distances before any of them is removed.
+    """
+    keep = np.arange(len(F))
+    while len(keep) > max_points:
+        surplus = len(keep) - max_points
+        n_remove = max(1, min(surplus, int(len(keep) * CROWDING_PRUNE_FRACTION)))
+        distance = crowding_distance(F[keep])
+        keep = np.delete(keep, np.argpartition(distance, n_remove - 1)[:n_remove])
+    return keep
+
+
+def reference_subset(F, max_points):
+    """Indices of up to max_points points, spread across Das-Dennis reference directions
+
+    Points are normalized to the bounding box of the front and associated with the direction
+    of smallest perpendicular distance. The point closest to each direction is taken first,
+    then the second closest and so on until max_points are selected.
+    """
+    n, n_obj = F.shape
+    ideal, nadir = F.min(axis=0), F.max(axis=0)
+    span = nadir - ideal
+    span[span == 0] = 1.0
+    N = (F - ideal) / span
+
+    directions = front_directions(n_obj, max_points)
+    directions = directions / np.linalg.norm(directions, axis=1, keepdims=True)
+
+    niche, distance = np.empty(n, dtype=int), np.empty(n)
+    squared_norm = np.einsum('ij,ij->i', N, N)
+    chunk = max(1, DISTANCE_CHUNK // len(directions))
+    for start in range(0, n, chunk):
+        projection = N[start:start + chunk] @ directions.T
+        perpendicular = squared_norm[start:start + chunk, None] - projection ** 2
+        niche[start:start + chunk] = np.argmin(perpendicular, axis=1)
+        distance[start:start + chunk] = perpendicular[np.arange(len(projection)), niche[start:start + chunk]]
+
+    # Rank of every point within its niche by distance to the direction
+    order = np.lexsort((distance, niche))
+    first = np.searchsorted(niche[order], niche[order], side='left')
+    rank = np.empty(n, dtype=int)
+    rank[order] = np.arange(n) - first
+
+    return np.sort(np.lexsort((distance, rank))[:max_points])
+
+
+def check_lod(max_points, method):
+    """Raise ValueError for an unknown method or fewer than one point"""
+    if method not in LOD_METHODS:
+        raise ValueError(f"Unknown level of detail method: {method}. Choose one of {', '.join(LOD_METHODS)}")
+    if max_points is not None and max_points < 1:
+        raise ValueError(f"max_points must be at least 1, got {max_points}")
+
+
+def select_front(F, max_points, method='crowding'):
+    """Indices of at most max_points points of F chosen with one of LOD_METHODS"""
+    check_lod(max_points, method)
+    if max_points is None or len(F) <= max_points:
+        return np.arange(len(F))
+    if method == 'reference':
+        return reference_subset(F, max_points)
+    return np.sort(crowding_subset(F, max_points))
+
+
+def decimate_front(F, max_points, method='crowding'):
+    """Subsample a front to at most max_points"""
+    return F[select_front(F, max_points, method)]
+
+
+def reduce_result(result, max_points, method='crowding'):
+    """Copy of a result whose X and F hold at most max_points solutions of the final front"""
+    F = np.asarray(result['F'])
+    idx = select_front(F, max_points, method)
+    if len(idx) == len(F):
+        return result
+
+    reduced = dict(result)
+    reduced['X'] = np.asarray(result['X'])[idx]
+    reduced['F'] = F[idx]
+    # Merged restarts carry the seed of every point
+    if result.get('origin') is not None:
+        reduced['origin'] = np.asarray(result['origin'])[idx]
+    reduced['lod'] = {'method': method, 'max_points': max_points, 'n_points': len(F)}
+    return reduced
+
+
+class FrontSampler:
+    """Decimated fronts for the progress events of one run
+
+    With deltas, only the first front is sent in full ('front'). Later generations send
+    'front_delta' with the indices of the previously sent points that are gone and the points
+    that are new, applied by dropping the removed points and appending the added ones. A full
+    front is sent instead whenever that is smaller than the delta.
+    """
+
+    def __init__(self, max_points, method='crowding', deltas=False):
+        check_lod(max_points, method)
+        self.max_points = max_points
+        self.method = method
+        self.deltas = deltas
+        self._sent = None
+
+    def __call__(self, F):
+        """Return the front fields of a progress event"""
+        front = np.ascontiguousarray(decimate_front(F, self.max_points, self.method), dtype=float)
+        if not self.deltas:
+            return {'front': front}
+
+        keys = [row.tobytes() for row in front]
+        if self._sent is not None:
+            current, previous = set(keys), set(self._sent)
+            removed = [i for i, key in enumerate(self._sent) if key not in current]
+            added = [j for j, key in enumerate(keys) if key not in previous]
+            if len(removed) + len(added) * front.shape[1] < len(front) * front.shape[1]:
+                self._sent = [key for key in self._sent if key in current] + [keys[j] for j in added]
+                return {'front_delta': {'removed': removed, 'added': front[added]}}
+
+        self._sent = keys
+        return {'front': front}
@@ -1,241 +1,357 @@
-from pymoo.problems import get_problem
-from pymoo.algorithms.moo.nsga2 import NSGA2
-from pymoo.algorithms.moo.moead import MOEAD
-from pymoo.algorithms.moo.nsga3 import NSGA3
-from pymoo.optimize import minimize
-from pymoo.util.ref_dirs import get_reference_directions
-import numpy as np
+from optimization.checkpoints import CheckpointStore
+from optimization.streaming import ProgressCallback
+from optimization.recorder import MetricsRecorder
+from optimization.indicators import IndicatorEngine, DEFAULT_HV_SAMPLES, check_hv_samples
+from optimization.termination import ConvergenceTermination, has_converged
+from optimization.evaluation import EvaluationBackend
+from optimization.artifacts import reference_directions
+from optimization.sorting import FastNonDominatedSorting, choose_strategy
+from optimization.resources import FLOAT32_PROBLEMS, Float32Repair, HashDuplicateElimination
+from optimization.surrogate import SURROGATE_ALGORITHMS, SurrogateScreening, default_evals
+from optimization import registry
+from optimization import instrumentation
+import time
+import inspect
+
+# Arguments that change how a run executes but not its result
+EXECUTION_SETTINGS = ('evaluator', 'n_workers')
+
+def reference_partitions(n_obj):
+    """Das-Dennis partitions of the reference directions used by MOEAD and NSGA3"""
+    if n_obj >= 4:
+        return 5  # Reduce partitions for higher dimensions
+    elif n_obj == 3:
+        return 8
+    return 12
 
 class OptimizationHandler:
-    def __init__(self, problem_id, algorithm_id, n_var=10, n_obj=2, pop_size=100, n_gen=200):
+    def __init__(self, problem_id, algorithm_id, n_var=10, n_obj=2, pop_size=100, n_gen=200,
+                 hv_samples=DEFAULT_HV_SAMPLES, early_stopping=True, evaluator='vectorized', n_workers=None,
+                 seed=1, large_scale=False, surrogate=False, surrogate_evals=None):
         self.problem_id = problem_id
         self.algorithm_id = algorithm_id
         self.n_var = n_var
         self.n_obj = n_obj
         self.pop_size = pop_size
         self.n_gen = n_gen
+
+        # Sample budget of the hypervolume estimate used for more than three objectives
+        check_hv_samples(hv_samples)
+        self.hv_samples = hv_samples
+
+        # Whether the run ends as soon as it has converged instead of after n_gen generations
+        self.early_stopping = early_stopping
+
+        # Runs are fully determined by their configuration and this seed
+        self.seed = seed
+
+        # Memory-bounded operators for big populations, see optimization.resources
+        self.large_scale = large_scale
+
+        # Surrogate-assisted runs evaluate only surrogate_evals offspring per generation, see optimization.surrogate
+        self.surrogate = surrogate
+        self.surrogate_evals = None
+        if surrogate:
+            if algorithm_id not in SURROGATE_ALGORITHMS:
+                raise ValueError(f"Surrogate-assisted runs support {', '.join(SURROGATE_ALGORITHMS)}, not {algorithm_id}")
+            self.surrogate_evals = surrogate_evals or default_evals(pop_size)
+            if not 1 <= self.surrogate_evals <= pop_size:
+                raise ValueError(f"surrogate_evals must be between 1 and pop_size ({pop_size}), got {self.surrogate_evals}")
+
+        # How offspring are evaluated: in-process, on a thread pool or on a process pool
+        self.evaluation = EvaluationBackend(evaluator, n_workers)
+
+        # Wall time in seconds spent per phase: setup, minimize, indicators and postprocess
+        self.timings = {'setup': 0.0, 'minimize': 0.0, 'indicators': 0.0, 'postprocess': 0.0}
+        start = time.perf_counter()
         
         # Initialize problem
-        self.problem = self._get_problem()
+        with instrumentation.span('get_problem'):
+            self.problem = self._get_problem()
         
         # Initialize algorithm
-        self.algorithm = self._get_algorithm()
+        with instrumentation.span('get_algorithm'):
+            self.algorithm = self._get_algorithm()
+            if self.surrogate:
+                self._add_surrogate(self.algorithm)
+
+        self.timings['setup'] += time.perf_counter() - start
+        instrumentation.observe('handler_init', self.timings['setup'])
+
+    @property
+    def config(self):
+        """The arguments that fully determine a run"""
+        return {
+            'problem_id': self.problem_id,
+            'algorithm_id': self.algorithm_id,
+            'n_var': self.n_var,
+            'n_obj': self.n_obj,
+            'pop_size': self.pop_size,
+            'n_gen': self.n_gen,
+            'hv_samples': self.hv_samples,
+            'early_stopping': self.early_stopping,
+            'seed': self.seed,
+            'large_scale': self.large_scale,
+            'surrogate': self.surrogate,
+            'surrogate_evals': self.surrogate_evals,
+        }
 
     def _get_problem(self):
         """Initialize the optimization problem"""
         try:
-            problem_params = {"n_var": self.n_var}
-            
             # ZDT problems are always bi-objective
-            if self.problem_id in ["zdt1", "zdt2"]:
-                if self.n_obj != 2:
-                    raise ValueError(f"ZDT problems are bi-objective only. Got n_obj={self.n_obj}")
-                return get_problem(self.problem_id, **problem_params)
-            
-            # DTLZ problems can have variable number of objectives
-            elif self.problem_id in ["dtlz1", "dtlz2"]:
-                problem_params["n_obj"] = self.n_obj
-                return get_problem(self.problem_id, **problem_params)
-            else:
-                raise ValueError(f"Unsupported problem: {self.problem_id}")
+            if self.problem_id in ["zdt1", "zdt2"] and self.n_obj != 2:
+                raise ValueError(f"ZDT problems are bi-objective only. Got n_obj={self.n_obj}")
+
+            # The problem's pymoo module is imported on first use
+            return registry.create_problem(self.problem_id, self.n_var, self.n_obj)
         except Exception as e:
             raise ValueError(f"Failed to initialize problem {self.problem_id}: {str(e)}")
 
     def _get_algorithm(self):
         """Initialize the optimization algorithm"""
+        # Survival sorts parents and offspring together, see optimization.sorting
+        self.sorting = choose_strategy(self.n_obj, 2 * self.pop_size) if self.algorithm_id != "moead" else None
+
+        # Large-scale runs store float32 decision variables and find duplicates without a distance matrix
+        self.precision = 'float32' if self.large_scale and self.problem_id in FLOAT32_PROBLEMS else 'float64'
+        repair = Float32Repair() if self.precision == 'float32' else None
+        eliminate_duplicates = HashDuplicateElimination() if self.large_scale else True
         try:
+            # The algorithm's pymoo module is imported on first use
+            algorithm_class = registry.algorithm_class(self.algorithm_id)
             if self.algorithm_id == "nsga2":
-                return NSGA2(
+                from pymoo.algorithms.moo.nsga2 import RankAndCrowdingSurvival
+
+                return algorithm_class(
                     pop_size=self.pop_size,
-                    eliminate_duplicates=True
+                    eliminate_duplicates=eliminate_duplicates,
+                    repair=repair,
+                    survival=RankAndCrowdingSurvival(nds=FastNonDominatedSorting())
                 )
             elif self.algorithm_id == "moead":
                 # MOEAD specific settings
-                n_partitions = 12
-                if self.n_obj >= 4:
-                    n_partitions = 5  # Reduce partitions for higher dimensions
-                elif self.n_obj == 3:
-                    n_partitions = 8
-                
-                ref_dirs = get_reference_directions(
-                    "das-dennis", 
-                    n_dim=self.n_obj,
-                    n_partitions=n_partitions
-                )
+                ref_dirs = reference_directions(self.n_obj, reference_partitions(self.n_obj))
                 
-                return MOEAD(
+                return algorithm_class(
                     ref_dirs=ref_dirs,
                     n_neighbors=15,
                     prob_neighbor_mating=0.7,
+                    repair=repair
                 )
             elif self.algorithm_id == "nsga3":
+                from optimization.sorting import ReferenceDirectionSurvival
+
                 # NSGA3 specific settings
-                n_partitions = 12
-                if self.n_obj >= 4:
-                    n_partitions = 5  # Reduce partitions for higher dimensions
-                elif self.n_obj == 3:
-                    n_partitions = 8
+                ref_dirs = reference_directions(self.n_obj, reference_partitions(self.n_obj))
                 
-                ref_dirs = get_reference_directions(
-                    "das-dennis", 
-                    n_dim=self.n_obj,
-                    n_partitions=n_partitions
-                )
-                
-                return NSGA3(
+                return algorithm_class(
                     ref_dirs=ref_dirs,
-                    pop_size=self.pop_size
+                    pop_size=self.pop_size,
+                    survival=ReferenceDirectionSurvival(ref_dirs),
+                    eliminate_duplicates=eliminate_duplicates,
+                    repair=repair
                 )
-            else:
-                raise ValueError(f"Unknown algorithm: {self.algorithm_id}")
         except Exception as e:
             raise ValueError(f"Failed to initialize algorithm {self.algorithm_id}: {str(e)}")
 
-    def _check_convergence(self, result):
+    def _add_surrogate(self, algorithm):
+        """Mate the usual pop_size offspring per generation but only evaluate the surrogate_evals best"""
+        algorithm.n_offsprings = self.surrogate_evals
+        algorithm.mating = SurrogateScreening(algorithm.mating, self.pop_size, self.problem.xl, self.problem.xu)
+
+    def _check_convergence(self, recorder):
         """Check if the optimization has converged based on various metrics"""
-        if not hasattr(result, 'history') or len(result.history) < 2:
-            return False
-            
-        # Get the last few generations (reduced from 10 to 5)
-        last_gens = result.history[-5:]
-        
-        # Check objective values stability
-        if len(last_gens) >= 2:
-            obj_values = [np.mean(gen.opt.get('F')) for gen in last_gens]
-            obj_improvement = np.abs(np.diff(obj_values))
-            if np.mean(obj_improvement) < 1e-3:  # Relaxed threshold
-                return True
-        
-        # Check if the hypervolume improvement is minimal
-        if all(hasattr(gen, 'hv') for gen in last_gens):
-            hv_values = [gen.hv for gen in last_gens]
-            hv_improvement = np.abs(np.diff(hv_values))
-            if np.mean(hv_improvement) < 1e-3:  # Relaxed threshold
-                return True
-                
-        # Check if the number of non-dominated solutions is stable
-        if all(hasattr(gen, 'n_nds') for gen in last_gens):
-            nds_values = [gen.n_nds for gen in last_gens]
-            if len(set(nds_values)) == 1:  # All values are the same
-                return True
-            # Also check if the variation is minimal
-            nds_variation = np.std(nds_values) / np.mean(nds_values)
-            if nds_variation < 0.05:  # 5% variation threshold
-                return True
-                
-        # Check if the IGD improvement is minimal
-        if all(hasattr(gen, 'igd') for gen in last_gens):
-            igd_values = [gen.igd for gen in last_gens]
-            igd_improvement = np.abs(np.diff(igd_values))
-            if np.mean(igd_improvement) < 1e-3:  # Relaxed threshold
-                return True
-        
-        return False
+        with instrumentation.span('check_convergence'):
+            return has_converged(recorder)
+
+    def _get_termination(self, recorder):
+        """Stop after n_gen generations, or as soon as the run has converged if early stopping is on"""
+        return ConvergenceTermination(recorder, self.n_gen, early_stopping=self.early_stopping)
+
+    def _setup_indicators(self):
+        """Initialize the performance indicators used for the per-generation metrics"""
+        self.indicators = IndicatorEngine(
+            self.problem_id, self.n_var, self.n_obj, self.problem, hv_samples=self.hv_samples
+        )
+        self.metric_names = self.indicators.names
+
+        # Ideal and nadir points are derived from the cached reference front
+        self.ideal = self.indicators.ideal
+        self.nadir = self.indicators.nadir
 
-    def run(self):
-        """Execute the optimization"""
+    def compute_indicators(self, F):
+        """Calculate the performance indicators of a single generation"""
+        start = time.perf_counter()
+        with instrumentation.span('indicators'):
+            values = self.indicators.evaluate(F)
+        self.timings['indicators'] += time.perf_counter() - start
+        return values
+
+    def _resume(self, checkpoint, callback, termination):
+        """Continue a checkpointed run until the termination criterion is met"""
+        algorithm = checkpoint['algorithm']
+        algorithm.problem = self.evaluation.prepare(algorithm.problem)
+        CheckpointStore.restore_random_state(checkpoint)
+
+        # A checkpoint that already satisfies the criterion ends the run right away
+        algorithm.termination = termination
+        algorithm.termination.update(algorithm)
+        algorithm.callback = callback
+
+        # Only report the time spent on the additional generations
+        algorithm.start_time = time.time()
+
+        result = algorithm.run()
+        result.algorithm = algorithm
+        return result
+
+    def result_metrics(self, result, recorder, termination, resumed_from=None):
+        """The result of a run in the shape returned by the API, given pymoo's result of it"""
+        history = recorder.to_history()
+
+        # Check convergence
+        converged = termination.converged_at is not None or self._check_convergence(recorder)
+
+        # Extract optimization metrics
+        metrics = {
+            'X': result.X,  # Decision variables
+            'F': result.F,  # Objective values (the Pareto front)
+            'generation': int(recorder.column('n_gen')[-1]),  # Number of generations
+            'success': converged,  # Use our convergence check
+            'execution_time': result.exec_time,
+            'problem_name': self.problem_id,
+            'algorithm_name': self.algorithm_id,
+            'statistics': {
+                'n_var': self.n_var,
+                'n_obj': self.n_obj,
+                'pop_size': self.pop_size,
+                'n_gen': self.n_gen,
+                'seed': self.seed,
+                'hv_approximate': self.indicators.hv_approximate,
+                'hv_samples': self.indicators.hv.n_samples if self.indicators.hv_approximate else None,
+                'resumed_from': resumed_from,
+                'early_stopping': self.early_stopping,
+                'stopped_early': termination.converged_at is not None and termination.converged_at < self.n_gen,
+                'evaluator': self.evaluation.kind,
+                'eval_workers': self.evaluation.n_workers,
+                'sorting': self.sorting,
+                'large_scale': self.large_scale,
+                'precision': self.precision,
+                'surrogate': self._surrogate_report(result.algorithm, recorder) if self.surrogate else None,
+            },
+            'history': history,  # Add processed history
+            'convergence': {
+                'ideal_point': self.ideal.tolist() if self.ideal is not None else None,
+                'nadir_point': self.nadir.tolist() if self.nadir is not None else None,
+            }
+        }
+        return metrics
+
+    def _surrogate_report(self, algorithm, recorder):
+        """Evaluation savings and model cost of a surrogate-assisted run"""
+        report = algorithm.mating.report(recorder.column('n_eval')[-1], self.pop_size, recorder.column('n_gen')[-1])
+        report['evals_per_generation'] = self.surrogate_evals
+        return report
+
+    def run(self, cancel_event=None, progress=None, front=None, checkpoints=None, verbose=True):
+        """Execute the optimization
+
+        Per-generation metrics are recorded by a callback while the run progresses. When a
+        progress sink is given every record is forwarded to it as soon as the generation ends,
+        optionally with the current front as produced by a lod.FrontSampler.
+
+        With a CheckpointStore the run resumes from the longest stored run of the same
+        configuration with at most n_gen generations, and is checkpointed once it finishes.
+        """
         try:
             # Validate problem and algorithm compatibility
             if self.problem_id in ["zdt1", "zdt2"] and self.n_obj != 2:
                 raise ValueError(f"ZDT problems are bi-objective only. Got n_obj={self.n_obj}")
             
-            from pymoo.indicators.igd import IGD
-            from pymoo.indicators.gd import GD
-            from pymoo.indicators.hv import HV
+            start = time.perf_counter()
+            self._setup_indicators()
 
-            # Get the true Pareto front if available
-            pf = self.problem.pareto_front() if hasattr(self.problem, 'pareto_front') else None
-            
-            # Initialize performance indicators
-            igd = IGD(pf) if pf is not None else None
-            gd = GD(pf) if pf is not None else None
-            
-            # Calculate reference point for hypervolume
-            if self.n_obj <= 3:
-                # Use normalized reference point [1.1, 1.1, ...] for hypervolume calculation
-                # This works with the normalized objectives
-                ref_point = np.array([1.1] * self.n_obj)
-                hv = HV(ref_point=ref_point)
-            else:
-                hv = None
-            
-            result = minimize(
-                problem=self.problem,
-                algorithm=self.algorithm,
-                termination=('n_gen', self.n_gen),
-                seed=1,
-                save_history=True,
-                verbose=True
+            recorder = MetricsRecorder(self.n_gen, metrics=self.metric_names)
+            callback = ProgressCallback(
+                self,
+                recorder,
+                sink=progress,
+                cancel_event=cancel_event,
+                front=front
             )
 
-            # Calculate metrics for each generation
-            if hasattr(result, 'history'):
-                for entry in result.history:
-                    F = entry.opt.get("F")
-                    if igd is not None:
-                        entry.igd = igd.do(F)
-                    if gd is not None:
-                        entry.gd = gd.do(F)
-                    if hv is not None:
-                        # Normalize objectives using ideal and nadir points
-                        if hasattr(self.problem, 'ideal_point') and hasattr(self.problem, 'nadir_point'):
-                            ideal = self.problem.ideal_point()
-                            nadir = self.problem.nadir_point()
-                            F_norm = (F - ideal) / (nadir - ideal)
-                            entry.hv = hv.do(F_norm)
-                        else:
-                            entry.hv = hv.do(F)
-            
-            # Check convergence
-            has_converged = self._check_convergence(result)
-            
-            # Process history data
-            history = []
-            if hasattr(result, 'history'):
-                for gen in result.history:
-                    entry = {
-                        'n_gen': gen.n_gen,
-                        'n_eval': gen.evaluator.n_eval,
-                        'n_nds': len(gen.opt.get('F')),
-                    }
-                    
-                    # Add metrics if available
-                    if hasattr(gen, 'igd'):
-                        entry['igd'] = float(gen.igd)
-                    if hasattr(gen, 'gd'):
-                        entry['gd'] = float(gen.gd)
-                    if hasattr(gen, 'hv'):
-                        entry['hv'] = float(gen.hv)
-                        
-                    history.append(entry)
-            
-            # Extract optimization metrics
-            metrics = {
-                'X': result.X.tolist(),  # Decision variables
-                'F': result.F.tolist(),  # Objective values
-                'generation': result.algorithm.n_gen,  # Number of generations
-                'success': has_converged,  # Use our convergence check
-                'execution_time': result.exec_time,
-                'problem_name': self.problem_id,
-                'algorithm_name': self.algorithm_id,
-                'statistics': {
-                    'n_var': self.n_var,
-                    'n_obj': self.n_obj,
-                    'pop_size': self.pop_size,
-                    'n_gen': self.n_gen,
-                },
-                'pareto_front': {
-                    'objectives': result.F.tolist(),
-                    'variables': result.X.tolist()
-                },
-                'history': history,  # Add processed history
-                'convergence': {
-                    'ideal_point': result.problem.ideal_point().tolist() if hasattr(result.problem, 'ideal_point') else None,
-                    'nadir_point': result.problem.nadir_point().tolist() if hasattr(result.problem, 'nadir_point') else None,
-                }
-            }
-            
+            checkpoint = checkpoints.load(self.config) if checkpoints is not None else None
+            self.timings['setup'] += time.perf_counter() - start
+
+            # The indicators are computed by the callback, minimize only counts the rest
+            start, indicators_before = time.perf_counter(), self.timings['indicators']
+            with self.evaluation, instrumentation.span('minimize'):
+                if checkpoint is not None:
+                    recorder = callback.recorder = checkpoint['recorder']
+
+                    # Replay the generations that are not computed again
+                    if progress is not None:
+                        for record in recorder.to_history():
+                            progress(record)
+
+                    termination = self._get_termination(recorder)
+                    result = self._resume(checkpoint, callback, termination)
+                else:
+                    from pymoo.optimize import minimize
+
+                    # The termination has to share the recorder with the callback, so it must not be copied
+                    termination = self._get_termination(recorder)
+                    result = minimize(
+                        problem=self.evaluation.prepare(self.problem),
+                        algorithm=self.algorithm,
+                        termination=termination,
+                        copy_termination=False,
+                        seed=self.seed,
+                        callback=callback,
+                        verbose=verbose
+                    )
+
+            self.timings['minimize'] += (time.perf_counter() - start) - (self.timings['indicators'] - indicators_before)
+            start = time.perf_counter()
+
+            # A cancelled run stopped early and is not worth resuming from
+            if checkpoints is not None and not (cancel_event is not None and cancel_event.is_set()):
+                try:
+                    checkpoints.save(self.config, result.algorithm, recorder)
+                except OSError as e:
+                    # The run itself has finished, it must not fail over its checkpoint
+                    print(f"Failed to checkpoint run: {e}")
+
+            metrics = self.result_metrics(result, recorder, termination,
+                                          checkpoint['n_gen'] if checkpoint is not None else None)
+
+            self.timings['postprocess'] += time.perf_counter() - start
+            # Resumed runs only count the generations computed now
+            resumed = checkpoint['n_gen'] if checkpoint is not None else 0
+            n_eval = recorder.column('n_eval')
+            instrumentation.record_run(
+                int(n_eval[-1] - (n_eval[resumed - 1] if resumed else 0)),
+                len(recorder) - resumed,
+                result.exec_time
+            )
             return metrics
-            
+
+        except MemoryError:
+            # Left to the caller, which knows the memory limit the run exceeded
+            raise
         except Exception as e:
             raise RuntimeError(f"Optimization failed: {str(e)}")
+
+
+def run_config(config):
+    """A run configuration the way OptimizationHandler.config reports it, to key results by
+
+    Defaults are filled in and EXECUTION_SETTINGS left out, so configurations producing the same
+    result share a key. Settings the handler does not take, such as the island model, are kept.
+    """
+    parameters = inspect.signature(OptimizationHandler.__init__).parameters.values()
+    config = dict({p.name: p.default for p in parameters if p.default is not p.empty}, **config)
+    config['surrogate_evals'] = (config['surrogate_evals'] or default_evals(config['pop_size'])
+                                 if config['surrogate'] else None)
+    return {key: value for key, value in config.items() if key not in EXECUTION_SETTINGS}
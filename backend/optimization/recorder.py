@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class MetricsRecorder:
+    """Per-generation run metrics stored in preallocated NumPy arrays
+
+    Only the handful of values the backend reports are kept, so memory grows by a few bytes per
+    generation instead of a full copy of the algorithm as with pymoo's save_history.
+    """
+
+    COUNTERS = ('n_gen', 'n_eval', 'n_nds')
+
+    # Generations allocated up front at most, longer runs grow the arrays as they go
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, capacity, metrics=()):
+        self.capacity = min(max(int(capacity), 1), self.INITIAL_CAPACITY)
+        self.metrics = tuple(metrics)
+        self.size = 0
+
+        self._columns = {name: np.zeros(self.capacity, dtype=np.int64) for name in self.COUNTERS}
+        self._columns['f_mean'] = np.zeros(self.capacity)
+        for name in self.metrics:
+            self._columns[name] = np.full(self.capacity, np.nan)
+
+    def _grow(self):
+        """Double the capacity, e.g. when a run goes on for longer than planned"""
+        for name, column in self._columns.items():
+            grown = np.zeros(2 * self.capacity, dtype=column.dtype)
+            if name in self.metrics:
+                grown[:] = np.nan
+            grown[:self.capacity] = column
+            self._columns[name] = grown
+        self.capacity *= 2
+
+    def append(self, n_gen, n_eval, F, metrics):
+        """Record one generation given its current optimum F and indicator values"""
+        if self.size == self.capacity:
+            self._grow()
+
+        i = self.size
+        self._columns['n_gen'][i] = n_gen
+        self._columns['n_eval'][i] = n_eval
+        self._columns['n_nds'][i] = len(F)
+        self._columns['f_mean'][i] = np.mean(F)
+        for name in self.metrics:
+            self._columns[name][i] = metrics[name]
+        self.size += 1
+
+        return self.record(i)
+
+    def column(self, name):
+        """The recorded values of a field as an array view"""
+        return self._columns[name][:self.size]
+
+    def record(self, i):
+        """A single generation as the dict shape used in the API history"""
+        entry = {name: int(self._columns[name][i]) for name in self.COUNTERS}
+        for name in self.metrics:
+            entry[name] = float(self._columns[name][i])
+        return entry
+
+    def to_history(self):
+        return [self.record(i) for i in range(self.size)]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns.values())
+
+    def __len__(self):
+        return self.size
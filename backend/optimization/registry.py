@@ -0,0 +1,86 @@
+"""Problems and algorithms offered by the backend, imported on first use
+
+pymoo's algorithm modules and the problem lookup pull in most of SciPy, so importing them with
+the optimizer made the server and every fresh worker process pay for them before answering
+even /api/problems. The registry holds what the API lists about each entry and the
+'module:attribute' path of its implementation, which is only imported once a run needs it.
+"""
+import importlib
+
+PROBLEMS = {
+    'zdt1': {
+        'name': 'ZDT1',
+        'description': 'ZDT1 benchmark problem',
+        'class': 'pymoo.problems.multi.zdt:ZDT1',
+        # Objective counts offered by the UI, and whether the problem takes n_obj at all
+        'objectives': [2],
+        'scalable': False,
+    },
+    'zdt2': {
+        'name': 'ZDT2',
+        'description': 'ZDT2 benchmark problem',
+        'class': 'pymoo.problems.multi.zdt:ZDT2',
+        'objectives': [2],
+        'scalable': False,
+    },
+    'dtlz1': {
+        'name': 'DTLZ1',
+        'description': 'DTLZ1 benchmark problem',
+        'class': 'pymoo.problems.many.dtlz:DTLZ1',
+        'objectives': [2, 3, 4, 5],
+        'scalable': True,
+    },
+    'dtlz2': {
+        'name': 'DTLZ2',
+        'description': 'DTLZ2 benchmark problem',
+        'class': 'pymoo.problems.many.dtlz:DTLZ2',
+        'objectives': [2, 3, 4, 5],
+        'scalable': True,
+    },
+}
+
+ALGORITHMS = {
+    'nsga2': {
+        'name': 'NSGA-II',
+        'description': 'Non-dominated Sorting Genetic Algorithm II',
+        'class': 'pymoo.algorithms.moo.nsga2:NSGA2',
+    },
+    'moead': {
+        'name': 'MOEA/D',
+        'description': 'Multi-objective Evolutionary Algorithm based on Decomposition',
+        'class': 'pymoo.algorithms.moo.moead:MOEAD',
+    },
+    'nsga3': {
+        'name': 'NSGA-III',
+        'description': 'Non-dominated Sorting Genetic Algorithm III',
+        'class': 'pymoo.algorithms.moo.nsga3:NSGA3',
+    },
+}
+
+
+def load(path):
+    """The object at a 'module:attribute' path, importing the module on first use"""
+    module, attribute = path.split(':')
+    return getattr(importlib.import_module(module), attribute)
+
+
+def listing(entries):
+    """Id, name and description of every entry, as listed by the API"""
+    return [{'id': key, 'name': spec['name'], 'description': spec['description']} for key, spec in entries.items()]
+
+
+def create_problem(problem_id, n_var, n_obj):
+    """Instance of a registered problem"""
+    spec = PROBLEMS.get(problem_id)
+    if spec is None:
+        raise ValueError(f"Unsupported problem: {problem_id}")
+    params = {'n_var': n_var, 'n_obj': n_obj} if spec['scalable'] else {'n_var': n_var}
+    return load(spec['class'])(**params)
+
+
+def algorithm_class(algorithm_id):
+    """Class of a registered algorithm"""
+    spec = ALGORITHMS.get(algorithm_id)
+    if spec is None:
+        raise ValueError(f"Unknown algorithm: {algorithm_id}")
+    return load(spec['class'])
@@ -0,0 +1,281 @@
+"""Resource estimates, budgets and the memory-bounded large-scale run mode
+
+estimate() predicts the peak memory and the wall time of a run from its configuration. The
+largest terms grow quadratically with the population: pymoo's duplicate elimination computes
+a pop_size x 2 pop_size distance matrix, the dominance sort a bit-packed 2 pop_size square
+matrix. ResourceLimits turns the estimate into a decision: runs above the per-job limits are
+rejected, and JobManager queues admitted runs until the memory budget has room for them. The
+budget is reserved through the limits, so the jobs and the live sessions of a server share it.
+
+Large-scale mode keeps big runs within bounds. Decision variables are stored as float32
+for the problems in FLOAT32_PROBLEMS, and duplicates are found by hashing the rows instead
+of the distance matrix. It is enabled automatically for runs estimated above
+ResourceLimits.large_scale_memory. memory_limit() caps the address space of the worker
+process while a run executes, so a run the estimate got wrong fails with a MemoryError
+instead of taking the server down.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from pymoo.core.repair import Repair
+from pymoo.core.duplicate import DefaultDuplicateElimination
+
+from optimization.indicators import DEFAULT_HV_SAMPLES, MAX_HV_SAMPLES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Problems that evaluate with the same accuracy from float32 decision variables
+FLOAT32_PROBLEMS = ('zdt1', 'zdt2', 'dtlz1', 'dtlz2')
+
+# Generations a run may ask for unless the server configures otherwise
+MAX_N_GEN = 100_000
+
+# Fitted with benchmarks.resources (NSGA-II/III on DTLZ2, pop_size 500-5000, n_var 10-1000)
+BASE_MEMORY = 16 * 2**20  # run setup on top of the imported, warmed-up worker
+INDIVIDUAL_BYTES = 3000  # pymoo Individual objects, per solution of the merged population
+VARIATION_COPIES = 12  # float64 temporaries of the offspring variables during mating
+DUPLICATE_BYTES = 9  # float64 distance and its comparison per pair in pymoo's duplicate check
+SECONDS_PER_INDIVIDUAL = 1e-4  # selection, survival and pymoo's per-individual bookkeeping
+SECONDS_PER_VARIABLE = 4e-7  # variation and evaluation per decision variable of an offspring
+SECONDS_PER_DISTANCE = 8e-10  # per pair and variable in pymoo's duplicate check
+SECONDS_PER_DOMINANCE = 6e-9  # per pair of the merged population in the dominance sort
+HISTORY_BYTES = 700  # per generation: recorder columns, history dicts of the result and their JSON
+HV_SAMPLE_COPIES = 3  # float64 copies of the quasi-Monte-Carlo samples while estimating the hypervolume
+SECONDS_PER_HV_COMPARISON = 5e-9  # per sample, front point and objective in the hypervolume estimate
+
+
+def survival_size(config):
+    """Solutions compared per generation: MOEAD keeps one per reference direction"""
+    if config['algorithm_id'] == 'moead':
+        from optimization.artifacts import reference_directions
+        from optimization.optimizer import reference_partitions
+        return len(reference_directions(config['n_obj'], reference_partitions(config['n_obj'])))
+    return config['pop_size']
+
+
+def evaluations(config, n):
+    """True evaluations of a run, surrogate-assisted runs only evaluate a few offspring per generation"""
+    if config.get('surrogate'):
+        from optimization.surrogate import default_evals
+        return n + (config.get('surrogate_evals') or default_evals(n)) * (config['n_gen'] - 1)
+    return n * config['n_gen']
+
+
+def estimate(config):
+    """Predicted peak memory in bytes and wall time in seconds of a run configuration"""
+    if config.get('islands', 1) > 1:
+        # The islands run side by side in processes of their own
+        from optimization.islands import island_config
+        usage = estimate(island_config(config, 0))
+        return {
+            'memory_bytes': usage['memory_bytes'] * config['islands'],
+            'seconds': usage['seconds'],
+            'evaluations': usage['evaluations'] * config['islands'],
+        }
+
+    n = survival_size(config)
+    n_var, n_obj, n_gen = config['n_var'], config['n_obj'], config['n_gen']
+    large_scale = config.get('large_scale', False)
+    itemsize = 4 if large_scale and config['problem_id'] in FLOAT32_PROBLEMS else 8
+
+    # The merged population, and the temporaries of creating the offspring
+    memory = BASE_MEMORY + 2 * n * (n_var * itemsize + n_obj * 8 + INDIVIDUAL_BYTES)
+    memory += VARIATION_COPIES * n * n_var * 8
+    seconds = n * SECONDS_PER_INDIVIDUAL + n * n_var * SECONDS_PER_VARIABLE
+
+    # Duplicates against the offspring and the population, and the non-dominated sort
+    if config['algorithm_id'] != 'moead':
+        if not large_scale:
+            memory += 2 * n * n * DUPLICATE_BYTES
+            seconds += 2 * n * n * n_var * SECONDS_PER_DISTANCE
+        if n_obj > 2:
+            memory += (2 * n) ** 2 // 8
+            seconds += (2 * n) ** 2 * SECONDS_PER_DOMINANCE
+
+    # The hypervolume of more than three objectives is estimated from hv_samples points
+    if n_obj > 3:
+        samples = 1 << max(int(np.ceil(np.log2(max(config.get('hv_samples', DEFAULT_HV_SAMPLES), 2)))), 1)
+        memory += HV_SAMPLE_COPIES * samples * n_obj * 8
+        seconds += samples * n * n_obj * SECONDS_PER_HV_COMPARISON
+    seconds *= n_gen
+
+    # The history grows with every generation
+    memory += n_gen * HISTORY_BYTES
+    return {
+        'memory_bytes': int(memory),
+        'seconds': float(seconds),
+        'evaluations': int(evaluations(config, n)),
+    }
+
+
+def physical_memory():
+    """Installed memory in bytes, None where it cannot be determined"""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def format_bytes(n):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+class ResourceLimits:
+    """Budgets a server enforces on the runs it accepts
+
+    job_memory and job_seconds bound single runs, memory_budget the estimated memory of all
+    runs executing at the same time. Runs estimated above large_scale_memory switch to
+    large-scale mode unless the request decided explicitly. Limits set to None are not enforced.
+
+    Everything holding the same limits takes its share of memory_budget with reserve() and gives
+    it back with release(), which calls the listeners added with on_release().
+    """
+
+    def __init__(self, job_memory=None, job_seconds=None, memory_budget=None, large_scale_memory=512 * 2**20,
+                 max_n_gen=MAX_N_GEN, max_hv_samples=MAX_HV_SAMPLES):
+        self.memory_budget = memory_budget
+        self.job_memory = job_memory if job_memory is not None else memory_budget
+        self.job_seconds = job_seconds
+        self.large_scale_memory = large_scale_memory
+        self.max_n_gen = max_n_gen
+        self.max_hv_samples = max_hv_samples
+        self.reserved = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def plan(self, config):
+        """Return the configuration to run and its estimate, or raise ValueError if it is too big"""
+        config = dict(config)
+        if self.max_n_gen is not None and config['n_gen'] > self.max_n_gen:
+            raise ValueError(f"n_gen must be at most {self.max_n_gen}, got {config['n_gen']}")
+        if self.max_hv_samples is not None and config.get('hv_samples', 0) > self.max_hv_samples:
+            raise ValueError(f"hv_samples must be at most {self.max_hv_samples}, got {config['hv_samples']}")
+        if 'large_scale' not in config:
+            config['large_scale'] = bool(
+                self.large_scale_memory is not None and estimate(config)['memory_bytes'] > self.large_scale_memory
+            )
+        usage = estimate(config)
+
+        if self.job_memory is not None and usage['memory_bytes'] > self.job_memory:
+            raise ValueError(
+                f"Run needs an estimated {format_bytes(usage['memory_bytes'])} of memory, more than the "
+                f"{format_bytes(self.job_memory)} allowed per job. Reduce pop_size or n_var"
+            )
+        if self.job_seconds is not None and usage['seconds'] > self.job_seconds:
+            raise ValueError(
+                f"Run needs an estimated {usage['seconds']:.0f} s, more than the {self.job_seconds:.0f} s "
+                f"allowed per job. Reduce n_gen or pop_size"
+            )
+        return config, usage
+
+    def reserve(self, memory, force=False):
+        """Take memory bytes of the budget and return True, or False if they do not fit
+
+        A reservation larger than the whole budget fits while nothing else is reserved, and
+        force takes it regardless of the budget.
+        """
+        with self._lock:
+            if (not force and self.memory_budget is not None and self.reserved
+                    and self.reserved + memory > self.memory_budget):
+                return False
+            self.reserved += memory
+            return True
+
+    def release(self, memory):
+        """Give back memory bytes of the budget and tell the listeners"""
+        with self._lock:
+            self.reserved -= memory
+        for listener in list(self._listeners):
+            listener()
+
+    def on_release(self, listener):
+        """Call listener() whenever memory is released, to admit work that waits for room"""
+        self._listeners.append(listener)
+
+    def to_dict(self):
+        return {
+            'job_memory_bytes': self.job_memory,
+            'job_seconds': self.job_seconds,
+            'memory_budget_bytes': self.memory_budget,
+            'reserved_bytes': self.reserved,
+            'large_scale_memory_bytes': self.large_scale_memory,
+            'max_n_gen': self.max_n_gen,
+            'max_hv_samples': self.max_hv_samples,
+        }
+
+
+def _virtual_memory():
+    """Current address space size of this process in bytes (Linux only)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def memory_limit(limit_bytes):
+    """Let the process allocate at most limit_bytes more address space until the block exits
+
+    Allocations beyond the limit raise MemoryError inside the run instead of invoking the OOM
+    killer. Only the soft limit is changed, so it is restored afterwards. Without a limit or
+    on platforms without RLIMIT_AS this does nothing.
+    """
+    current = _virtual_memory() if limit_bytes else None
+    if current is None or resource is None or not hasattr(resource, 'RLIMIT_AS'):
+        yield
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + int(limit_bytes)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    except MemoryError as e:
+        raise MemoryError(f"Run exceeded its memory limit of {format_bytes(limit_bytes)}") from e
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+class Float32Repair(Repair):
+    """Store decision variables as float32, halving the population's memory"""
+
+    def _do(self, problem, X, **kwargs):
+        return np.asarray(X, dtype=np.float32)
+
+
+class HashDuplicateElimination(DefaultDuplicateElimination):
+    """Exact duplicate elimination in linear memory
+
+    pymoo's default compares all pairs through a distance matrix with an epsilon of 1e-16, which
+    only ever matches identical rows. Hashing the rows finds the same duplicates without the
+    quadratic matrix.
+    """
+
+    @staticmethod
+    def _keys(X):
+        # Adding zero turns -0.0 into 0.0, which the distance matrix considered equal
+        X = np.ascontiguousarray(np.asarray(X, dtype=float) + 0.0)
+        return X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+
+    def _do(self, pop, other, is_duplicate):
+        keys = self._keys(self.func(pop))
+        if other is None:
+            _, first = np.unique(keys, return_index=True)
+            duplicate = np.ones(len(keys), dtype=bool)
+            duplicate[first] = False
+            is_duplicate |= duplicate
+        else:
+            is_duplicate |= np.isin(keys, self._keys(self.func(other)))
+        return is_duplicate
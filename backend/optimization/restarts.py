@@ -0,0 +1,179 @@
+"""Independent restarts: one configuration run with several seeds, merged into one archive
+
+The runs are queued as separate jobs, so they execute in parallel on the worker pool and are
+cached and checkpointed per seed. Once all of them have finished, their final fronts are merged
+into a single non-dominated archive, and the spread of the per-seed HV and IGD shows how much
+the outcome of a single run depends on its seed.
+
+From the backend directory:
+
+    python -m optimization.restarts zdt1 nsga2 --restarts 8 --n-gen 100 --output front.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from optimization.optimizer import OptimizationHandler
+from optimization.sorting import non_dominated
+from optimization.experiments import describe
+from optimization.encoding import json_default
+
+# Upper bound on the number of seeds a single request may run
+MAX_RESTARTS = 64
+
+
+def restart_seeds(seed, restarts):
+    """Seeds of restarts consecutive runs, starting at seed"""
+    if not 1 <= restarts <= MAX_RESTARTS:
+        raise ValueError(f"restarts must be between 1 and {MAX_RESTARTS}, got {restarts}")
+    return list(range(seed, seed + restarts))
+
+
+def merge_fronts(results, seeds):
+    """Non-dominated archive of the final fronts, as (X, F, seed of every archive point)"""
+    X = np.vstack([np.atleast_2d(result['X']) for result in results])
+    F = np.vstack([np.atleast_2d(result['F']) for result in results])
+    origin = np.concatenate([np.full(len(np.atleast_2d(result['F'])), seed) for result, seed in zip(results, seeds)])
+
+    keep = non_dominated(F)
+    # Seeds that found the same solution contribute it once, attributed to the first of them
+    _, first = np.unique(F[keep], axis=0, return_index=True)
+    keep = keep[np.sort(first)]
+    return X[keep], F[keep], origin[keep]
+
+
+def merge_results(config, seeds, results):
+    """One result for the runs of config with the given seeds
+
+    results holds the result of every seed, None for runs that failed or were cancelled. The
+    result has the merged archive as X and F, and reports the history of the seed with the best
+    final hypervolume. restarts holds the indicators of the archive and of every seed.
+    """
+    completed = [(seed, result) for seed, result in zip(seeds, results) if result is not None]
+    if not completed:
+        raise RuntimeError(f"All {len(seeds)} restarts failed")
+
+    X, F, origin = merge_fronts([result for _, result in completed], [seed for seed, _ in completed])
+
+    handler = OptimizationHandler(**dict(config, seed=seeds[0]))
+    handler._setup_indicators()
+    archive = handler.compute_indicators(F)
+    archive['n_points'] = len(F)
+
+    runs = []
+    for seed, result in zip(seeds, results):
+        if result is None:
+            runs.append({'seed': seed, 'status': 'failed'})
+            continue
+        final = result['history'][-1]
+        runs.append({
+            'seed': seed,
+            'status': 'completed',
+            'hv': final.get('hv'),
+            'igd': final.get('igd'),
+            'generation': result['generation'],
+            'execution_time': result['execution_time'],
+            'n_points': len(np.atleast_2d(result['F'])),
+            'archive_points': int(np.sum(origin == seed)),
+        })
+
+    best_seed, best = max(completed, key=lambda item: item[1]['history'][-1].get('hv') or 0.0)
+    merged = dict(best)
+    merged.update({
+        'X': X,
+        'F': F,
+        'origin': origin,
+        'generation': max(result['generation'] for _, result in completed),
+        'success': all(result['success'] for _, result in completed),
+        # The seeds run in parallel, so the slowest one determines the wall time
+        'execution_time': max(result['execution_time'] for _, result in completed),
+        'statistics': dict(best['statistics'], seeds=seeds, restarts=len(seeds)),
+        'restarts': {
+            'archive': archive,
+            'best_seed': best_seed,
+            'n_failed': len(seeds) - len(completed),
+            'spread': {
+                'hv': describe([run.get('hv') for run in runs]),
+                'igd': describe([run.get('igd') for run in runs]),
+            },
+            'runs': runs,
+        },
+    })
+    return merged
+
+
+def submit_restarts(jobs, config, restarts):
+    """Queue config once per seed on a JobManager and return the job settling with the merged result"""
+    seeds = restart_seeds(config.get('seed', 1), restarts)
+    return jobs.submit_group(
+        dict(config, seed=seeds[0], restarts=restarts),
+        [dict(config, seed=seed) for seed in seeds],
+        lambda results: merge_results(config, seeds, results)
+    )
+
+
+def print_restarts(result):
+    info = result['restarts']
+    print(f"{'seed':>6}{'HV':>12}{'IGD':>12}{'points':>8}{'in archive':>12}{'time':>9}")
+    for run in info['runs']:
+        if run['status'] != 'completed':
+            print(f"{run['seed']:>6}  {run['status']}")
+            continue
+        print(f"{run['seed']:>6}{run['hv']:>12.4f}{run.get('igd') or float('nan'):>12.4f}{run['n_points']:>8}"
+              f"{run['archive_points']:>12}{run['execution_time']:>8.2f}s")
+
+    archive, hv = info['archive'], info['spread']['hv'] or {}
+    print(f"\nArchive: {archive['n_points']} points, HV {archive['hv']:.4f}"
+          + (f", IGD {archive['igd']:.4f}" if 'igd' in archive else ''))
+    print(f"Per-seed HV: median {hv.get('median', float('nan')):.4f}, IQR {hv.get('iqr', float('nan')):.4f}, "
+          f"best seed {info['best_seed']}")
+
+
+def main(argv=None):
+    from optimization.jobs import JobManager
+    from optimization.runstore import RunStore
+
+    parser = argparse.ArgumentParser(description='Run one configuration with several seeds and merge the fronts')
+    parser.add_argument('problem')
+    parser.add_argument('algorithm')
+    parser.add_argument('--restarts', type=int, default=os.cpu_count() or 1, help='number of seeds (default: all cores)')
+    parser.add_argument('--seed', type=int, default=1, help='first seed')
+    parser.add_argument('--n-var', type=int, default=10)
+    parser.add_argument('--n-obj', type=int, default=2)
+    parser.add_argument('--pop-size', type=int, default=100)
+    parser.add_argument('--n-gen', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--output', help='write the merged result to this JSON file')
+    parser.add_argument('--store', help='also keep every run in the run store in this directory')
+    args = parser.parse_args(argv)
+
+    config = {
+        'problem_id': args.problem, 'algorithm_id': args.algorithm, 'n_var': args.n_var, 'n_obj': args.n_obj,
+        'pop_size': args.pop_size, 'n_gen': args.n_gen, 'seed': args.seed,
+    }
+    # Validate before starting the workers
+    OptimizationHandler(**config)
+
+    jobs = JobManager(max_workers=args.workers, verbose=False,
+                      run_store=RunStore(args.store) if args.store else None)
+    try:
+        print(f"Running {args.restarts} seeds on {jobs.max_workers} workers...")
+        start = time.time()
+        result = submit_restarts(jobs, config, args.restarts).result()
+        print(f"Finished in {time.time() - start:.1f}s\n")
+        print_restarts(result)
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(result, f, indent=2, default=json_default)
+            print(f"\nResult written to {args.output}")
+    finally:
+        jobs.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
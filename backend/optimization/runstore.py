@@ -0,0 +1,241 @@
+"""Persistent store of finished runs with an indexed query API
+
+Every run gets a row in an SQLite database, indexed by problem, algorithm, objective count,
+creation time and final hypervolume, and a directory with its arrays as .npy files: the decision
+variables X, the objectives F and the per-generation metrics as one structured array. Fetching a
+run memory-maps those files instead of reading them into memory, so a past front is served
+without recomputing or even copying it.
+
+Unlike the result cache the store is not tied to the pymoo version and never evicted: it keeps
+what analysts ran. Runs are written by a background thread, so finishing a job never waits for
+the disk.
+"""
+import os
+import json
+import time
+import queue
+import shutil
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pymoo
+
+from optimization.cache import config_key
+from optimization.encoding import json_default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    problem_id TEXT NOT NULL,
+    algorithm_id TEXT NOT NULL,
+    n_var INTEGER,
+    n_obj INTEGER,
+    pop_size INTEGER,
+    n_gen INTEGER,
+    seed INTEGER,
+    generations INTEGER,
+    n_points INTEGER,
+    hv REAL,
+    igd REAL,
+    execution_time REAL,
+    success INTEGER,
+    config_key TEXT,
+    pymoo_version TEXT,
+    config TEXT NOT NULL,
+    meta TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_problem ON runs (problem_id, algorithm_id, n_obj, created_at);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_hv ON runs (hv);
+CREATE INDEX IF NOT EXISTS runs_config ON runs (config_key);
+"""
+
+# Columns returned by query() and get(), and the ones runs can be sorted by
+COLUMNS = ('run_id', 'created_at', 'problem_id', 'algorithm_id', 'n_var', 'n_obj', 'pop_size', 'n_gen', 'seed',
+           'generations', 'n_points', 'hv', 'igd', 'execution_time', 'success', 'config_key', 'pymoo_version')
+SORT_COLUMNS = ('created_at', 'hv', 'igd', 'execution_time', 'generations', 'n_points')
+
+# Page size of query() without a limit, and the largest one allowed
+DEFAULT_PAGE = 50
+MAX_PAGE = 1000
+
+
+def metrics_array(history):
+    """The per-generation history as one structured array with a field per metric"""
+    names = list(history[0]) if history else ['n_gen']
+    dtype = [(name, 'i8' if name.startswith('n_') else 'f8') for name in names]
+    return np.array([tuple(entry.get(name, np.nan) for name in names) for entry in history], dtype=dtype)
+
+
+def metrics_history(metrics):
+    """Inverse of metrics_array, the history in the shape of the API results"""
+    names = metrics.dtype.names
+    return [{name: row[name].item() for name in names} for row in metrics]
+
+
+class RunStore:
+    """SQLite index plus memory-mapped arrays of finished runs, see the module docstring"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.array_dir = os.path.join(directory, 'arrays')
+        self.path = os.path.join(directory, 'runs.sqlite')
+        os.makedirs(self.array_dir, exist_ok=True)
+
+        with closing(self._connect()) as db:
+            # Readers keep working while the writer thread commits
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+
+        self._queue = queue.Queue()
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @staticmethod
+    def _valid(run_id):
+        # Ids become directory names, anything but the hex ids of jobs is unknown
+        return run_id.isalnum()
+
+    def _run_dir(self, run_id):
+        return os.path.join(self.array_dir, run_id)
+
+    def submit(self, config, result, run_id=None):
+        """Store a run on the background writer thread"""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+        self._queue.put((config, result, run_id))
+
+    def _write_loop(self):
+        while True:
+            config, result, run_id = self._queue.get()
+            try:
+                self.add(config, result, run_id)
+            except Exception as e:
+                print(f"Failed to store run {run_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until every submitted run has been written"""
+        self._queue.join()
+
+    def add(self, config, result, run_id=None):
+        """Write a run's arrays and index it, returning its id"""
+        run_id = run_id or os.urandom(16).hex()
+        history = result.get('history') or []
+        final = history[-1] if history else {}
+        F = np.asarray(result['F'])
+
+        # Readers never see a half written directory
+        run_dir = self._run_dir(run_id)
+        tmp_dir = run_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, 'X.npy'), np.asarray(result['X']))
+        np.save(os.path.join(tmp_dir, 'F.npy'), F)
+        np.save(os.path.join(tmp_dir, 'metrics.npy'), metrics_array(history))
+        shutil.rmtree(run_dir, ignore_errors=True)
+        os.replace(tmp_dir, run_dir)
+
+        meta = {k: v for k, v in result.items() if k not in ('X', 'F', 'history')}
+        with closing(self._connect()) as db, db:
+            db.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(COLUMNS)}, config, meta) "
+                f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})",
+                (
+                    run_id, time.time(), config['problem_id'], config['algorithm_id'], config.get('n_var'),
+                    config.get('n_obj'), config.get('pop_size'), config.get('n_gen'),
+                    config.get('seed', result.get('statistics', {}).get('seed')),
+                    result.get('generation'), len(F), final.get('hv'), final.get('igd'),
+                    result.get('execution_time'), int(bool(result.get('success'))), config_key(config),
+                    pymoo.__version__, json.dumps(config), json.dumps(meta, default=json_default),
+                )
+            )
+        return run_id
+
+    def query(self, problem=None, algorithm=None, n_obj=None, since=None, until=None, min_hv=None, max_hv=None,
+              sort='created_at', descending=True, limit=None, offset=0):
+        """Return (total, runs) of the runs matching every given filter, one page at a time"""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort runs by {sort}. Choose one of {', '.join(SORT_COLUMNS)}")
+        limit = DEFAULT_PAGE if limit is None else limit
+        if not 0 < limit <= MAX_PAGE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE}, got {limit}")
+        if offset < 0:
+            raise ValueError(f"offset must not be negative, got {offset}")
+
+        filters = (
+            ('problem_id = ?', problem),
+            ('algorithm_id = ?', algorithm),
+            ('n_obj = ?', n_obj),
+            ('created_at >= ?', since),
+            ('created_at < ?', until),
+            ('hv >= ?', min_hv),
+            ('hv <= ?', max_hv),
+        )
+        clauses = [clause for clause, value in filters if value is not None]
+        params = [value for _, value in filters if value is not None]
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        with closing(self._connect()) as db:
+            total = db.execute(f"SELECT COUNT(*) FROM runs {where}", params).fetchone()[0]
+            rows = db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM runs {where} "
+                f"ORDER BY {sort} {'DESC' if descending else 'ASC'}, run_id LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return total, [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row):
+        record = {name: row[name] for name in COLUMNS}
+        record['success'] = bool(record['success'])
+        return record
+
+    def get(self, run_id):
+        """Return (record, result) of a stored run, or None
+
+        X, F and the metrics of the result are read-only memory maps of the run's files.
+        """
+        if not self._valid(run_id):
+            return None
+        with closing(self._connect()) as db:
+            row = db.execute(f"SELECT {', '.join(COLUMNS)}, config, meta FROM runs WHERE run_id = ?",
+                             (run_id,)).fetchone()
+        if row is None:
+            return None
+
+        run_dir = self._run_dir(run_id)
+        try:
+            X = np.load(os.path.join(run_dir, 'X.npy'), mmap_mode='r')
+            F = np.load(os.path.join(run_dir, 'F.npy'), mmap_mode='r')
+            metrics = np.load(os.path.join(run_dir, 'metrics.npy'), mmap_mode='r')
+        except OSError:
+            return None
+
+        record = self._record(row)
+        record['config'] = json.loads(row['config'])
+        result = json.loads(row['meta'])
+        result.update({'X': X, 'F': F, 'history': metrics_history(metrics)})
+        return record, result
+
+    def delete(self, run_id):
+        """Remove a stored run, returning whether it existed"""
+        if not self._valid(run_id):
+            return False
+        with closing(self._connect()) as db, db:
+            deleted = db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,)).rowcount
+        if deleted:
+            shutil.rmtree(self._run_dir(run_id), ignore_errors=True)
+        return bool(deleted)
+
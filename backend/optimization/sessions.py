@@ -0,0 +1,525 @@
+"""Interactive optimization sessions built on pymoo's ask/tell interface
+
+A session keeps a live algorithm in the serving process, so a client can run a few
+generations, look at the front, change the population size or the generation budget and go
+on from where it stopped instead of starting a new run. Generations run one at a time through
+ask, evaluate and tell, either on the requesting thread (step) or on a thread of the session
+until it is paused or its budget is used up (resume).
+
+pymoo draws from the global NumPy and Python random generators. Every session keeps its own
+generator state and runs each generation with it under a process-wide lock, so a session
+stepped to n generations without changes ends with the same front as a run of the same
+configuration, however the steps of concurrent sessions interleave.
+
+Idle sessions are pickled to disk and loaded again transparently on their next use, which
+also lets them outlive a restart of the server.
+"""
+import os
+import time
+import uuid
+import glob
+import pickle
+import random
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from pymoo.core.callback import Callback
+
+from optimization.optimizer import OptimizationHandler
+from optimization.resources import estimate, format_bytes
+from optimization.recorder import MetricsRecorder
+from optimization.streaming import ProgressCallback
+
+# Parameters a session accepts between generations
+MUTABLE = ('pop_size', 'n_gen', 'early_stopping', 'surrogate_evals')
+
+# Held while a generation runs with the random state of its session
+_random_lock = threading.Lock()
+
+
+class Session:
+    """A live algorithm advanced a few generations at a time
+
+    Built from a run configuration, or from the state() of a spilled session. The algorithm is
+    only touched while holding lock, one generation at a time, so the result can be read and
+    the parameters changed while the session is running.
+    """
+
+    def __init__(self, config, session_id=None, state=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.config = dict(config)
+        self.handler = OptimizationHandler(**self.config)
+        self.handler._setup_indicators()
+
+        if state is None:
+            self.recorder = MetricsRecorder(self.handler.n_gen, metrics=self.handler.metric_names)
+            self.algorithm = self.handler.algorithm
+            with _random_lock:
+                self.algorithm.setup(
+                    self.handler.problem,
+                    termination=self.handler._get_termination(self.recorder),
+                    seed=self.handler.seed,
+                    callback=ProgressCallback(self.handler, self.recorder),
+                    verbose=False
+                )
+                self.random_state = (np.random.get_state(), random.getstate())
+            self.created_at = time.time()
+            self.compute_time = 0.0
+        else:
+            self.recorder = state['recorder']
+            self.algorithm = self.handler.algorithm = state['algorithm']
+            self.algorithm.callback = ProgressCallback(self.handler, self.recorder)
+            self.random_state = state['random_state']
+            self.created_at = state['created_at']
+            self.compute_time = state['compute_time']
+
+        self.last_used = time.time()
+        self.error = None
+        self.running = False
+        # Requests working with the session, which keep it from being spilled, see SessionManager.use
+        self.users = 0
+        # Bytes of the memory budget held while the session is live
+        self.reserved = 0
+        self.lock = threading.RLock()
+        self._pause = threading.Event()
+        self._thread = None
+
+    @property
+    def status(self):
+        if self.error is not None:
+            return 'failed'
+        if self.running:
+            return 'running'
+        if not self.algorithm.has_next():
+            # The generation budget is used up or the run converged, raise n_gen to go on
+            return 'finished'
+        return 'paused'
+
+    @property
+    def generation(self):
+        return len(self.recorder)
+
+    def _generation(self):
+        """Ask for offspring, evaluate them and tell the algorithm until the generation is recorded
+
+        The genetic algorithms ask for all offspring of a generation at once, MOEA/D for one per
+        subproblem. Between generations the algorithm holds no generator state and can be pickled.
+        """
+        generation = self.generation
+        with _random_lock:
+            np.random.set_state(self.random_state[0])
+            random.setstate(self.random_state[1])
+            start = time.perf_counter()
+            try:
+                while self.generation == generation:
+                    infills = self.algorithm.ask()
+                    if infills is not None:
+                        self.algorithm.evaluator.eval(self.algorithm.problem, infills, algorithm=self.algorithm)
+                        self.algorithm.tell(infills=infills)
+                    else:
+                        self.algorithm.tell()
+            finally:
+                self.compute_time += time.perf_counter() - start
+                self.random_state = (np.random.get_state(), random.getstate())
+
+    def _start(self):
+        with self.lock:
+            if self.error is not None:
+                raise ValueError(f"Session {self.id} failed: {self.error}")
+            if self.running:
+                raise ValueError(f"Session {self.id} is running, pause it first")
+            if not self.algorithm.has_next():
+                raise ValueError(f"Session {self.id} has finished, raise n_gen or turn off early_stopping to go on")
+            self.running = True
+            self._pause.clear()
+
+    def _run(self, generations):
+        """Run up to generations generations, fewer once paused or at the end of the budget"""
+        records = []
+        try:
+            with self.handler.evaluation:
+                self.algorithm.problem = self.handler.evaluation.prepare(self.algorithm.problem)
+                while len(records) < generations and not self._pause.is_set():
+                    with self.lock:
+                        if not self.algorithm.has_next():
+                            break
+                        self._generation()
+                        records.append(self.recorder.record(len(self.recorder) - 1))
+        except Exception as e:
+            self.error = str(e)
+            raise
+        finally:
+            self.running = False
+            self.last_used = time.time()
+        return records
+
+    def step(self, generations=1):
+        """Run generations more generations on the calling thread and return their records"""
+        if generations < 1:
+            raise ValueError(f"generations must be at least 1, got {generations}")
+        self._start()
+        return self._run(generations)
+
+    def resume(self):
+        """Keep running on a thread of the session until paused or the budget is used up"""
+        self._start()
+
+        def run():
+            try:
+                self._run(float('inf'))
+            except Exception as e:
+                print(f"Session {self.id} failed: {e}")
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def pause(self, timeout=None):
+        """Stop after the current generation and wait for it"""
+        self._pause.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # A step on a request thread stops between generations as well
+        with self.lock:
+            pass
+        self.last_used = time.time()
+
+    def update(self, params):
+        """Change parameters between generations, see MUTABLE
+
+        The population grows or shrinks to the new pop_size over the following generations,
+        through the usual survival of parents and offspring.
+        """
+        unknown = sorted(set(params) - set(MUTABLE))
+        if unknown:
+            raise ValueError(f"Cannot change {', '.join(unknown)} of a session, only {', '.join(MUTABLE)}")
+        handler = self.handler
+        pop_size = params.get('pop_size', handler.pop_size)
+        n_gen = params.get('n_gen', handler.n_gen)
+        surrogate_evals = params.get('surrogate_evals', handler.surrogate_evals)
+
+        if 'pop_size' in params and handler.algorithm_id == 'moead':
+            raise ValueError("MOEA/D's population is given by its reference directions, pop_size cannot change")
+        if pop_size < 2:
+            raise ValueError(f"pop_size must be at least 2, got {pop_size}")
+        if n_gen < 1:
+            raise ValueError(f"n_gen must be at least 1, got {n_gen}")
+        if 'surrogate_evals' in params and not handler.surrogate:
+            raise ValueError("surrogate_evals only applies to surrogate-assisted sessions")
+        if handler.surrogate and not 1 <= surrogate_evals <= pop_size:
+            raise ValueError(f"surrogate_evals must be between 1 and pop_size ({pop_size}), got {surrogate_evals}")
+
+        with self.lock:
+            algorithm = self.algorithm
+            if pop_size != handler.pop_size:
+                algorithm.pop_size = handler.pop_size = pop_size
+                if handler.surrogate:
+                    algorithm.mating.n_candidates = pop_size
+                else:
+                    algorithm.n_offsprings = pop_size
+            if handler.surrogate:
+                algorithm.n_offsprings = handler.surrogate_evals = surrogate_evals
+            handler.n_gen = n_gen
+            handler.early_stopping = params.get('early_stopping', handler.early_stopping)
+            self.config.update(params)
+
+            # A new termination on the recorded metrics applies the budget to the generations so far
+            algorithm.termination = handler._get_termination(self.recorder)
+            if self.generation:
+                algorithm.termination.update(algorithm)
+            self.last_used = time.time()
+
+    def result(self):
+        """The current state in the shape of an optimization result"""
+        with self.lock:
+            result = self.algorithm.result()
+            result.algorithm = self.algorithm
+            # Only the time spent in generations counts, not the pauses in between
+            result.exec_time = self.compute_time
+            return self.handler.result_metrics(result, self.recorder, self.algorithm.termination)
+
+    def state(self):
+        """Everything needed to continue the session in another process, see Session(state=...)"""
+        with self.lock:
+            # The callback references the handler, which is rebuilt from the configuration
+            callback, self.algorithm.callback = self.algorithm.callback, Callback()
+            try:
+                return pickle.dumps({
+                    'session_id': self.id,
+                    'config': self.config,
+                    'algorithm': self.algorithm,
+                    'recorder': self.recorder,
+                    'random_state': self.random_state,
+                    'created_at': self.created_at,
+                    'compute_time': self.compute_time,
+                }, protocol=pickle.HIGHEST_PROTOCOL)
+            finally:
+                self.algorithm.callback = callback
+
+    def to_dict(self):
+        info = {
+            'session_id': self.id,
+            'status': self.status,
+            'config': self.config,
+            'generation': self.generation,
+            'n_eval': int(self.recorder.column('n_eval')[-1]) if self.generation else 0,
+            'latest': self.recorder.record(self.generation - 1) if self.generation else None,
+            'compute_time': self.compute_time,
+            'created_at': self.created_at,
+            'last_used': self.last_used,
+        }
+        if self.error is not None:
+            info['message'] = self.error
+        return info
+
+
+class SessionManager:
+    """Keeps sessions alive in memory and spills the idle ones to disk
+
+    Sessions unused for idle_timeout seconds, and the least recently used beyond max_live, are
+    pickled into directory and loaded again on their next use. Without a directory they are
+    dropped instead. Running sessions and sessions in use are never evicted. With
+    resources.ResourceLimits, sessions over the per-job limits are rejected, when created and
+    when their pop_size grows. Live sessions reserve their memory from the budget they share
+    with the jobs: idle ones are spilled to make room for a new or growing session, which is
+    rejected if the jobs and the busy sessions leave too little. Loading a spilled session
+    spills idle ones as well but never fails.
+    """
+
+    def __init__(self, directory=None, max_live=16, idle_timeout=900, max_spilled=256, limits=None):
+        self.directory = directory
+        self.max_live = max_live
+        self.idle_timeout = idle_timeout
+        self.max_spilled = max_spilled
+        self.limits = limits
+        self._live = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.pkl")
+
+    def create(self, config):
+        """Start a session and evaluate its initial population
+
+        Raises ValueError for invalid configurations and ones over the resource limits.
+        """
+        memory = 0
+        if self.limits is not None:
+            config, usage = self.limits.plan(config)
+            memory = usage['memory_bytes']
+            with self._lock:
+                self._reserve(memory)
+        try:
+            session = Session(config)
+            session.step(1)
+        except BaseException:
+            if memory:
+                self.limits.release(memory)
+            raise
+        session.reserved = memory
+        with self._lock:
+            self._live[session.id] = session
+            self._evict()
+        return session
+
+    def get(self, session_id):
+        """Return a live or spilled session, None if it does not exist
+
+        The session may be spilled again at any time, requests changing it go through use().
+        """
+        with self._lock:
+            session = self._fetch(session_id)
+            self._evict()
+            return session
+
+    @contextmanager
+    def use(self, session_id):
+        """The session while a request works with it, None if it does not exist
+
+        Sessions in use are never spilled, so generations run and parameters changed meanwhile
+        are not lost to a copy on disk.
+        """
+        with self._lock:
+            session = self._fetch(session_id)
+            if session is not None:
+                session.users += 1
+            self._evict()
+        try:
+            yield session
+        finally:
+            if session is not None:
+                with self._lock:
+                    session.users -= 1
+
+    def _fetch(self, session_id):
+        """A live session, or a spilled one made live again (called with the lock held)"""
+        session = self._live.get(session_id)
+        if session is None:
+            session = self._load(session_id)
+            if session is None:
+                return None
+            if self.limits is not None:
+                memory = self._memory(session)
+                self._reserve(memory, force=True)
+                session.reserved = memory
+            self._live[session_id] = session
+        session.last_used = time.time()
+        self._live.move_to_end(session_id)
+        return session
+
+    def update(self, session, params):
+        """Change parameters of a session, checking a bigger population against the limits"""
+        extra = 0
+        if self.limits is not None:
+            _, usage = self.limits.plan(dict(session.config, **params))
+            with self._lock:
+                extra = usage['memory_bytes'] - session.reserved
+                if extra > 0:
+                    self._reserve(extra, keep=session)
+                session.reserved += extra
+        try:
+            session.update(params)
+        except BaseException:
+            if extra > 0:
+                with self._lock:
+                    session.reserved -= extra
+                self.limits.release(extra)
+            raise
+        if extra < 0:
+            self.limits.release(-extra)
+
+    def list(self):
+        with self._lock:
+            self._evict()
+            sessions = [session.to_dict() for session in self._live.values()]
+        for session_id, modified in self._spilled():
+            if session_id not in self._live:
+                sessions.append({'session_id': session_id, 'status': 'spilled', 'last_used': modified})
+        return sessions
+
+    def delete(self, session_id):
+        """Stop and remove a session, returning whether it existed"""
+        with self._lock:
+            session = self._live.pop(session_id, None)
+            if session is not None:
+                self._release(session)
+        if session is not None:
+            session.pause()
+
+        existed = session is not None
+        if self.directory and self._valid(session_id):
+            try:
+                os.remove(self._path(session_id))
+                existed = True
+            except OSError:
+                pass
+        return existed
+
+    @staticmethod
+    def _valid(session_id):
+        # Ids become file names, anything but the hex ids created here is unknown
+        return session_id.isalnum()
+
+    def _spilled(self):
+        """(id, modification time) of the sessions on disk"""
+        if not self.directory:
+            return []
+        spilled = []
+        for path in glob.glob(os.path.join(self.directory, '*.pkl')):
+            try:
+                spilled.append((os.path.splitext(os.path.basename(path))[0], os.path.getmtime(path)))
+            except OSError:
+                pass
+        return spilled
+
+    def _load(self, session_id):
+        if not self.directory or not self._valid(session_id):
+            return None
+        try:
+            with open(self._path(session_id), 'rb') as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.remove(self._path(session_id))
+        return Session(state['config'], session_id=session_id, state=state)
+
+    def _spill(self, session):
+        """Write a session to disk, dropping the oldest spilled ones beyond max_spilled"""
+        path = self._path(session.id)
+        # Unique per writer, a session spilled by two threads must not interleave its writes
+        tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(session.state())
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        spilled = sorted(self._spilled(), key=lambda item: item[1])
+        for session_id, _ in spilled[:max(0, len(spilled) - self.max_spilled)]:
+            try:
+                os.remove(self._path(session_id))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _memory(session):
+        return estimate(session.config)['memory_bytes']
+
+    def _reserve(self, memory, keep=None, force=False):
+        """Reserve memory bytes of the budget, spilling idle sessions other than keep until they fit
+
+        Raises ValueError if the jobs and the busy sessions leave too little, unless force is
+        set. Called with the lock held.
+        """
+        idle = [session for session in self._live.values()
+                if session is not keep and not session.running and not session.users]
+        # Least recently used first, the same order as _evict
+        while not self.limits.reserve(memory, force=force and not idle):
+            if not idle:
+                raise ValueError(
+                    f"Session needs an estimated {format_bytes(memory)} of memory, but jobs and running "
+                    f"sessions hold {format_bytes(self.limits.reserved)} of the "
+                    f"{format_bytes(self.limits.memory_budget)} budget. Pause or delete sessions"
+                )
+            self._remove(idle.pop(0))
+
+    def _release(self, session):
+        """Give the memory of a session that is no longer live back to the budget (called with the lock held)"""
+        if session.reserved:
+            self.limits.release(session.reserved)
+            session.reserved = 0
+
+    def _remove(self, session):
+        """Spill or drop a live session (called with the lock held)"""
+        del self._live[session.id]
+        self._release(session)
+        if self.directory and session.error is None:
+            self._spill(session)
+
+    def _evict(self):
+        """Spill or drop idle sessions and the least recently used beyond max_live (called with the lock held)"""
+        now = time.time()
+        idle = [session for session in self._live.values() if not session.running and not session.users]
+        excess = len(self._live) - self.max_live
+        for session in idle:
+            if excess <= 0 and now - session.last_used < self.idle_timeout:
+                continue
+            excess -= 1
+            self._remove(session)
+
+    def shutdown(self, timeout=None):
+        """Pause the running sessions and spill all of them, so they can be resumed after a restart"""
+        with self._lock:
+            sessions = list(self._live.values())
+            self._live.clear()
+            for session in sessions:
+                self._release(session)
+        for session in sessions:
+            session.pause(timeout)
+            if self.directory and session.error is None:
+                self._spill(session)
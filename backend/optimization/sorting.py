@@ -0,0 +1,288 @@
+"""Non-dominated sorting for large populations
+
+pymoo's default sort compares every pair of solutions in a Python loop, which dominates the
+generation time once the population reaches the thousands. FastNonDominatedSorting is a
+drop-in replacement for pymoo's NonDominatedSorting that picks a strategy from the number of
+objectives and points:
+
+- sweep: two objectives, O(N log N). Points are visited in lexicographic order and each
+  one joins the first front whose last point does not dominate it.
+- dominance: more objectives, O(MN^2) but vectorized. A point can only be dominated by points
+  that precede it in lexicographic order, so the points are sorted first and only the upper
+  triangle of the dominance matrix is computed. It is built a block of rows at a time and
+  kept bit-packed, then fronts are peeled off by subtracting the rows of each front from the
+  dominator counts. Populations whose packed matrix would exceed
+  MAX_DOMINANCE_BYTES recompute the first front of the remaining points instead.
+- pymoo: small populations when pymoo's compiled extensions are available.
+
+All strategies return the same fronts as pymoo in the same order, so seeded runs reproduce
+whichever strategy sorts them. pymoo lists the first front in ascending index order and every
+later front in the order its points lose their last dominator while the previous front is
+walked: by the position of their last dominator in the previous front, then by index.
+"""
+import types
+import threading
+from bisect import bisect_left
+
+import numpy as np
+from pymoo.util.function_loader import is_compiled
+from pymoo.util.nds.non_dominated_sorting import NonDominatedSorting, rank_from_fronts
+
+SORTING_STRATEGIES = ('auto', 'sweep', 'dominance', 'pymoo')
+
+# Below this many points pymoo's compiled sort is as fast as the vectorized one
+COMPILED_MIN_POINTS = 500
+
+# Pairs compared per block of the dominance matrix
+DOMINANCE_BLOCK = 1 << 18
+
+# Largest bit-packed dominance matrix kept in memory
+MAX_DOMINANCE_BYTES = 256 * 2**20
+
+_survival_lock = threading.Lock()
+
+
+def choose_strategy(n_obj, n_points):
+    """Fastest strategy for sorting n_points solutions with n_obj objectives"""
+    if n_obj == 2:
+        return 'sweep'
+    if n_points < COMPILED_MIN_POINTS and is_compiled():
+        return 'pymoo'
+    return 'dominance'
+
+
+def _fronts_from_rank(rank, n_stop_if_ranked=None):
+    """Split point indices into fronts by rank, stopping once n_stop_if_ranked are ranked"""
+    order = np.argsort(rank, kind='stable')
+    bounds = np.flatnonzero(np.diff(rank[order])) + 1
+    fronts = np.split(order, bounds)
+    if n_stop_if_ranked is not None:
+        sizes = np.cumsum([len(front) for front in fronts])
+        fronts = fronts[:int(np.searchsorted(sizes, n_stop_if_ranked)) + 1]
+    return fronts
+
+
+def _range_max(values):
+    """Function returning the maximum of values[lo:hi] for arrays of non-empty ranges (a sparse table)"""
+    table = [np.asarray(values)]
+    while 2 ** len(table) <= len(values):
+        half = 2 ** (len(table) - 1)
+        table.append(np.maximum(table[-1][:-half], table[-1][half:]))
+
+    def query(lo, hi):
+        level = np.floor(np.log2(hi - lo)).astype(int)
+        result = np.empty(len(lo), dtype=table[0].dtype)
+        for k in np.unique(level):
+            at = level == k
+            result[at] = np.maximum(table[k][lo[at]], table[k][hi[at] - 2 ** k])
+        return result
+
+    return query
+
+
+def _sweep_order(F, fronts):
+    """Fronts of a two objective F in pymoo's order, see the module docstring
+
+    Ordered by the first objective, a front's second objective decreases, so the points of the
+    previous front dominating a point are a contiguous run of it.
+    """
+    ordered = [np.sort(fronts[0])]
+    for front in fronts[1:]:
+        previous = ordered[-1]
+        by_f1 = np.lexsort((F[previous, 1], F[previous, 0]))
+        f1, f2 = F[previous[by_f1], 0], F[previous[by_f1], 1]
+        hi = np.searchsorted(f1, F[front, 0], side='right')
+        lo = np.searchsorted(-f2, -F[front, 1], side='left')
+        last = _range_max(by_f1)(lo, hi)
+        ordered.append(front[np.lexsort((front, last))])
+    return ordered
+
+
+def sweep_rank(F):
+    """Front index of every point of a two objective F"""
+    order = np.lexsort((F[:, 1], F[:, 0]))
+    rank = np.empty(len(F), dtype=int)
+
+    # (f2, f1) of the last point of every front, increasing with the front index. Points come
+    # in lexicographic order, so a front dominates a point iff its last point compares lower
+    lasts = []
+    for i, f1, f2 in zip(order.tolist(), F[order, 0].tolist(), F[order, 1].tolist()):
+        key = (f2, f1)
+        k = bisect_left(lasts, key)
+        if k == len(lasts):
+            lasts.append(key)
+        else:
+            lasts[k] = key
+        rank[i] = k
+    return rank
+
+
+def _dominates(A, F):
+    """Boolean matrix of whether each point of A dominates each point of F"""
+    # A dominates F where it is nowhere worse and not equal everywhere
+    le = np.ones((len(A), len(F)), dtype=bool)
+    eq = np.ones_like(le)
+    tmp = np.empty_like(le)
+    for m in range(F.shape[1]):
+        a, b = A[:, m, None], F[None, :, m]
+        le &= np.less_equal(a, b, out=tmp)
+        eq &= np.equal(a, b, out=tmp)
+    le &= ~eq
+    return le
+
+
+def _block_size(n):
+    """Rows per block, so that the boolean matrices of a block stay in cache"""
+    return max(1, DOMINANCE_BLOCK // max(1, n))
+
+
+def _lexsort(F):
+    return np.lexsort(F.T[::-1])
+
+
+def non_dominated(F):
+    """Indices of the points of F that no other point dominates"""
+    F = np.asarray(F, dtype=float)
+    n = len(F)
+    if n == 0:
+        return np.arange(0)
+    if F.shape[1] == 2:
+        return np.flatnonzero(sweep_rank(F) == 0)
+
+    order = _lexsort(F)
+    F = F[order]
+    dominated = np.zeros(n, dtype=bool)
+    block = _block_size(n)
+    for start in range(0, n, block):
+        end = start + block
+        dominated[start:end] = _dominates(F[:end], F[start:end]).any(axis=0)
+    return np.sort(order[~dominated])
+
+
+def dominance_sort(F, n_stop_if_ranked=None):
+    """Fronts of F from a bit-packed dominance matrix built block by block"""
+    n = len(F)
+    if n * ((n + 7) // 8) > MAX_DOMINANCE_BYTES:
+        return _peel_sort(F, n_stop_if_ranked)
+
+    order = _lexsort(F)
+    F = F[order]
+    block = _block_size(n)
+    dominates = np.empty((n, (n + 7) // 8), dtype=np.uint8)
+    n_dominators = np.zeros(n, dtype=np.int64)
+    rows = np.zeros((min(block, n), n), dtype=bool)
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        # Columns before the block are lexicographically smaller and cannot be dominated by it
+        rows[:, :start] = False
+        rows[:end - start, start:] = _dominates(F[start:end], F[start:])
+        n_dominators += rows[:end - start].sum(axis=0)
+        dominates[start:end] = np.packbits(rows[:end - start], axis=1)
+
+    fronts, n_ranked = [], 0
+    current = np.flatnonzero(n_dominators == 0)
+    current = current[np.argsort(order[current], kind='stable')]
+    while len(current):
+        fronts.append(current)
+        n_ranked += len(current)
+        if n_stop_if_ranked is not None and n_ranked >= n_stop_if_ranked:
+            break
+        # Position in the current front of the last point dominating each point
+        last = np.full(n, -1)
+        for start in range(0, len(current), block):
+            rows = np.unpackbits(dominates[current[start:start + block]], axis=1, count=n)
+            n_dominators -= rows.sum(axis=0, dtype=np.int64)
+            hit = rows.any(axis=0)
+            last[hit] = start + len(rows) - 1 - np.argmax(rows[::-1], axis=0)[hit]
+        # Ranked points drop below zero and never come back
+        n_dominators[current] = -1
+        current = np.flatnonzero(n_dominators == 0)
+        current = current[np.lexsort((order[current], last[current]))]
+    return [order[front] for front in fronts]
+
+
+def _peel_sort(F, n_stop_if_ranked=None):
+    """Fronts of F by repeatedly extracting the non-dominated points of the rest"""
+    remaining = np.arange(len(F))
+    fronts, n_ranked = [], 0
+    while len(remaining):
+        front = remaining[non_dominated(F[remaining])]
+        if fronts:
+            # Position in the previous front of the last point dominating each point
+            previous, last = fronts[-1], np.full(len(front), -1)
+            block = _block_size(len(front))
+            for start in range(0, len(previous), block):
+                rows = _dominates(F[previous[start:start + block]], F[front])
+                hit = rows.any(axis=0)
+                last[hit] = start + len(rows) - 1 - np.argmax(rows[::-1], axis=0)[hit]
+            front = front[np.lexsort((front, last))]
+        fronts.append(front)
+        n_ranked += len(front)
+        if n_stop_if_ranked is not None and n_ranked >= n_stop_if_ranked:
+            break
+        remaining = np.setdiff1d(remaining, front, assume_unique=True)
+    return fronts
+
+
+class FastNonDominatedSorting(NonDominatedSorting):
+    """Drop-in replacement for pymoo's NonDominatedSorting, see the module docstring"""
+
+    def __init__(self, strategy='auto', epsilon=None):
+        if strategy not in SORTING_STRATEGIES:
+            raise ValueError(f"Unknown sorting strategy: {strategy}. Choose one of {', '.join(SORTING_STRATEGIES)}")
+        super().__init__(epsilon=epsilon)
+        self.strategy = strategy
+
+    def do(self, F, return_rank=False, only_non_dominated_front=False, n_stop_if_ranked=None, **kwargs):
+        F = np.asarray(F, dtype=float)
+        strategy = choose_strategy(F.shape[1], len(F)) if self.strategy == 'auto' else self.strategy
+
+        # Epsilon dominance is only implemented by pymoo
+        if strategy == 'pymoo' or self.epsilon is not None or len(F) == 0:
+            return super().do(F, return_rank=return_rank, only_non_dominated_front=only_non_dominated_front,
+                              n_stop_if_ranked=n_stop_if_ranked, **kwargs)
+
+        if only_non_dominated_front:
+            return non_dominated(F)
+
+        if strategy == 'sweep':
+            fronts = _sweep_order(F, _fronts_from_rank(sweep_rank(F), n_stop_if_ranked))
+        else:
+            fronts = dominance_sort(F, n_stop_if_ranked)
+
+        if return_rank:
+            return fronts, rank_from_fronts(fronts, len(F))
+        return fronts
+
+
+def _reference_direction_survival():
+    from pymoo.algorithms.moo import nsga3
+
+    class ReferenceDirectionSurvival(nsga3.ReferenceDirectionSurvival):
+        """NSGA-III survival sorting with FastNonDominatedSorting
+
+        pymoo's survival instantiates NonDominatedSorting inline, so _do runs with that name bound
+        to FastNonDominatedSorting in its globals instead of patching the pymoo module.
+        """
+
+        _do = types.FunctionType(
+            nsga3.ReferenceDirectionSurvival._do.__code__,
+            dict(nsga3.__dict__, NonDominatedSorting=FastNonDominatedSorting),
+            '_do',
+            nsga3.ReferenceDirectionSurvival._do.__defaults__,
+            nsga3.ReferenceDirectionSurvival._do.__closure__
+        )
+
+    # Pickled checkpoints find the class under its module-level name
+    ReferenceDirectionSurvival.__qualname__ = 'ReferenceDirectionSurvival'
+    return ReferenceDirectionSurvival
+
+
+def __getattr__(name):
+    # NSGA-III's module is only imported once its survival is used, see optimization.registry
+    if name == 'ReferenceDirectionSurvival':
+        with _survival_lock:
+            if name not in globals():
+                globals()[name] = _reference_direction_survival()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,90 @@
+import json
+import time
+import queue
+from concurrent.futures import CancelledError
+
+from pymoo.core.callback import Callback
+
+from optimization.encoding import json_default
+
+
+class ProgressCallback(Callback):
+    """Record the metrics of every generation and optionally forward them to a sink
+
+    The recorder replaces pymoo's save_history, which deep copies the whole algorithm each generation.
+    """
+
+    def __init__(self, handler, recorder, sink=None, cancel_event=None, front=None):
+        super().__init__()
+        self.handler = handler
+        self.recorder = recorder
+        self.sink = sink
+        self.cancel_event = cancel_event
+        self.front = front
+
+    def notify(self, algorithm):
+        F = algorithm.opt.get('F')
+
+        record = self.recorder.append(
+            algorithm.n_gen,
+            algorithm.evaluator.n_eval,
+            F,
+            self.handler.compute_indicators(F)
+        )
+
+        # The termination was updated before this generation was recorded, so let it look again
+        algorithm.termination.update(algorithm)
+
+        if self.sink is not None:
+            event = dict(record)
+            if self.front is not None:
+                event.update(self.front(F))
+            self.sink(event)
+
+        # Stop at the end of this generation once the job has been cancelled
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            algorithm.termination.terminate()
+
+
+def format_sse(event, data):
+    """Encode a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=json_default)}\n\n"
+
+
+def stream_job_events(job, heartbeat=15.0, reduce=None):
+    """Yield the progress records of a streaming job as SSE, followed by its final result
+
+    The first event names the job, so clients can fetch the full resolution result of a run
+    whose final result was passed through reduce.
+    """
+    yield format_sse('job', {'job_id': job.id})
+    last_sent = time.time()
+    while True:
+        try:
+            record = job.progress.get(timeout=0.5)
+        except queue.Empty:
+            # Jobs cancelled before they started never send the end-of-stream marker
+            if job.done and job.progress.empty():
+                break
+            if time.time() - last_sent > heartbeat:
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            continue
+
+        if record is None:
+            break
+        yield format_sse('progress', record)
+        last_sent = time.time()
+
+    try:
+        result = job.result()
+    except CancelledError:
+        yield format_sse('cancelled', job.to_dict())
+        return
+    except Exception as e:
+        yield format_sse('error', {'status': 'error', 'message': str(e)})
+        return
+
+    if reduce is not None:
+        result = reduce(result)
+    yield format_sse('result', {'status': 'success', 'data': result})
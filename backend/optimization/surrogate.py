@@ -0,0 +1,152 @@
+"""Surrogate-assisted runs for problems whose evaluations are expensive
+
+A surrogate-assisted run mates as many offspring per generation as a standard run, but only
+the few the model ranks best are evaluated on the true problem. The model is a thin-plate
+spline RBF interpolation of every objective, refitted each generation on the latest true
+evaluations. The candidates are ranked by non-dominated sorting of their predicted objectives
+together with the current population, so candidates the model expects to be dominated by the
+population come last, and by crowding distance within the front that has to be split.
+
+Runs therefore take as many generations as before with a fraction of the true evaluations.
+The statistics of a result report the evaluations spent and saved and the time spent on the
+model, which is negligible for problems that take seconds per evaluation.
+"""
+import time
+
+import numpy as np
+
+from optimization.sorting import FastNonDominatedSorting
+from optimization import instrumentation
+
+# MOEAD mates and evaluates one offspring per subproblem, there is nothing to pre-screen
+SURROGATE_ALGORITHMS = ('nsga2', 'nsga3')
+
+# Most recent true evaluations the model is fitted on, the fit is cubic in their number
+MAX_TRAINING = 400
+
+# Regularization of the fit, keeps it well conditioned for nearly identical solutions
+SMOOTHING = 1e-8
+
+
+def default_evals(pop_size):
+    """True evaluations per generation unless configured: a tenth of the offspring"""
+    return max(2, pop_size // 10)
+
+
+class RBFModel:
+    """Thin-plate spline interpolation of all objectives on the normalized decision variables"""
+
+    def __init__(self, xl, xu):
+        self.xl = np.asarray(xl, dtype=float)
+        span = np.asarray(xu, dtype=float) - self.xl
+        self.scale = np.where(span > 0, span, 1.0)
+        self.interpolator = None
+
+    def _normalize(self, X):
+        return (np.asarray(X, dtype=float) - self.xl) / self.scale
+
+    def fit(self, X, F):
+        # SciPy's interpolation is only imported by surrogate-assisted runs
+        from scipy.interpolate import RBFInterpolator
+
+        # Evaluations of the same solution would make the system singular
+        X, unique = np.unique(self._normalize(X), axis=0, return_index=True)
+        F = np.asarray(F, dtype=float)[unique]
+
+        self.mean, self.std = F.mean(axis=0), F.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        self.interpolator = RBFInterpolator(X, (F - self.mean) / self.std, kernel='thin_plate_spline',
+                                            degree=1, smoothing=SMOOTHING)
+        return self
+
+    def predict(self, X):
+        return self.interpolator(self._normalize(X)) * self.std + self.mean
+
+
+class SurrogateScreening:
+    """Mating that pre-screens the offspring of the wrapped mating on an RBFModel
+
+    Takes the place of the algorithm's mating. Each call mates n_candidates offspring and
+    returns the n_offsprings the model ranks best, see the module docstring. The solutions the
+    algorithm evaluated since the previous call, algorithm.off, are added to the training set
+    first. Until the model can be fitted (it needs at least n_var + 1 distinct solutions) the
+    first n_offsprings candidates are passed on unscreened.
+    """
+
+    def __init__(self, mating, n_candidates, xl, xu):
+        self.mating = mating
+        self.n_candidates = n_candidates
+        self.model = RBFModel(xl, xu)
+        self.X = None
+        self.F = None
+        self.refits = 0
+        self.fallbacks = 0
+        self.screened_out = 0
+        self.refit_time = 0.0
+        self.predict_time = 0.0
+
+    def _add_evaluated(self, evaluated):
+        if evaluated is None or len(evaluated) == 0:
+            return
+        X, F = evaluated.get('X'), evaluated.get('F')
+        if self.X is not None:
+            X, F = np.vstack([self.X, X]), np.vstack([self.F, F])
+        self.X, self.F = X[-MAX_TRAINING:], F[-MAX_TRAINING:]
+
+    def do(self, problem, pop, n_offsprings, algorithm=None, **kwargs):
+        self._add_evaluated(algorithm.off if algorithm is not None else None)
+        candidates = self.mating.do(problem, pop, self.n_candidates, algorithm=algorithm, **kwargs)
+        if len(candidates) <= n_offsprings:
+            return candidates
+
+        try:
+            start = time.perf_counter()
+            with instrumentation.span('surrogate_fit'):
+                self.model.fit(self.X, self.F)
+            self.refit_time += time.perf_counter() - start
+            self.refits += 1
+
+            start = time.perf_counter()
+            predicted = self.model.predict(candidates.get('X'))
+            self.predict_time += time.perf_counter() - start
+        except (np.linalg.LinAlgError, ValueError):
+            # Too few or degenerate training solutions
+            self.fallbacks += 1
+            return candidates[:n_offsprings]
+
+        self.screened_out += len(candidates) - n_offsprings
+        return candidates[self._select(predicted, pop.get('F'), n_offsprings)]
+
+    @staticmethod
+    def _select(predicted, F, n):
+        """Indices of the n candidates on the best fronts of the predicted and the population's objectives"""
+        from pymoo.algorithms.moo.nsga2 import calc_crowding_distance
+
+        chosen = []
+        for front in FastNonDominatedSorting().do(np.vstack([F, predicted])):
+            front = front[front >= len(F)] - len(F)
+            if len(chosen) + len(front) > n:
+                crowding = calc_crowding_distance(predicted[front])
+                front = front[np.argsort(-crowding, kind='stable')[:n - len(chosen)]]
+            chosen.extend(front)
+            if len(chosen) == n:
+                break
+        return np.array(chosen, dtype=int)
+
+    def report(self, n_eval, pop_size, generations):
+        """Statistics of the run: true evaluations, the ones saved against a standard run, model cost"""
+        # A standard run evaluates the initial population and pop_size offspring per generation
+        baseline = pop_size * generations
+        return {
+            'model': 'rbf',
+            'candidates_per_generation': self.n_candidates,
+            'true_evaluations': int(n_eval),
+            'baseline_evaluations': int(baseline),
+            'evaluations_saved': int(baseline - n_eval),
+            'savings': float(1 - n_eval / baseline) if baseline else 0.0,
+            'screened_out': self.screened_out,
+            'refits': self.refits,
+            'refit_time': self.refit_time,
+            'predict_time': self.predict_time,
+            'unscreened_generations': self.fallbacks,
+        }
@@ -0,0 +1,72 @@
+import numpy as np
+from pymoo.core.termination import Termination
+from pymoo.termination.max_gen import MaximumGenerationTermination
+
+from optimization import instrumentation
+
+# Number of most recent generations the convergence criteria look at
+CONVERGENCE_WINDOW = 10
+
+# Mean change per generation below which objectives and indicators count as stable
+CONVERGENCE_TOL = 1e-4
+
+# Relative variation of the front size below which it counts as stable
+NDS_VARIATION_TOL = 0.05
+
+
+def has_converged(recorder, window=CONVERGENCE_WINDOW, tol=CONVERGENCE_TOL, nds_tol=NDS_VARIATION_TOL):
+    """Check the recorded metrics of the last window generations for convergence
+
+    Every available criterion has to hold: stable objective means, stable hypervolume (which must
+    be positive, since fronts outside the reference box all have a hypervolume of zero), stable
+    IGD and a stable number of non-dominated solutions.
+    """
+    if len(recorder) < window:
+        return False
+
+    def stable(name):
+        values = recorder.column(name)[-window:]
+        return np.mean(np.abs(np.diff(values))) < tol
+
+    # Check objective values stability
+    if not stable('f_mean'):
+        return False
+
+    # Check if the hypervolume improvement is minimal
+    if 'hv' in recorder.metrics:
+        if recorder.column('hv')[-window:].min() <= 0 or not stable('hv'):
+            return False
+
+    # Check if the IGD improvement is minimal
+    if 'igd' in recorder.metrics and not stable('igd'):
+        return False
+
+    # Check if the number of non-dominated solutions is stable
+    nds_values = recorder.column('n_nds')[-window:]
+    return np.std(nds_values) / np.mean(nds_values) < nds_tol
+
+
+class ConvergenceTermination(Termination):
+    """Stop after n_max_gen generations, or earlier once the recorded metrics have converged
+
+    The recorder is filled by the progress callback, which runs after pymoo updates the
+    termination, so the callback updates it again once the generation has been recorded.
+    """
+
+    def __init__(self, recorder, n_max_gen, early_stopping=True):
+        super().__init__()
+        self.recorder = recorder
+        self.max_gen = MaximumGenerationTermination(n_max_gen)
+        self.early_stopping = early_stopping
+        self.converged_at = None
+
+    def _update(self, algorithm):
+        progress = self.max_gen.update(algorithm)
+        if self.early_stopping and self.converged_at is None:
+            with instrumentation.span('check_convergence'):
+                converged = has_converged(self.recorder)
+            if converged:
+                self.converged_at = int(self.recorder.column('n_gen')[-1])
+        if self.converged_at is not None:
+            return 1.0
+        return progress
@@ -0,0 +1,126 @@
+"""Production server: the app under gunicorn with preloading and graceful shutdown
+
+From the backend directory (or with python cli.py serve from the project root):
+
+    python serve.py --bind 0.0.0.0:5000 --workers 2 --threads 8
+
+The app is imported and the artifacts are warmed in the master process before the HTTP
+workers fork, so pymoo, NumPy and the reference directions and fronts are loaded once and
+shared copy-on-write. Every HTTP worker serves requests on --threads threads and runs
+optimizations on its own process pool; by default the cores are split evenly between them.
+
+On SIGTERM the workers stop accepting connections, let in-flight requests finish and then
+drain their unfinished jobs. Jobs still running when --graceful-timeout runs out are cancelled
+after their current generation. Results of drained jobs stay available from the result cache
+and the run store. Ctrl+C (SIGINT) shuts down right away, as usual with gunicorn.
+
+Jobs and experiments live in the HTTP worker that created them. With more than one worker,
+a client polling /api/jobs/<job_id> may reach another worker and get a 404, so use several
+workers only for the synchronous endpoints or behind a load balancer with sticky sessions.
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # Windows, or not installed
+    BaseApplication = object
+
+# Time the drain leaves for the worker to shut down its pools before the master kills it
+SHUTDOWN_MARGIN = 5.0
+
+
+def post_worker_init(worker):
+    """Note when the worker is asked to stop, so worker_exit knows how much time is left"""
+    handle_exit = worker.handle_exit
+
+    def on_exit(sig, frame):
+        worker.exit_requested_at = time.monotonic()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, on_exit)
+
+
+def worker_exit(server, worker):
+    """Drain the jobs of a stopping worker within what is left of the graceful timeout"""
+    import app
+
+    started = getattr(worker, 'exit_requested_at', None)
+    elapsed = time.monotonic() - started if started is not None else 0.0
+    timeout = max(0.0, worker.cfg.graceful_timeout - elapsed - SHUTDOWN_MARGIN)
+
+    unfinished = sum(not job.done for job in app.jobs.list())
+    if unfinished:
+        server.log.info("Worker %s draining %d unfinished jobs (up to %.0fs)", worker.pid, unfinished, timeout)
+    app.jobs.drain(timeout)
+    # Running sessions stop after their current generation and wait on disk for the next worker
+    app.sessions.shutdown()
+
+
+class Server(BaseApplication):
+    """gunicorn application serving the preloaded Flask app"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Runs once in the master process because preload_app is set
+        import app
+        start = time.perf_counter()
+        app.warm_artifacts()
+        print(f"Artifacts warmed in {time.perf_counter() - start:.1f}s", flush=True)
+        return app.app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the backend with gunicorn')
+    parser.add_argument('--bind', default=os.environ.get('PYMOO_INTERACT_BIND', '127.0.0.1:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('PYMOO_INTERACT_HTTP_WORKERS', 1)),
+                        help='HTTP worker processes (default 1)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('PYMOO_INTERACT_HTTP_THREADS', 8)),
+                        help='request threads per HTTP worker, each open event stream holds one (default 8)')
+    parser.add_argument('--job-workers', type=int, default=None,
+                        help='optimization processes per HTTP worker (default: the cores split between the workers)')
+    parser.add_argument('--graceful-timeout', type=int, default=120,
+                        help='seconds stopping workers get for in-flight requests and jobs (default 120)')
+    parser.add_argument('--access-log', action='store_true', help='log every request to stdout')
+    args = parser.parse_args(argv)
+
+    if BaseApplication is object:
+        print("gunicorn is not installed (pip install gunicorn); it runs on Linux and macOS only. "
+              "Use python app.py for the development server.")
+        return 1
+
+    # Read by app.py at import, so it has to be set before the master preloads it
+    job_workers = args.job_workers or max(1, (os.cpu_count() or 1) // args.workers)
+    os.environ['PYMOO_INTERACT_WORKERS'] = str(job_workers)
+
+    if args.workers > 1:
+        print("Note: jobs and experiments are kept per HTTP worker, see the docstring of serve.py", flush=True)
+
+    Server({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'graceful_timeout': args.graceful_timeout,
+        # Workers heartbeat from their main loop, long optimizations do not count against this
+        'timeout': 60,
+        'accesslog': '-' if args.access_log else None,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+    }).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -242,9 +242,58 @@ def run_project(with_frontend=True):
             frontend_process.terminate()
         sys.exit(1)
 
+def run_backend_module(module, args):
+    """Run a module of the backend package with the virtual environment's Python"""
+    if not is_venv_exists():
+        print("Virtual environment not found. Creating one...")
+        create_venv()
+
+    activate_venv()
+
+    # The module runs in the caller's directory, so its arguments keep their meaning, and finds
+    # the backend packages on the path
+    backend = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+    pythonpath = os.pathsep.join(filter(None, [backend, os.environ.get('PYTHONPATH')]))
+    python = os.path.abspath(get_python_executable())
+    result = subprocess.run([python, '-m', module, *args], env=dict(os.environ, PYTHONPATH=pythonpath))
+    sys.exit(result.returncode)
+
+def serve_backend(args):
+    """Serve the backend API with gunicorn instead of the development server"""
+    run_backend_module('serve', args)
+
+def run_experiment(args):
+    """Run an experiment grid from a JSON spec on all cores"""
+    if not args:
+        print("Usage: python cli.py experiment <spec.json> [--workers N] [--output results.json]")
+        sys.exit(1)
+    run_backend_module('optimization.experiments', args)
+
+def run_restarts(args):
+    """Run one configuration with several seeds in parallel and merge the fronts"""
+    if len(args) < 2:
+        print("Usage: python cli.py optimize <problem> <algorithm> [--restarts K] [--n-gen N] [--output result.json]")
+        sys.exit(1)
+    run_backend_module('optimization.restarts', args)
+
+def run_islands(args):
+    """Run an island model on this machine, or some islands of one spread over several nodes"""
+    if not args:
+        print("Usage: python cli.py islands [run|island|broker|collect] ... (see python cli.py islands run --help)")
+        sys.exit(1)
+    run_backend_module('optimization.islands', args)
+
+def run_benchmarks(args):
+    """Run the benchmark suite, optionally comparing against a baseline"""
+    run_backend_module('benchmarks.suite', args)
+
+def run_load_test(args):
+    """Start the backend and measure throughput and latency under concurrent requests"""
+    run_backend_module('benchmarks.load', args)
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python cli.py [create|run]")
+        print("Usage: python cli.py [create|run|serve|experiment|optimize|islands|bench|load]")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -261,9 +310,21 @@ def main():
         
         print("\nStarting the project...")
         run_project(with_frontend)
+    elif command == 'serve':
+        serve_backend(sys.argv[2:])
+    elif command == 'experiment':
+        run_experiment(sys.argv[2:])
+    elif command == 'optimize':
+        run_restarts(sys.argv[2:])
+    elif command == 'islands':
+        run_islands(sys.argv[2:])
+    elif command == 'bench':
+        run_benchmarks(sys.argv[2:])
+    elif command == 'load':
+        run_load_test(sys.argv[2:])
     else:
         print(f"Unknown command: {command}")
-        print("Available commands: create, run")
+        print("Available commands: create, run, serve, experiment, optimize, islands, bench, load")
         sys.exit(1)
 
 if __name__ == '__main__':
@@ -51,6 +51,43 @@ const darkTheme = createTheme({
   },
 });
 
+// Read a text/event-stream response body, calling onEvent(event, data) for every event until it
+// returns false
+async function readEvents(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  try {
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) {
+        return;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      // Events are separated by a blank line, keep-alive comments carry no data
+      const blocks = buffer.split('\n\n');
+      buffer = blocks.pop();
+      for (const block of blocks) {
+        let event = 'message';
+        const data = [];
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trimStart());
+          }
+        }
+        if (data.length && onEvent(event, JSON.parse(data.join('\n'))) === false) {
+          return;
+        }
+      }
+    }
+  } finally {
+    // Closing the connection early also tells the server nobody is waiting for the run anymore
+    reader.cancel().catch(() => {});
+  }
+}
+
 function App() {
   const [showLanding, setShowLanding] = useState(true);
   const [selectedProblem, setSelectedProblem] = useState('');
@@ -64,6 +101,8 @@ function App() {
   const [optimizationResults, setOptimizationResults] = useState(null);
   const [error, setError] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [progress, setProgress] = useState([]);
+  const [jobId, setJobId] = useState(null);
 
   const handleProblemChange = (problem) => {
     setSelectedProblem(problem);
@@ -104,25 +143,60 @@ function App() {
   const handleOptimize = async () => {
     setIsLoading(true);
     setError(null);
+    setProgress([]);
+    setJobId(null);
     try {
-      const response = await fetch('/api/optimize', {
+      // Stream per-generation progress so the front can be plotted while the run is going. A POST
+      // through fetch rather than EventSource, so a rejected configuration shows the server's message
+      const response = await fetch('/api/optimize/stream', {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           problem: selectedProblem,
           algorithm: selectedAlgorithm,
           ...parameters,
+          front_points: 500,
+          front_deltas: true,
+          max_points: 2000,
         }),
       });
-      
-      const data = await response.json();
-      
       if (!response.ok) {
-        throw new Error(data.message || 'Optimization failed');
+        const body = await response.json().catch(() => ({}));
+        throw new Error(body.message || `Optimization failed (${response.status})`);
+      }
+
+      let front = [];
+      let data = null;
+      await readEvents(response, (event, payload) => {
+        if (event === 'job') {
+          setJobId(payload.job_id);
+        } else if (event === 'progress') {
+          const { front_delta: delta, ...record } = payload;
+          // Fronts arrive in full or as the points removed from and added to the previous one
+          if (record.front) {
+            front = record.front;
+          } else if (delta) {
+            const removed = new Set(delta.removed);
+            front = front.filter((_, i) => !removed.has(i)).concat(delta.added);
+          }
+          // Only the latest record keeps its front
+          setProgress(prev => [
+            ...prev.map(({ front: _, ...rest }) => rest),
+            { ...record, front }
+          ]);
+        } else if (event === 'result') {
+          data = payload;
+          return false;
+        } else if (event === 'error') {
+          throw new Error(payload.message || 'Optimization failed');
+        } else if (event === 'cancelled') {
+          throw new Error('Optimization was cancelled');
+        }
+      });
+      if (data === null) {
+        throw new Error('Optimization stream ended without a result');
       }
-      
+
       if (data.status === 'success') {
         setOptimizationResults(data.data);
       } else {
@@ -137,6 +211,19 @@ function App() {
     }
   };
 
+  const handleLoadFullResolution = async () => {
+    try {
+      const response = await fetch(`/api/jobs/${jobId}/result`);
+      const data = await response.json();
+      if (data.status !== 'success') {
+        throw new Error(data.message || 'Failed to load the full result');
+      }
+      setOptimizationResults(data.data);
+    } catch (err) {
+      setError(err.message);
+    }
+  };
+
   const handleCloseError = () => {
     setError(null);
   };
@@ -213,6 +300,8 @@ function App() {
                 <OptimizationVisualizer 
                   results={optimizationResults}
                   isLoading={isLoading}
+                  progress={progress}
+                  onLoadFullResolution={jobId ? handleLoadFullResolution : null}
                 />
               </Paper>
             </Grid>
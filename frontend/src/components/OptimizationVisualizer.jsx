@@ -8,7 +8,8 @@ import {
   Tooltip, 
   Grid,
   Tabs,
-  Tab
+  Tab,
+  Button
 } from '@mui/material';
 import FullscreenIcon from '@mui/icons-material/Fullscreen';
 import FullscreenExitIcon from '@mui/icons-material/FullscreenExit';
@@ -31,7 +32,7 @@ const TabPanel = ({ children, value, index, ...other }) => (
   </div>
 );
 
-const OptimizationVisualizer = ({ results, isLoading }) => {
+const OptimizationVisualizer = ({ results, isLoading, progress = [], onLoadFullResolution = null }) => {
   const [isFullscreen, setIsFullscreen] = useState(false);
   const [activeTab, setActiveTab] = useState(0);
   const containerRef = useRef(null);
@@ -90,10 +91,37 @@ const OptimizationVisualizer = ({ results, isLoading }) => {
     hovermode: 'closest'
   });
 
+  const renderLiveFront = () => {
+    const latest = progress[progress.length - 1];
+    if (!latest || !latest.front || latest.front[0].length !== 2) return null;
+
+    return (
+      <Plot
+        data={[
+          {
+            x: latest.front.map(point => point[0]),
+            y: latest.front.map(point => point[1]),
+            type: 'scattergl',
+            mode: 'markers',
+            marker: { color: '#2196f3', size: 8, opacity: 0.8 },
+            name: `Generation ${latest.n_gen}`
+          }
+        ]}
+        layout={{
+          ...getPlotLayout('Current Front'),
+          xaxis: { ...getPlotLayout('').xaxis, title: 'Objective 1' },
+          yaxis: { ...getPlotLayout('').yaxis, title: 'Objective 2' }
+        }}
+        style={{ width: '100%', height: '400px' }}
+        config={{ responsive: true, displaylogo: false }}
+      />
+    );
+  };
+
   const renderParetoFront = () => {
-    if (!results || !results.pareto_front) return null;
+    if (!results || !results.F) return null;
 
-    const { objectives } = results.pareto_front;
+    const objectives = results.F;
     const numObjectives = objectives[0].length;
 
     if (numObjectives === 2) {
@@ -367,10 +395,15 @@ const OptimizationVisualizer = ({ results, isLoading }) => {
             height: '100%',
             minHeight: '500px'
           }}>
-            <CircularProgress size={60} thickness={4} />
+            {renderLiveFront() || <CircularProgress size={60} thickness={4} />}
             <Typography variant="h6" sx={{ mt: 2 }}>
               Running Optimization...
             </Typography>
+            {progress.length > 0 && (
+              <Typography variant="body2" color="text.secondary">
+                Generation {progress[progress.length - 1].n_gen} · {progress[progress.length - 1].n_nds} non-dominated solutions
+              </Typography>
+            )}
           </Box>
         ) : results ? (
           <>
@@ -395,6 +428,18 @@ const OptimizationVisualizer = ({ results, isLoading }) => {
             
             <TabPanel value={activeTab} index={0}>
               {renderParetoFront()}
+              {results.lod && (
+                <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between', mt: 1 }}>
+                  <Typography variant="body2" color="text.secondary">
+                    Showing {results.F.length} of {results.lod.n_points} solutions
+                  </Typography>
+                  {onLoadFullResolution && (
+                    <Button size="small" onClick={onLoadFullResolution}>
+                      Load all solutions
+                    </Button>
+                  )}
+                </Box>
+              )}
             </TabPanel>
             <TabPanel value={activeTab} index={1}>
               {renderConvergence()}